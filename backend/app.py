@@ -1,20 +1,12 @@
 # app.py
 
 from flask import Flask
-from flask_cors import CORS
 import logging
 from dotenv import load_dotenv
 import os
 
-# Import Blueprints
-from routes.admin import admin_bp
-from routes.student import student_bp
-from routes.auth_routes import auth_bp  # Assuming you have auth routes
-
-# Load environment variables
+# Load environment variables and configure logging once, before anything reads them
 load_dotenv()
-
-# Configure Logging
 logging.basicConfig(level=logging.DEBUG)  # Adjust level as needed
 logger = logging.getLogger(__name__)
 
@@ -24,24 +16,120 @@ def create_app():
     Returns:
         app (Flask): Configured Flask application.
     """
+    # Imported here so importing this module stays cheap; nothing below
+    # connects to the database until the first request needs it
+    import database
+    import compression
+    from extensions import bcrypt, cors
+    from resilience import breakers, stale_cache
+    from serialization import FastJSONProvider
+    from rate_limit import login_throttle
+    from cache import user_cache
+    from tokens import token_service
+    from events import change_feed
+    from storage import storage
+    from upload_pipeline import upload_pipeline
+    from audit import audit_log
+    from profiling import profiler
+    from routes.admin import admin_bp
+    from routes.student import student_bp
+    from routes.auth_routes import auth_bp
+    from routes.health import health_bp
+
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     # Configure CORS to allow requests from frontend
-    CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+    cors.init_app(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
     # Load configuration from environment variables
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your_default_secret_key')
     app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
+    bcrypt.init_app(app)
+
+    # Database connections (DB_*; the older MYSQL_* names are read as fallbacks)
+    app.config['DB_CONNECT_TIMEOUT'] = int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+    app.config['DB_QUERY_TIMEOUT'] = int(os.getenv('DB_QUERY_TIMEOUT', 10))
+    # Circuit breaker: fail fast for DB_BREAKER_RESET_TIMEOUT seconds after
+    # DB_BREAKER_FAILURES consecutive failures; some reads are then served stale
+    app.config['DB_BREAKER_FAILURES'] = int(os.getenv('DB_BREAKER_FAILURES', 5))
+    app.config['DB_BREAKER_RESET_TIMEOUT'] = float(os.getenv('DB_BREAKER_RESET_TIMEOUT', 30))
+    app.config['STALE_CACHE_TTL'] = int(os.getenv('STALE_CACHE_TTL', 24 * 3600))
+    app.config['STALE_CACHE_MAX_ENTRIES'] = int(os.getenv('STALE_CACHE_MAX_ENTRIES', 5000))
+    breakers.init_app(app)
+    stale_cache.init_app(app)
+    database.init_app(app)
+
+    # Login throttling: "<attempts>/<seconds>" per client IP and per email
+    app.config['LOGIN_RATE_LIMIT_IP'] = os.getenv('LOGIN_RATE_LIMIT_IP', '20/60')
+    app.config['LOGIN_RATE_LIMIT_EMAIL'] = os.getenv('LOGIN_RATE_LIMIT_EMAIL', '5/300')
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.getenv('RATE_LIMIT_MAX_KEYS', 10000))
+    app.config['RATE_LIMIT_REDIS_URL'] = os.getenv('RATE_LIMIT_REDIS_URL')
+    login_throttle.init_app(app)
+
+    # Email -> user lookup cache for signup and add-user existence checks
+    app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 300))
+    app.config['USER_CACHE_NEGATIVE_TTL'] = int(os.getenv('USER_CACHE_NEGATIVE_TTL', 30))
+    app.config['USER_CACHE_MAX_ENTRIES'] = int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000))
+    app.config['USER_CACHE_BLOOM'] = os.getenv('USER_CACHE_BLOOM', 'false').lower() == 'true'
+    user_cache.init_app(app)
+
+    # Optional signed bearer tokens; when enabled JWT_SIGNING_KEYS ("kid:secret,..."
+    # with the active key first) is required
+    app.config['JWT_ENABLED'] = os.getenv('JWT_ENABLED', 'false').lower() == 'true'
+    app.config['JWT_SIGNING_KEYS'] = os.getenv('JWT_SIGNING_KEYS')
+    app.config['JWT_ACCESS_TTL'] = int(os.getenv('JWT_ACCESS_TTL', 900))
+    app.config['JWT_REFRESH_TTL'] = int(os.getenv('JWT_REFRESH_TTL', 14 * 24 * 3600))
+    token_service.init_app(app)
+
+    # gzip/brotli response compression for bodies above COMPRESS_MIN_SIZE bytes
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    compression.init_app(app)
+
+    # Admin change feed; set CHANGE_FEED_REDIS_URL to share events across workers
+    app.config['CHANGE_FEED_REDIS_URL'] = os.getenv('CHANGE_FEED_REDIS_URL')
+    change_feed.init_app(app)
 
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(student_bp, url_prefix='/api/students')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(health_bp)
 
     @app.route('/')
     def home():
         return "Welcome to the Flask Backend!"
 
+    # Upload storage: 'local' (sharded under UPLOAD_FOLDER) or 's3'
+    app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'local')
+    app.config['S3_BUCKET'] = os.getenv('S3_BUCKET')
+    app.config['S3_PREFIX'] = os.getenv('S3_PREFIX', '')
+    app.config['S3_ENDPOINT_URL'] = os.getenv('S3_ENDPOINT_URL')
+    app.config['S3_REGION'] = os.getenv('S3_REGION')
+    storage.init_app(app)
+
+    # Upload validation: scanner is 'basic', 'stub' or "module:Class"; 0 workers scans inline
+    app.config['UPLOAD_SCANNER'] = os.getenv('UPLOAD_SCANNER', 'basic')
+    app.config['UPLOAD_SCAN_WORKERS'] = int(os.getenv('UPLOAD_SCAN_WORKERS', 2))
+    upload_pipeline.init_app(app)
+
+    # Audit trail: buffered per worker and written in batches
+    app.config['AUDIT_ENABLED'] = os.getenv('AUDIT_ENABLED', 'true').lower() == 'true'
+    app.config['AUDIT_QUEUE_SIZE'] = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    app.config['AUDIT_BATCH_SIZE'] = int(os.getenv('AUDIT_BATCH_SIZE', 200))
+    app.config['AUDIT_FLUSH_INTERVAL'] = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))
+    app.config['AUDIT_BLOCK_TIMEOUT'] = float(os.getenv('AUDIT_BLOCK_TIMEOUT', 0.05))
+    audit_log.init_app(app)
+
+    # Sampling profiler, off by default; when enabled it profiles a
+    # PROFILE_SAMPLE_RATE fraction of requests plus endpoints switched on via
+    # PUT /api/admin/profiling/<endpoint>. Summarise with `python profiling.py report`
+    app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', 'profiles')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))
+    app.config['PROFILE_INTERVAL'] = float(os.getenv('PROFILE_INTERVAL', 0.005))
+    profiler.init_app(app)
+
     # Ensure upload directories exist
     try:
         os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'cvs'), exist_ok=True)
@@ -0,0 +1,200 @@
+# File: audit.py
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import logging
+from flask import has_request_context, request
+from database import get_db_connection
+from auth import current_user_id
+from resilience import is_outage
+from serialization import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+INSERT_QUERY = """
+    INSERT INTO audit_log (occurred_at, action, actor_id, actor_role, student_id, intake_id, ip_address, details)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Longest pause between failed flushes while the database is unavailable
+MAX_RETRY_DELAY = 30.0
+
+
+class AuditLog:
+    """
+    Append-only audit trail of admin actions and student submissions.
+
+    record() only puts the event on a bounded in-memory queue; a writer
+    thread per worker process drains it and writes each batch with a single
+    multi-row INSERT. When the writer falls behind, record() blocks for at
+    most AUDIT_BLOCK_TIMEOUT seconds (backpressure) and then drops the event,
+    which is counted and logged. Failed batches are retried with backoff.
+
+    Config:
+        AUDIT_ENABLED: set to false to drop all events.
+        AUDIT_QUEUE_SIZE: events buffered per worker.
+        AUDIT_BATCH_SIZE: most events written per INSERT.
+        AUDIT_FLUSH_INTERVAL: seconds between flushes of a partial batch.
+        AUDIT_BLOCK_TIMEOUT: seconds record() may wait for queue space.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.batch_size = 200
+        self.flush_interval = 1.0
+        self.block_timeout = 0.05
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Events queued or being written; _idle is set whenever it is zero
+        self._pending = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._idle_lock = threading.Lock()
+        # Guards the counters below, which record() and the writer both update
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_error = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get('AUDIT_ENABLED', True)
+        self.batch_size = int(app.config.get('AUDIT_BATCH_SIZE', 200))
+        self.flush_interval = float(app.config.get('AUDIT_FLUSH_INTERVAL', 1.0))
+        self.block_timeout = float(app.config.get('AUDIT_BLOCK_TIMEOUT', 0.05))
+        self._queue = queue.Queue(maxsize=int(app.config.get('AUDIT_QUEUE_SIZE', 10000)))
+        atexit.register(self.flush, 5.0)
+
+    def _ensure_writer(self):
+        # Started lazily, and again in each forked worker, since threads do not survive fork
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def record(self, action, student_id=None, intake_id=None, actor_role=None, details=None, actor_id=None):
+        """
+        Queue an audit event. The actor defaults to the authenticated caller.
+        Returns:
+            True if the event was queued, False if it was dropped.
+        """
+        if not self.enabled:
+            return False
+        ip_address = None
+        if has_request_context():
+            if actor_id is None:
+                actor_id = current_user_id()
+            ip_address = request.remote_addr
+        event = (
+            datetime.utcnow(), action, actor_id, actor_role, student_id, intake_id, ip_address,
+            dumps_bytes(details).decode('utf-8') if details is not None else None,
+        )
+
+        self._ensure_writer()
+        # Counted before it is queued, so flush() cannot see an idle writer
+        # while this event is on its way
+        with self._idle_lock:
+            self._pending += 1
+            self._idle.clear()
+        try:
+            self._queue.put(event, timeout=self.block_timeout)
+        except queue.Full:
+            self._finished(1)
+            with self._stats_lock:
+                self.dropped += 1
+            logger.error(f"Audit queue full; dropped {action} event for student {student_id}.")
+            return False
+        return True
+
+    def _finished(self, count):
+        with self._idle_lock:
+            self._pending -= count
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.set()
+
+    def _next_batch(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        batch = []
+        delay = self.flush_interval
+        while True:
+            if not batch:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed_flushes += 1
+                    self.last_error = str(e)
+                if not is_outage(e):
+                    # Retrying cannot fix a batch the server rejected
+                    with self._stats_lock:
+                        self.dropped += len(batch)
+                    self._finished(len(batch))
+                    logger.error(f"Audit flush rejected; dropped {len(batch)} event(s): {e}")
+                    batch = []
+                    continue
+                logger.error(f"Audit flush of {len(batch)} event(s) failed; retrying in {delay:.0f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            with self._stats_lock:
+                self.written += len(batch)
+            self._finished(len(batch))
+            batch = []
+            delay = self.flush_interval
+
+    @staticmethod
+    def _write(batch):
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        try:
+            # executemany folds the rows into one multi-row INSERT
+            cursor.executemany(INSERT_QUERY, batch)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued event has been written. Returns False on timeout.
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return self._queue.empty()
+        return self._idle.wait(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queued': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed_flushes': self.failed_flushes,
+                'last_error': self.last_error,
+            }
+
+
+audit_log = AuditLog()
@@ -0,0 +1,144 @@
+# File: auth.py
+
+from flask import request, jsonify, session, g
+from functools import wraps
+import logging
+from extensions import cnxpool
+from tokens import token_service, TokenError
+
+logger = logging.getLogger(__name__)
+
+
+def get_bearer_token():
+    """
+    Return the bearer token from the Authorization header, if any.
+    """
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        return token.strip()
+    return None
+
+
+class CurrentUser:
+    """
+    The authenticated caller for the current request.
+
+    Only the user id is required up front. The role comes from the token or
+    session when present; anything else (name, email) is loaded from the
+    users table the first time a handler asks for it.
+    """
+
+    def __init__(self, user_id, role=None, name=None, source='session'):
+        self.id = user_id
+        self.source = source
+        self._role = role
+        self._name = name
+        self._profile = None
+
+    @property
+    def role(self):
+        if self._role is None:
+            self._role = self.profile.get('role')
+        return self._role
+
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = self.profile.get('name')
+        return self._name
+
+    @property
+    def profile(self):
+        """
+        The user's row from the users table, fetched at most once per request.
+        """
+        if self._profile is None:
+            self._profile = _load_profile(self.id) or {}
+        return self._profile
+
+    def has_role(self, *roles):
+        return self.role in roles
+
+
+def _load_profile(user_id):
+    conn = None
+    cursor = None
+    try:
+        conn = cnxpool.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, name, email, role FROM users WHERE id = %s", (user_id,))
+        return cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Error loading profile for user_id {user_id}: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn and conn.is_connected():
+            conn.close()
+
+
+def _resolve_current_user():
+    token = get_bearer_token()
+    if token and token_service.enabled:
+        try:
+            payload = token_service.verify(token)
+        except TokenError as e:
+            logger.debug(f"Rejected bearer token: {e}")
+            return None
+        return CurrentUser(int(payload['sub']), payload.get('role'), payload.get('name'), source='token')
+
+    if 'user_id' in session:
+        return CurrentUser(session['user_id'], session.get('user_role'), session.get('user_name'))
+    return None
+
+
+def get_current_user():
+    """
+    Resolve the caller once per request and cache it on g.current_user.
+    Returns:
+        CurrentUser, or None if the caller is anonymous.
+    """
+    if 'current_user' not in g:
+        g.current_user = _resolve_current_user()
+    return g.current_user
+
+
+def current_user_id():
+    user = get_current_user()
+    return user.id if user else None
+
+
+def login_required(f):
+    """
+    Decorator to require authentication (bearer token or session).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if get_current_user() is None:
+            return jsonify({'message': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def role_required(*roles, message='Insufficient privileges'):
+    """
+    Decorator factory requiring an authenticated user with one of the given
+    roles. Implies login_required; message is returned with the 403.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = get_current_user()
+            if user is None:
+                return jsonify({'message': 'Authentication required'}), 401
+            if not user.has_role(*roles):
+                return jsonify({'message': message}), 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+# Decorator to require admin privileges. Implies login_required.
+admin_required = role_required('admin', message='Admin privileges required')
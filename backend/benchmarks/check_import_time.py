@@ -0,0 +1,102 @@
+# File: benchmarks/check_import_time.py
+"""
+Measure cold import time of the app module and the cost of create_app(), and
+fail when either exceeds its budget. Each run uses a fresh interpreter so
+nothing is already imported. Neither step may need a running database.
+
+Usage (from backend/):
+    python benchmarks/check_import_time.py [--runs 5] [--import-budget 300] [--create-budget 500] [--top 10]
+
+Exits with status 1 when the median of either measurement is over budget, so
+it can run as a CI step; tests/test_import_time.py runs the same check under
+pytest.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default budgets, in milliseconds
+IMPORT_BUDGET_MS = 300
+CREATE_BUDGET_MS = 500
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_ms': (created - imported) * 1000}))
+"""
+
+
+def measure_once():
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs):
+    """
+    Return the median (import_ms, create_ms) over runs fresh interpreters.
+    """
+    results = [measure_once() for _ in range(runs)]
+    return (
+        statistics.median(run['import_ms'] for run in results),
+        statistics.median(run['create_ms'] for run in results),
+    )
+
+
+def slowest_imports(limit):
+    """
+    Return the modules with the largest cumulative import time for `import app`.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only top-level entries; nested ones are counted in their parent
+        if not name.startswith('   '):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check app import/startup time against a budget.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS, help='milliseconds for `import app`')
+    parser.add_argument('--create-budget', type=float, default=CREATE_BUDGET_MS, help='milliseconds for create_app()')
+    parser.add_argument('--top', type=int, default=10, help='show the N slowest top-level imports')
+    args = parser.parse_args()
+
+    import_ms, create_ms = measure(args.runs)
+
+    print(f"import app    median {import_ms:7.1f} ms  (budget {args.import_budget:.0f} ms)")
+    print(f"create_app()  median {create_ms:7.1f} ms  (budget {args.create_budget:.0f} ms)")
+    if args.top:
+        print("\nSlowest top-level imports:")
+        for cumulative_ms, name in slowest_imports(args.top):
+            print(f"  {cumulative_ms:7.1f} ms  {name}")
+
+    over = import_ms > args.import_budget or create_ms > args.create_budget
+    if over:
+        print("\nStartup time is over budget.")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
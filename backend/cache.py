@@ -0,0 +1,201 @@
+# File: cache.py
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned by TTLCache.get on a miss, so None can be cached as a value
+MISS = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISS):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'entries': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter. A negative answer from might_contain is definite.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        positions = list(self._positions(item))
+        # |= on a bytearray item is a read-modify-write; concurrent adds could lose bits
+        with self._lock:
+            for pos in positions:
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class UserLookupCache:
+    """
+    Caches users.email lookups for the signup and add-user existence checks.
+
+    Found users (without their password hash) are cached with USER_CACHE_TTL,
+    unknown emails in a smaller negative cache with USER_CACHE_NEGATIVE_TTL.
+    With USER_CACHE_BLOOM enabled, a Bloom filter loaded from the users table
+    answers "definitely not registered" without a query. The filter only
+    learns about users created by this process, so enable it only for
+    single-worker deployments.
+
+    All of this is per process, so a user created on another worker can
+    still look unknown here until the negative entry expires. Login therefore
+    never trusts a cached miss: it reads credentials from the database (see
+    User.get_credentials).
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.positive = TTLCache(10000, 300)
+        self.negative = TTLCache(10000, 30)
+        self.bloom = None
+        self.bloom_capacity = 100000
+        self._bloom_ready = False
+        self._bloom_lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Configure cache sizes and TTLs from the app config.
+        """
+        self.enabled = app.config.get('USER_CACHE_ENABLED', True)
+        max_entries = int(app.config.get('USER_CACHE_MAX_ENTRIES', 10000))
+        self.positive = TTLCache(max_entries, int(app.config.get('USER_CACHE_TTL', 300)))
+        self.negative = TTLCache(max_entries, int(app.config.get('USER_CACHE_NEGATIVE_TTL', 30)))
+        self.bloom_capacity = int(app.config.get('USER_CACHE_BLOOM_CAPACITY', 100000))
+        self.bloom = BloomFilter(self.bloom_capacity) if app.config.get('USER_CACHE_BLOOM') else None
+        self._bloom_ready = False
+
+    @staticmethod
+    def _key(email):
+        # MySQL compares emails case-insensitively under the default collation
+        return email.strip().lower()
+
+    def _warm_bloom(self, cursor):
+        with self._bloom_lock:
+            if self._bloom_ready:
+                return
+            cursor.execute("SELECT email FROM users")
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    email = row['email'] if isinstance(row, dict) else row[0]
+                    self.bloom.add(self._key(email))
+            self._bloom_ready = True
+            logger.debug("User email Bloom filter loaded.")
+
+    def lookup(self, cursor, email):
+        """
+        Return the cached user dict, None for a cached miss, or MISS when the
+        database has to be queried.
+        """
+        if not self.enabled:
+            return MISS
+        key = self._key(email)
+
+        user = self.positive.get(key)
+        if user is not MISS:
+            return dict(user)
+        if self.negative.get(key) is not MISS:
+            return None
+
+        if self.bloom is not None:
+            if not self._bloom_ready:
+                self._warm_bloom(cursor)
+            if not self.bloom.might_contain(key):
+                self.negative.set(key, True)
+                return None
+        return MISS
+
+    def store(self, email, user):
+        """
+        Remember the result of a database lookup.
+        """
+        if not self.enabled:
+            return
+        key = self._key(email)
+        if user:
+            self.positive.set(key, {k: v for k, v in user.items() if k != 'password_hash'})
+            self.negative.delete(key)
+        else:
+            self.negative.set(key, True)
+
+    def invalidate(self, email):
+        """
+        Forget cached state for email after the users table changed.
+        """
+        key = self._key(email)
+        self.positive.delete(key)
+        self.negative.delete(key)
+        if self.bloom is not None:
+            self.bloom.add(key)
+
+    def stats(self):
+        return {'positive': self.positive.stats(), 'negative': self.negative.stats()}
+
+
+user_cache = UserLookupCache()
@@ -0,0 +1,80 @@
+# File: compression.py
+
+import gzip
+from flask import request
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/javascript',
+}
+
+
+def compress(data, encoding, level=None):
+    """
+    Compress data with the given content-coding ('br' or 'gzip').
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=4 if level is None else level)
+    return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the best content-coding the client accepts.
+    """
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def init_app(app):
+    """
+    Compress eligible responses negotiated from Accept-Encoding.
+
+    Config:
+        COMPRESS_MIN_SIZE: bodies smaller than this are sent uncompressed.
+        COMPRESS_ENABLED: set to False to turn compression off.
+    """
+    min_size = int(app.config.get('COMPRESS_MIN_SIZE', 1024))
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config.get('COMPRESS_ENABLED', True):
+            return response
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.status_code == 204
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+
+        # The encoded body is a different representation, so a strong ETag becomes weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        logger.debug(f"Compressed {request.path} with {encoding}: {len(data)} -> {response.content_length} bytes")
+        return response
@@ -35,4 +35,9 @@ def create_default_admin():
             conn.close()
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    import logging
+
+    load_dotenv()
+    logging.basicConfig(level=logging.DEBUG)
     create_default_admin()
\ No newline at end of file
@@ -1,46 +1,366 @@
 # database.py
 
 import os
+import itertools
+import threading
+import time
 import logging
 import mysql.connector
-from mysql.connector import Error
-from dotenv import load_dotenv
+from mysql.connector import Error, pooling
+from mysql.connector.constants import DEFAULT_CONFIGURATION
+from flask import g, has_request_context
+from resilience import breakers, DatabaseUnavailable
+from cache import TTLCache
 
-# Load environment variables from a .env file
-load_dotenv()
-
-# Configure Logging
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to INFO or WARNING in production
 
-handler = logging.StreamHandler()
-formatter = logging.Formatter(
-    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+try:
+    import redis
+except ImportError:  # redis is only needed to share recent writes across workers
+    redis = None
+
+
+def _parse_replicas(spec, primary):
+    """
+    Parse DB_REPLICAS ("host:port,host:port") into connection configs that
+    share the primary's credentials and database.
+    """
+    replicas = []
+    for item in (spec or '').split(','):
+        host, _, port = item.strip().partition(':')
+        if host:
+            replicas.append(dict(primary, host=host, port=int(port or 3306)))
+    return replicas
+
+
+class DatabaseSettings:
+    """
+    Connection settings, read from the app config by init_app or from the
+    environment on first use by scripts that run without the app.
+    """
+
+    def __init__(self, get):
+        def setting(name, legacy_name, default):
+            # Deployments that only set the auth pool's MYSQL_* names keep working
+            value = get(name, None)
+            if value is None:
+                value = get(legacy_name, None)
+            return default if value is None else value
+
+        # Primary database
+        self.primary = {
+            'host': setting('DB_HOST', 'MYSQL_HOST', 'localhost'),
+            'user': setting('DB_USER', 'MYSQL_USER', 'your_mysql_username'),
+            'password': setting('DB_PASSWORD', 'MYSQL_PASSWORD', 'your_mysql_password'),
+            'database': setting('DB_NAME', 'MYSQL_DB', 'your_database_name'),
+            'port': int(setting('DB_PORT', 'MYSQL_PORT', 3306)),
+            # Bound how long a slow or unreachable server can hold a worker
+            'connection_timeout': int(get('DB_CONNECT_TIMEOUT', 5)),
+        }
+        # Per-socket-read/write limits need a connector release that supports them
+        query_timeout = int(get('DB_QUERY_TIMEOUT', 10))
+        if query_timeout and 'read_timeout' in DEFAULT_CONFIGURATION:
+            self.primary['read_timeout'] = query_timeout
+            self.primary['write_timeout'] = query_timeout
+        # Read replicas for read-only queries
+        self.replicas = _parse_replicas(get('DB_REPLICAS', None), self.primary)
+        # Replicas further behind the primary than this (seconds) are skipped
+        self.replica_max_lag = float(get('REPLICA_MAX_LAG', 5))
+        # How long a measured replica lag is trusted before it is checked again
+        self.replica_lag_check_interval = float(get('REPLICA_LAG_CHECK_INTERVAL', 5))
+        # After committing a write, the same user's reads go to the primary for this long
+        self.read_after_write_window = float(get('READ_AFTER_WRITE_WINDOW', 5))
+        # Share those recent writes across workers; per process when unset
+        self.read_after_write_redis_url = get('READ_AFTER_WRITE_REDIS_URL', None)
+        # Connections kept open per server; 0 opens a fresh connection every time
+        self.pool_size = int(get('DB_POOL_SIZE', 5))
+
+
+class ReplicaRouter:
+    """
+    Round-robins read-only connections across replicas, skipping any whose
+    replication lag exceeds REPLICA_MAX_LAG or cannot be determined.
+    """
+
+    def __init__(self, replicas, max_lag, check_interval):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._lag = {}
+        self._lock = threading.Lock()
+
+    def candidates(self):
+        """
+        Replicas in the order they should be tried for this read.
+        """
+        if not self.replicas:
+            return []
+        start = next(self._next) % len(self.replicas)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def lag_ok(self, replica, connection):
+        """
+        Check the replica's lag, reusing a recent measurement when available.
+        """
+        key = (replica['host'], replica['port'])
+        now = time.monotonic()
+        with self._lock:
+            cached = self._lag.get(key)
+        if cached is None or now - cached[0] > self.check_interval:
+            lag = self._measure_lag(connection)
+            with self._lock:
+                self._lag[key] = (now, lag)
+        else:
+            lag = cached[1]
+        return lag is not None and lag <= self.max_lag
+
+    @staticmethod
+    def _measure_lag(connection):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            for statement, column in (
+                ("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),
+                ("SHOW SLAVE STATUS", 'Seconds_Behind_Master'),
+            ):
+                try:
+                    cursor.execute(statement)
+                    row = cursor.fetchone()
+                    cursor.fetchall()
+                except Error:
+                    continue
+                # No row means replication is not configured; NULL means it is stopped
+                return row.get(column) if row else None
+            return None
+        finally:
+            cursor.close()
+
+    def stats(self):
+        with self._lock:
+            return {f"{host}:{port}": lag for (host, port), (_, lag) in self._lag.items()}
+
+
+class RecentWrites:
+    """
+    Remembers which users committed a write in the last window seconds, so
+    their reads skip replicas that may not have it yet (read-your-writes).
+
+    Keyed by user id rather than the Flask session, so bearer-token clients
+    are covered too. Marks are kept per process unless a Redis URL is given;
+    if Redis fails, reads go to the primary.
+    """
+
+    def __init__(self, window, redis_url=None, max_entries=10000):
+        self.window = window
+        self._local = TTLCache(max_entries=max_entries, ttl=window)
+        self._client = None
+        if redis_url:
+            if redis is None:
+                raise RuntimeError("redis package is required for READ_AFTER_WRITE_REDIS_URL")
+            self._client = redis.Redis.from_url(redis_url)
+
+    @staticmethod
+    def _key(identity):
+        return f"db:last_write:{identity}"
+
+    def mark(self, identity):
+        if identity is None or self.window <= 0:
+            return
+        if self._client is not None:
+            try:
+                self._client.set(self._key(identity), 1, px=int(self.window * 1000))
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Could not share recent write for user {identity}: {e}")
+        self._local.set(identity, True)
+
+    def recent(self, identity):
+        if identity is None or self.window <= 0:
+            return False
+        if self._local.get(identity, None) is not None:
+            return True
+        if self._client is not None:
+            try:
+                return bool(self._client.exists(self._key(identity)))
+            except redis.RedisError as e:
+                logger.warning(f"Could not check recent writes for user {identity}: {e}")
+                return True
+        return False
+
+
+_settings = None
+replica_router = None
+recent_writes = None
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def configure(get=None):
+    """
+    Load the connection settings and drop any existing pools.
+    Args:
+        get: callable(name, default) returning a setting; defaults to os.getenv.
+    """
+    global _settings, replica_router, recent_writes
+    settings = DatabaseSettings(get or os.getenv)
+    with _pools_lock:
+        _settings = settings
+        replica_router = ReplicaRouter(
+            settings.replicas, settings.replica_max_lag, settings.replica_lag_check_interval
+        )
+        recent_writes = RecentWrites(settings.read_after_write_window, settings.read_after_write_redis_url)
+        _pools.clear()
+
+
+def init_app(app):
+    """
+    Configure connections from the app config, falling back to the environment.
+    Nothing connects until the first get_db_connection().
+    """
+    configure(lambda name, default: app.config.get(name, os.getenv(name, default)))
+
+
+def _get_settings():
+    if _settings is None:
+        configure()
+    return _settings
+
+
+# Session state a borrower can change through this app's code, put back on
+# checkout. Connections are opened with autocommit off.
+_RESET_SESSION_SQL = (
+    "SET SESSION autocommit = 0, time_zone = DEFAULT, sql_mode = DEFAULT, "
+    "transaction_isolation = DEFAULT"
 )
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
 
-# Database configuration using environment variables
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'user': os.getenv('DB_USER', 'your_mysql_username'),
-    'password': os.getenv('DB_PASSWORD', 'your_mysql_password'),
-    'database': os.getenv('DB_NAME', 'your_database_name'),
-    'port': int(os.getenv('DB_PORT', 3306))
-}
 
-def get_db_connection():
+def _reset_session(connection):
     """
-    Establishes and returns a new database connection.
-    Returns:
-        connection (mysql.connector.connection_cext.CMySQLConnection): Database connection object.
+    Discard what a previous borrower left behind: an open transaction and
+    changed session settings. The pool does not reset sessions itself, since
+    COM_RESET_CONNECTION would also drop the prepared statements cached on
+    the connection (see queries.py). The app does not use user variables,
+    temporary tables or named locks, which this does not clear.
     """
+    connection.rollback()
+    cursor = connection.cursor()
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            logger.debug("Successfully connected to the database.")
+        cursor.execute(_RESET_SESSION_SQL)
+    finally:
+        cursor.close()
+
+
+def _get_pool(config):
+    """
+    Lazily create one pool per server. Sessions are reset by _reset_session
+    on checkout rather than by the pool, so the prepared statements cached
+    on each connection survive between requests.
+    """
+    key = (config['host'], config['port'])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = pooling.MySQLConnectionPool(
+                pool_name=f"gradpath_{config['host']}_{config['port']}",
+                pool_size=_settings.pool_size,
+                pool_reset_session=False,
+                **config
+            )
+        return _pools[key]
+
+
+def _connect(config):
+    """
+    Connect to one server through its circuit breaker.
+    Raises:
+        DatabaseUnavailable: the circuit is open or the server did not answer.
+    """
+    host, port = config['host'], config['port']
+    breaker = breakers.guard(host, port)
+    if _get_settings().pool_size > 0:
+        connection = None
+        try:
+            connection = _get_pool(config).get_connection()
+            _reset_session(connection)
+            breaker.connected()
             return connection
+        except pooling.PoolError:
+            logger.warning(f"Connection pool for {host}:{port} exhausted; connecting directly.")
+        except Error as e:
+            if connection is not None:
+                # Hand the borrowed connection back, or the pool shrinks for good
+                try:
+                    connection.close()
+                except Error:
+                    pass
+            breaker.record_failure()
+            logger.error(f"Error connecting to the database at {host}:{port}: {e}")
+            raise DatabaseUnavailable(f"Database at {host}:{port} is unreachable.") from e
+    try:
+        connection = mysql.connector.connect(**config)
+        logger.debug(f"Successfully connected to the database at {host}:{port}.")
+        breaker.connected()
+        return connection
+    except Error as e:
+        breaker.record_failure()
+        logger.error(f"Error connecting to the database at {host}:{port}: {e}")
+        raise DatabaseUnavailable(f"Database at {host}:{port} is unreachable.") from e
+
+
+def rollback(connection):
+    """
+    Roll back the connection's open transaction. Errors are logged rather
+    than raised, since during an outage the connection may already be gone.
+    """
+    try:
+        if connection.is_connected():
+            connection.rollback()
     except Error as e:
-        logger.error(f"Error connecting to the database: {e}")
-    return None
\ No newline at end of file
+        logger.warning(f"Rollback failed: {e}")
+
+
+def _caller_id():
+    """
+    The authenticated user for the current request, if it has been resolved.
+    """
+    if not has_request_context():
+        return None
+    user = g.get('current_user')
+    return user.id if user is not None else None
+
+
+def commit(connection, user_id=None):
+    """
+    Commit the connection's transaction and record that user_id (default: the
+    authenticated caller) wrote, so their reads stay on the primary for
+    READ_AFTER_WRITE_WINDOW seconds.
+    """
+    connection.commit()
+    _get_settings()
+    recent_writes.mark(user_id if user_id is not None else _caller_id())
+
+
+def get_db_connection(read_only=False):
+    """
+    Establishes and returns a new database connection.
+
+    With read_only=True the connection may come from a read replica, unless
+    the caller committed a write through commit() recently (read-your-writes)
+    or no replica is healthy, in which case the primary is used.
+    Returns:
+        connection (mysql.connector.connection_cext.CMySQLConnection): Database connection object.
+    Raises:
+        DatabaseUnavailable: the primary's circuit is open or it cannot be reached.
+    """
+    settings = _get_settings()
+    if read_only and settings.replicas and not recent_writes.recent(_caller_id()):
+        for replica in replica_router.candidates():
+            try:
+                connection = _connect(replica)
+            except DatabaseUnavailable:
+                continue
+            if replica_router.lag_ok(replica, connection):
+                return connection
+            logger.warning(f"Replica {replica['host']}:{replica['port']} is lagging; skipping.")
+            connection.close()
+
+    return _connect(settings.primary)
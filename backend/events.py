@@ -0,0 +1,250 @@
+# File: events.py
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+import logging
+from serialization import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the multi-worker broker
+    redis = None
+
+
+class LocalBroker:
+    """
+    In-process broker: published messages are delivered straight back to this
+    worker's subscribers. Good for a single worker, development and tests, and
+    a stand-in for RedisBroker.
+
+    Ids count up from the start time in microseconds, so a restarted worker
+    never reissues an id a client already holds. They mean nothing to other
+    workers; a client that resumes with an unknown id is told to reload.
+    """
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self._ids = itertools.count(time.time_ns() // 1000)
+
+    def next_id(self):
+        return next(self._ids)
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def close(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Redis pub/sub broker so every worker's subscribers see events published by
+    any worker. Event ids come from a shared Redis counter, so a client that
+    reconnects to another worker can resume from its Last-Event-ID. A daemon
+    thread relays channel messages to this worker and resubscribes after a
+    connection error.
+    """
+
+    # Seconds between resubscribe attempts, doubling up to the maximum
+    RECONNECT_DELAY = 1
+    MAX_RECONNECT_DELAY = 30
+
+    def __init__(self, deliver, url, channel='gradpath:changes'):
+        if redis is None:
+            raise RuntimeError("redis package is required for CHANGE_FEED_REDIS_URL")
+        self.deliver = deliver
+        self.channel = channel
+        self.sequence_key = f"{channel}:last_id"
+        self.client = redis.Redis.from_url(url)
+        self._closed = threading.Event()
+        self._pubsub = self._subscribe()
+        self._thread = threading.Thread(target=self._listen, name='change-feed-redis', daemon=True)
+        self._thread.start()
+
+    def _subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self):
+        delay = self.RECONNECT_DELAY
+        while not self._closed.is_set():
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self._subscribe()
+                    logger.info(f"Resubscribed to change feed channel {self.channel}.")
+                for item in self._pubsub.listen():
+                    delay = self.RECONNECT_DELAY
+                    try:
+                        self.deliver(item['data'])
+                    except Exception as e:
+                        logger.error(f"Error relaying change feed message: {e}")
+                return
+            except (redis.RedisError, OSError) as e:
+                if self._closed.is_set():
+                    return
+                logger.error(f"Change feed lost its Redis subscription: {e}; retrying in {delay}s.")
+                try:
+                    self._pubsub.close()
+                except Exception:
+                    pass
+                self._pubsub = None
+                self._closed.wait(delay)
+                delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def next_id(self):
+        return self.client.incr(self.sequence_key)
+
+    def publish(self, message):
+        self.client.publish(self.channel, message)
+
+    def close(self):
+        self._closed.set()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+# Sent instead of a replay when a client's Last-Event-ID cannot be resumed
+RESET_EVENT = 'reset'
+
+
+class Subscription:
+    """
+    A subscriber's bounded event queue. When a slow client falls behind the
+    oldest undelivered events are dropped.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class ChangeFeed:
+    """
+    Pub/sub hub for student data changes, streamed to admins as server-sent
+    events. Recent events are kept so reconnecting clients can resume from
+    Last-Event-ID.
+    """
+
+    def __init__(self):
+        self.history_size = 256
+        self.queue_size = 100
+        self.heartbeat = 15
+        self._history = deque(maxlen=self.history_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.broker = LocalBroker(self._deliver)
+
+    def init_app(self, app):
+        """
+        Configure the broker and buffer sizes from the app config.
+        """
+        self.history_size = int(app.config.get('CHANGE_FEED_HISTORY', 256))
+        self.queue_size = int(app.config.get('CHANGE_FEED_QUEUE_SIZE', 100))
+        self.heartbeat = int(app.config.get('CHANGE_FEED_HEARTBEAT', 15))
+        self._history = deque(maxlen=self.history_size)
+
+        redis_url = app.config.get('CHANGE_FEED_REDIS_URL')
+        self.broker.close()
+        if redis_url:
+            self.broker = RedisBroker(self._deliver, redis_url)
+        else:
+            self.broker = LocalBroker(self._deliver)
+
+    def publish(self, event_type, **data):
+        """
+        Publish a change. Never raises, so callers can publish after a commit
+        without risking the response.
+        """
+        try:
+            event_id = self.broker.next_id()
+            message = dumps_bytes({'id': event_id, 'type': event_type, 'data': data, 'ts': time.time()})
+            self.broker.publish(message)
+        except Exception as e:
+            logger.error(f"Error publishing {event_type} event: {e}")
+
+    def _deliver(self, message):
+        event = loads(message)
+        with self._lock:
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a subscriber, replaying buffered events newer than last_event_id.
+        If last_event_id is not buffered (it was evicted, or was issued by a
+        restarted or different worker) the missed events cannot be known, so
+        the subscriber gets a RESET_EVENT telling it to reload instead.
+        """
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                ids = [event['id'] for event in self._history]
+                if last_event_id in ids:
+                    for event in self._history:
+                        if event['id'] > last_event_id:
+                            subscription.put(event)
+                else:
+                    # Resume from the newest buffered event once reloaded
+                    subscription.put({
+                        'id': ids[-1] if ids else None, 'type': RESET_EVENT, 'data': {}, 'ts': time.time(),
+                    })
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, last_event_id=None):
+        """
+        Yield SSE frames until the client disconnects. The subscription is
+        made when the response starts streaming, so a client that goes away
+        before then never registers one.
+        """
+        subscription = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = subscription.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = dumps_bytes({'data': event['data'], 'ts': event['ts']}).decode('utf-8')
+                id_line = f"id: {event['id']}\n" if event['id'] is not None else ''
+                yield f"{id_line}event: {event['type']}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'buffered': len(self._history),
+            'broker': type(self.broker).__name__,
+        }
+
+
+change_feed = ChangeFeed()
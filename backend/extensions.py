@@ -2,14 +2,10 @@
 
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
-import mysql.connector
-from mysql.connector import pooling
-import os
 import logging
-from dotenv import load_dotenv
+import database
 
-# Load environment variables from .env file
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Initialize Bcrypt
 bcrypt = Bcrypt()
@@ -17,31 +13,23 @@ bcrypt = Bcrypt()
 # Initialize CORS
 cors = CORS()
 
-# Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s %(levelname)s %(name)s : %(message)s'
-)
-logger = logging.getLogger(__name__)
 
-# Database configuration
-dbconfig = {
-    "user": os.getenv('MYSQL_USER'),
-    "password": os.getenv('MYSQL_PASSWORD'),
-    "host": os.getenv('MYSQL_HOST', 'localhost'),
-    "database": os.getenv('MYSQL_DB'),
-    "raise_on_warnings": True
-}
-
-try:
-    # Create a connection pool
-    cnxpool = pooling.MySQLConnectionPool(
-        pool_name="mypool",
-        pool_size=10,  # Increased pool size for better concurrency
-        pool_reset_session=True,
-        **dbconfig
-    )
-    logger.debug("MySQL connection pool created successfully.")
-except mysql.connector.Error as err:
-    logger.error(f"Error creating MySQL connection pool: {err}")
-    cnxpool = None
\ No newline at end of file
+class ConnectionPool:
+    """
+    Connection handle for the auth routes and scripts.
+
+    Connections are borrowed from the primary's pool in database.py, so each
+    worker keeps a single pool per server. The MYSQL_* settings this pool
+    used to read are still honoured there as fallbacks for the DB_* ones.
+    """
+
+    def get_connection(self):
+        """
+        Borrow a connection to the primary.
+        Raises DatabaseUnavailable if the server's circuit is open or it is
+        unreachable.
+        """
+        return database.get_db_connection()
+
+
+cnxpool = ConnectionPool()
@@ -0,0 +1,55 @@
+# File: http_cache.py
+
+import hashlib
+from datetime import datetime, timezone
+from flask import request, current_app
+
+
+def make_etag(*parts):
+    """
+    Build an opaque ETag value from version parts (ids, counts, timestamps).
+    """
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def latest(*timestamps):
+    """
+    Return the most recent of the given epoch timestamps as an aware UTC
+    datetime. Select them with UNIX_TIMESTAMP(): MySQL returns TIMESTAMP
+    columns in the session time zone, so a naive datetime's zone is unknown.
+    """
+    values = [ts for ts in timestamps if ts is not None]
+    if not values:
+        return None
+    return datetime.fromtimestamp(float(max(values)), tz=timezone.utc)
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Return a 304 response if the request's validators match, else None.
+    If-None-Match takes precedence over If-Modified-Since.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    """
+    Attach ETag/Last-Modified and make clients revalidate before reuse.
+    """
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
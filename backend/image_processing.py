@@ -0,0 +1,208 @@
+# File: image_processing.py
+
+import io
+import os
+import struct
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # photos are served as uploaded
+    Image = None
+
+# Longest edge in pixels for each standard photo size
+PHOTO_SIZES = {
+    'thumb': 160,
+    'medium': 640,
+    'large': 1280,
+}
+
+
+def output_format():
+    """
+    Return (PIL format, extension) for re-encoded photos: WebP when the
+    Pillow build supports it, otherwise progressive JPEG.
+    """
+    if Image is not None and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def variant_name(filename, size):
+    """
+    Name of the re-encoded variant of filename at the given standard size.
+    """
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}_{size}.{output_format()[1]}"
+
+
+# JPEG segments that carry metadata: APP1 (EXIF, XMP), APP3-APP13 (incl.
+# Photoshop/IPTC), APP15 and comments. APP0 (JFIF), APP2 (ICC profile) and
+# APP14 (Adobe colour transform) are needed to render the image correctly.
+JPEG_METADATA_MARKERS = {0xE1, 0xFE, 0xEF} | set(range(0xE3, 0xEE))
+PNG_METADATA_CHUNKS = {b'eXIf', b'tEXt', b'iTXt', b'zTXt', b'tIME'}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+EXIF_ORIENTATION = 0x0112
+
+
+def _strip_jpeg(data):
+    if data[:2] != b'\xff\xd8':
+        raise ValueError('not a JPEG')
+    out = [data[:2]]
+    pos = 2
+    while pos < len(data):
+        if data[pos] != 0xFF:
+            raise ValueError('corrupt JPEG segment')
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0xDA or marker == 0xD9:
+            # Start of scan: the rest is entropy-coded image data
+            out.append(data[pos:])
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        (length,) = struct.unpack('>H', data[pos + 2:pos + 4])
+        end = pos + 2 + length
+        if length < 2 or end > len(data):
+            raise ValueError('truncated JPEG segment')
+        if marker not in JPEG_METADATA_MARKERS:
+            out.append(data[pos:end])
+        pos = end
+    return b''.join(out)
+
+
+def _strip_png(data):
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError('not a PNG')
+    out = [PNG_SIGNATURE]
+    pos = 8
+    while pos < len(data):
+        (length,) = struct.unpack('>I', data[pos:pos + 4])
+        chunk_type = data[pos + 4:pos + 8]
+        end = pos + 12 + length
+        if end > len(data):
+            raise ValueError('truncated PNG chunk')
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            out.append(data[pos:end])
+        pos = end
+        if chunk_type == b'IEND':
+            break
+    return b''.join(out)
+
+
+def _orientation(path):
+    if Image is None:
+        return 1
+    with Image.open(path) as image:
+        return image.getexif().get(EXIF_ORIENTATION, 1)
+
+
+def strip_metadata(path):
+    """
+    Remove EXIF (including GPS), XMP, IPTC and text metadata from the JPEG or
+    PNG at path, in place. Pixels are copied unchanged, except that a photo
+    whose EXIF asks for rotation is rotated and re-encoded first so it still
+    displays upright once the tag is gone.
+    Raises:
+        ValueError: the file is not a well-formed JPEG or PNG.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:2] == b'\xff\xd8' and _orientation(path) not in (None, 1):
+        buffer = io.BytesIO()
+        with Image.open(path) as source:
+            image = ImageOps.exif_transpose(source)
+            image.save(buffer, 'JPEG', quality=95, icc_profile=source.info.get('icc_profile'))
+        data = buffer.getvalue()
+
+    stripped = _strip_png(data) if data[:8] == PNG_SIGNATURE else _strip_jpeg(data)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.strip-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(stripped)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def cap_resolution(path, max_edge=None, quality=90):
+    """
+    Scale the JPEG or PNG at path down in place so its longest edge is at
+    most max_edge (the largest standard size by default). The original is
+    served when no ?size= is given, so it must not stay at camera
+    resolution. EXIF orientation is applied; run strip_metadata afterwards.
+    Returns:
+        True if the image was rescaled.
+    """
+    if Image is None:
+        logger.warning("Pillow is not installed; photo originals keep their resolution.")
+        return False
+
+    max_edge = max_edge or max(PHOTO_SIZES.values())
+    with Image.open(path) as source:
+        if max(source.size) <= max_edge:
+            return False
+        image_format = source.format
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    save_options = {'icc_profile': icc_profile}
+    if image_format == 'JPEG':
+        save_options.update(quality=quality, progressive=True)
+        image = image.convert('RGB')
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.cap-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            image.save(out, image_format, **save_options)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+def normalize_photo(path, sizes=None, quality=80):
+    """
+    Write re-encoded copies of the photo at path next to it, one per
+    standard size. EXIF orientation is applied and then all metadata is
+    dropped. Images are only ever scaled down.
+    Returns:
+        dict mapping size name to the variant's path.
+    """
+    if Image is None:
+        logger.warning("Pillow is not installed; skipping photo normalization.")
+        return {}
+
+    sizes = sizes or PHOTO_SIZES
+    image_format, _ = output_format()
+    directory, filename = os.path.split(path)
+    variants = {}
+
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha and image_format == 'WEBP' else 'RGB')
+
+        for size, max_edge in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            variant_path = os.path.join(directory, variant_name(filename, size))
+            save_options = {'quality': quality, 'optimize': True}
+            if image_format == 'WEBP':
+                save_options['method'] = 4
+            else:
+                save_options['progressive'] = True
+            variant.save(variant_path, image_format, **save_options)
+            variants[size] = variant_path
+
+    return variants
@@ -0,0 +1,187 @@
+# File: intakes.py
+
+import argparse
+import re
+import logging
+from flask import request
+from database import get_db_connection
+from models import Intake
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = 'student_details'
+
+# Cold tables use compressed InnoDB pages; they are only read for audits/exports
+ARCHIVE_TABLE_OPTIONS = "ENGINE=InnoDB ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8"
+
+
+class InvalidIntakeId(ValueError):
+    """
+    Raised when a request's intake_id is not an integer.
+    """
+
+
+def partition_name(intake_id):
+    return f"p_intake_{int(intake_id)}"
+
+
+def archive_table_name(intake):
+    """
+    Name of the compressed cold table for an archived intake.
+    """
+    slug = re.sub(r'[^a-z0-9]+', '_', f"{intake['program']}_{intake['cycle']}".lower()).strip('_')
+    return f"student_details_archive_{int(intake['id'])}_{slug}"[:64]
+
+
+def intake_for_request(connection, data=None):
+    """
+    Resolve the intake a request refers to from its intake_id (or program)
+    parameter, read from data or the query string. Without either, the
+    current open intake is used.
+    Returns:
+        intake dict, or None if no intake matches.
+    Raises:
+        InvalidIntakeId: intake_id is present but not an integer.
+    """
+    data = request.args if data is None else data
+    intake_id = data.get('intake_id')
+    if intake_id not in (None, ''):
+        try:
+            intake_id = int(intake_id)
+        except (TypeError, ValueError):
+            raise InvalidIntakeId('intake_id must be an integer')
+    else:
+        intake_id = None
+    return Intake.resolve(connection, intake_id, data.get('program') or None)
+
+
+def create_intake(program, cycle, opens_at=None, closes_at=None):
+    """
+    Register a new intake and add its partition to student_details.
+    Returns:
+        The new intake's id.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO intakes (program, cycle, status, opens_at, closes_at) VALUES (%s, %s, 'open', %s, %s)",
+            (program, cycle, opens_at, closes_at)
+        )
+        intake_id = cursor.lastrowid
+        connection.commit()
+        # DDL commits implicitly, so the intake row is committed first; a
+        # failure here leaves an intake that accepts no rows until re-run
+        cursor.execute(
+            f"ALTER TABLE {PARTITIONED_TABLE} ADD PARTITION "
+            f"(PARTITION {partition_name(intake_id)} VALUES IN ({int(intake_id)}))"
+        )
+        logger.info(f"Created intake {intake_id} ({program} {cycle}).")
+        return intake_id
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def set_status(intake_id, status):
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("UPDATE intakes SET status = %s WHERE id = %s", (status, intake_id))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def archive_intake(intake_id):
+    """
+    Move a closed intake's applications into a compressed cold table and drop
+    its partition, so live queries never see them again.
+
+    The copy is verified by row count before the partition is dropped. Report
+    rollups already computed for these days are kept; later refreshes read
+    the archive table alongside the live one.
+    Returns:
+        (archive table name, rows archived)
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        intake = Intake.get(connection, intake_id)
+        if intake is None:
+            raise ValueError(f"Intake {intake_id} does not exist.")
+        if intake['status'] != Intake.CLOSED:
+            raise ValueError(f"Intake {intake_id} is {intake['status']}; only closed intakes can be archived.")
+
+        table = archive_table_name(intake)
+        partition = partition_name(intake_id)
+
+        cursor.execute(f"SELECT COUNT(*) AS live FROM {PARTITIONED_TABLE} PARTITION ({partition})")
+        live = cursor.fetchone()['live']
+
+        cursor.execute(
+            f"CREATE TABLE {table} (PRIMARY KEY (id), INDEX idx_user_id (user_id), INDEX idx_created_at (created_at)) {ARCHIVE_TABLE_OPTIONS} "
+            f"AS SELECT * FROM {PARTITIONED_TABLE} PARTITION ({partition})"
+        )
+        cursor.execute(f"SELECT COUNT(*) AS archived FROM {table}")
+        archived = cursor.fetchone()['archived']
+        if archived != live:
+            raise RuntimeError(
+                f"Archive of intake {intake_id} copied {archived} of {live} rows; partition kept."
+            )
+
+        cursor.execute(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {partition}")
+        cursor.execute(
+            "UPDATE intakes SET status = 'archived', archive_table = %s WHERE id = %s",
+            (table, intake_id)
+        )
+        connection.commit()
+        logger.info(f"Archived {archived} application(s) of intake {intake_id} into {table}.")
+        return table, archived
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Manage intakes and their student_details partitions.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help='open a new intake and add its partition')
+    create.add_argument('program')
+    create.add_argument('cycle')
+    create.add_argument('--opens-at', help='YYYY-MM-DD')
+    create.add_argument('--closes-at', help='YYYY-MM-DD')
+
+    close = commands.add_parser('close', help='stop accepting applications for an intake')
+    close.add_argument('intake_id', type=int)
+
+    archive = commands.add_parser('archive', help='move a closed intake into a compressed cold table')
+    archive.add_argument('intake_id', type=int)
+
+    commands.add_parser('list', help='show all intakes')
+
+    args = parser.parse_args()
+    if args.command == 'create':
+        print(f"Created intake {create_intake(args.program, args.cycle, args.opens_at, args.closes_at)}.")
+    elif args.command == 'close':
+        if not set_status(args.intake_id, Intake.CLOSED):
+            parser.exit(1, f"Intake {args.intake_id} does not exist.\n")
+        print(f"Closed intake {args.intake_id}.")
+    elif args.command == 'archive':
+        table, rows = archive_intake(args.intake_id)
+        print(f"Archived {rows} row(s) into {table}.")
+    else:
+        connection = get_db_connection()
+        try:
+            for intake in Intake.all(connection):
+                print(f"{intake['id']:>5}  {intake['program']:<20} {intake['cycle']:<15} {intake['status']}")
+        finally:
+            connection.close()
@@ -0,0 +1,325 @@
+# File: maintenance.py
+
+import argparse
+import os
+import shutil
+import time
+from contextlib import closing
+from datetime import timedelta
+import logging
+from database import get_db_connection
+from models import Intake
+from storage import storage
+from image_processing import PHOTO_SIZES
+from upload_pipeline import UPLOAD_DIRECTORIES, QUARANTINE_DIR
+
+logger = logging.getLogger(__name__)
+
+LIVE_TABLE = 'student_details'
+PATH_COLUMNS = ('transcript_path', 'cv_path', 'photo_path')
+STATUS_COLUMNS = ('transcript_status', 'cv_status', 'photo_status')
+
+# Photo variants are WebP or JPEG depending on the Pillow build that wrote them
+VARIANT_EXTENSIONS = ('webp', 'jpg')
+
+
+class Throttle:
+    """
+    Spaces calls to wait() at most rate per second; 0 disables the limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(self._next, now) + self.interval
+
+
+class Report:
+    """
+    Counters for one job run.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.scanned = 0
+        self.orphans = 0
+        self.removed = 0
+        self.bytes_reclaimed = 0
+        self.skipped = 0
+        self.rows_repaired = 0
+        self.errors = 0
+
+
+def format_bytes(size):
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB', 'TB'):
+        size /= 1024
+        if size < 1024 or unit == 'TB':
+            return f"{size:.1f} {unit}"
+
+
+def _user_id(filename):
+    """
+    Uploads are named "<user_id>_<type>_<timestamp>_<original name>".
+    Returns:
+        user_id as an int, or None for names that do not follow the scheme.
+    """
+    prefix = filename.split('_', 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def _referenced_names(path):
+    """
+    Filenames kept alive by one stored path: the file itself and, for
+    photos, its re-encoded variants.
+    """
+    filename = os.path.basename(path)
+    names = {filename}
+    stem = filename.rsplit('.', 1)[0]
+    for size in PHOTO_SIZES:
+        for ext in VARIANT_EXTENSIONS:
+            names.add(f"{stem}_{size}.{ext}")
+    return names
+
+
+class MaintenanceRunner:
+    """
+    Offline cleanup jobs, meant to run from cron:
+
+        orphaned-uploads  Files in upload storage that no application refers
+                          to any more, typically left by resubmissions.
+        quarantine        Quarantined files whose scan never finished.
+        stale-scans       Upload statuses stuck at 'quarantined'; they are
+                          marked 'rejected' so the student is asked to upload
+                          again.
+
+    Only files and rows older than min_age are touched, which keeps the jobs
+    clear of uploads still moving through the pipeline. Orphans are looked
+    up in batches by the user_id embedded in their names, against the live
+    table and every archived intake's table, so a listing of any size is
+    diffed without loading all referenced paths. Deletes (or moves, with
+    archive_dir) are limited to rate per second.
+    """
+
+    def __init__(self, upload_folder, min_age=timedelta(hours=24), batch_size=500, rate=50,
+                 archive_dir=None, dry_run=False):
+        self.upload_folder = upload_folder
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.throttle = Throttle(rate)
+        self.archive_dir = archive_dir
+        self.dry_run = dry_run
+        self.jobs = {
+            'orphaned-uploads': self.clean_orphaned_uploads,
+            'quarantine': self.clean_quarantine,
+            'stale-scans': self.repair_stale_scans,
+        }
+
+    def run(self, names=None):
+        reports = []
+        for name in names or self.jobs:
+            started = time.monotonic()
+            report = self.jobs[name]()
+            logger.info(
+                f"{name}: scanned {report.scanned}, removed {report.removed} of {report.orphans} orphan(s), "
+                f"reclaimed {format_bytes(report.bytes_reclaimed)}, repaired {report.rows_repaired} row(s) "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+            reports.append(report)
+        return reports
+
+    def _cutoff(self):
+        return time.time() - self.min_age.total_seconds()
+
+    # --- Orphaned uploads --------------------------------------------------
+
+    def clean_orphaned_uploads(self):
+        report = Report('orphaned-uploads')
+        connection = get_db_connection()
+        try:
+            tables = [LIVE_TABLE] + [
+                intake['archive_table'] for intake in Intake.all(connection) if intake['archive_table']
+            ]
+            cutoff = self._cutoff()
+            for directory in UPLOAD_DIRECTORIES.values():
+                batch = []
+                for key, size, mtime in storage.iter_keys(directory):
+                    report.scanned += 1
+                    if mtime > cutoff:
+                        continue
+                    if _user_id(key.rpartition('/')[2]) is None:
+                        report.skipped += 1
+                        continue
+                    batch.append((key, size))
+                    if len(batch) >= self.batch_size:
+                        self._remove_unreferenced(connection, tables, batch, report)
+                        batch = []
+                if batch:
+                    self._remove_unreferenced(connection, tables, batch, report)
+        finally:
+            connection.close()
+        return report
+
+    @staticmethod
+    def _referenced(connection, tables, user_ids):
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        names = set()
+        cursor = connection.cursor()
+        try:
+            for table in tables:
+                cursor.execute(
+                    f"SELECT {', '.join(PATH_COLUMNS)} FROM {table} WHERE user_id IN ({placeholders})",
+                    list(user_ids)
+                )
+                for row in cursor.fetchall():
+                    for path in row:
+                        if path:
+                            names |= _referenced_names(path)
+        finally:
+            cursor.close()
+        return names
+
+    def _remove_unreferenced(self, connection, tables, batch, report):
+        user_ids = {_user_id(key.rpartition('/')[2]) for key, _ in batch}
+        referenced = self._referenced(connection, tables, user_ids)
+        # Read-only work so far; end the snapshot so the next batch sees fresh rows
+        connection.rollback()
+        for key, size in batch:
+            if key.rpartition('/')[2] in referenced:
+                continue
+            report.orphans += 1
+            self._remove(key, size, report)
+
+    def _remove(self, key, size, report):
+        if self.dry_run:
+            report.bytes_reclaimed += size
+            return
+        self.throttle.wait()
+        try:
+            if self.archive_dir:
+                destination = os.path.join(self.archive_dir, *key.split('/'))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                with closing(storage.open(key)) as source, open(destination, 'wb') as out:
+                    shutil.copyfileobj(source, out)
+            storage.delete(key)
+        except Exception as e:
+            report.errors += 1
+            logger.error(f"Could not remove orphaned upload {key}: {e}")
+            return
+        report.removed += 1
+        report.bytes_reclaimed += size
+
+    # --- Quarantine --------------------------------------------------------
+
+    def clean_quarantine(self):
+        report = Report('quarantine')
+        cutoff = self._cutoff()
+        try:
+            entries = os.scandir(os.path.join(self.upload_folder, QUARANTINE_DIR))
+        except FileNotFoundError:
+            return report
+        with entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                report.scanned += 1
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                report.orphans += 1
+                if self.dry_run:
+                    report.bytes_reclaimed += stat.st_size
+                    continue
+                self.throttle.wait()
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue  # finished by a scan worker meanwhile
+                except OSError as e:
+                    report.errors += 1
+                    logger.error(f"Could not remove quarantined file {entry.path}: {e}")
+                    continue
+                report.removed += 1
+                report.bytes_reclaimed += stat.st_size
+        return report
+
+    # --- Stale scans -------------------------------------------------------
+
+    def repair_stale_scans(self):
+        report = Report('stale-scans')
+        # updated_at is a TIMESTAMP, returned in the session time zone, so the
+        # cutoff is computed by the server against NOW() rather than in Python
+        min_age = int(self.min_age.total_seconds())
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        try:
+            for column in STATUS_COLUMNS:
+                if self.dry_run:
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {LIVE_TABLE} WHERE {column} = 'quarantined' "
+                        f"AND updated_at < NOW() - INTERVAL %s SECOND",
+                        (min_age,)
+                    )
+                    report.rows_repaired += cursor.fetchone()[0]
+                    continue
+                # Small batches keep each UPDATE's row locks short
+                while True:
+                    self.throttle.wait()
+                    cursor.execute(
+                        f"UPDATE {LIVE_TABLE} SET {column} = 'rejected' "
+                        f"WHERE {column} = 'quarantined' AND updated_at < NOW() - INTERVAL %s SECOND LIMIT %s",
+                        (min_age, self.batch_size)
+                    )
+                    connection.commit()
+                    report.rows_repaired += cursor.rowcount
+                    if cursor.rowcount < self.batch_size:
+                        break
+        finally:
+            cursor.close()
+            connection.close()
+        return report
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+
+    parser = argparse.ArgumentParser(description='Remove orphaned uploads and repair stale upload state.')
+    parser.add_argument('jobs', nargs='*', help='orphaned-uploads, quarantine and/or stale-scans (default: all)')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be removed')
+    parser.add_argument('--archive-dir', help='move orphans here instead of deleting them')
+    parser.add_argument('--min-age-hours', type=float, default=float(os.getenv('CLEANUP_MIN_AGE_HOURS', 24)))
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('CLEANUP_BATCH_SIZE', 500)))
+    parser.add_argument('--rate', type=float, default=float(os.getenv('CLEANUP_RATE', 50)),
+                        help='most deletes (or batched updates) per second; 0 for no limit')
+    args = parser.parse_args()
+
+    runner = MaintenanceRunner(
+        app.config['UPLOAD_FOLDER'],
+        min_age=timedelta(hours=args.min_age_hours),
+        batch_size=args.batch_size,
+        rate=args.rate,
+        archive_dir=args.archive_dir,
+        dry_run=args.dry_run,
+    )
+    unknown = set(args.jobs) - set(runner.jobs)
+    if unknown:
+        parser.error(f"unknown job(s): {', '.join(sorted(unknown))}")
+    total = 0
+    for report in runner.run(args.jobs):
+        total += report.bytes_reclaimed
+        print(
+            f"{report.name:<17} scanned {report.scanned:>8}  orphans {report.orphans:>7}  "
+            f"removed {report.removed:>7}  rows repaired {report.rows_repaired:>6}  "
+            f"errors {report.errors:>4}  {format_bytes(report.bytes_reclaimed):>10}"
+        )
+    print(f"{'Would reclaim' if args.dry_run else 'Reclaimed'} {format_bytes(total)}.")
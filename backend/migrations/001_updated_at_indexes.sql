@@ -0,0 +1,6 @@
+-- Indexes backing the ETag version checks on the admin/student read endpoints.
+-- The collection version for /api/admin/students reads COUNT(*) and MAX(updated_at),
+-- which these indexes answer without scanning the wide rows.
+
+ALTER TABLE users ADD INDEX idx_users_role_updated_at (role, updated_at);
+ALTER TABLE student_details ADD INDEX idx_student_details_updated_at (updated_at);
@@ -0,0 +1,7 @@
+-- Per-file validation state for the upload pipeline.
+-- 'quarantined' while the scan is pending, then 'clean' (path column updated) or 'rejected'.
+
+ALTER TABLE student_details
+    ADD COLUMN transcript_status ENUM('quarantined', 'clean', 'rejected') NULL,
+    ADD COLUMN cv_status ENUM('quarantined', 'clean', 'rejected') NULL,
+    ADD COLUMN photo_status ENUM('quarantined', 'clean', 'rejected') NULL;
@@ -0,0 +1,26 @@
+-- Daily rollups for the admin reports. Maintained by `python reports.py`
+-- (run it from cron); report endpoints read only these tables.
+
+CREATE TABLE IF NOT EXISTS report_daily_applications (
+    day DATE NOT NULL,
+    university VARCHAR(255) NOT NULL DEFAULT '',
+    location VARCHAR(255) NOT NULL DEFAULT '',
+    status ENUM('pending', 'approved', 'rejected') NOT NULL,
+    applications INT UNSIGNED NOT NULL,
+    PRIMARY KEY (day, university, location, status)
+);
+
+-- One row per day and whole-percentage bucket (0-100)
+CREATE TABLE IF NOT EXISTS report_daily_percentage_histogram (
+    day DATE NOT NULL,
+    bucket TINYINT UNSIGNED NOT NULL,
+    applications INT UNSIGNED NOT NULL,
+    PRIMARY KEY (day, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS report_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    watermark DATETIME NOT NULL
+);
+
+ALTER TABLE student_details ADD INDEX idx_student_details_created_at (created_at);
@@ -0,0 +1,54 @@
+-- Intakes: one row per program and admission cycle. Every application
+-- (student_details row) belongs to exactly one intake, and student_details is
+-- LIST-partitioned on intake_id so queries for one intake only touch its
+-- partition. Manage intakes with `python intakes.py` which adds a partition
+-- per new intake and archives closed ones into compressed tables.
+
+CREATE TABLE IF NOT EXISTS intakes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    program VARCHAR(100) NOT NULL,
+    cycle VARCHAR(50) NOT NULL,
+    status ENUM('open', 'closed', 'archived') NOT NULL DEFAULT 'open',
+    opens_at DATE NULL,
+    closes_at DATE NULL,
+    archive_table VARCHAR(64) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_intakes_program_cycle (program, cycle),
+    INDEX idx_intakes_status (status)
+);
+
+-- Existing applications become intake 1
+INSERT INTO intakes (id, program, cycle, status) VALUES (1, 'default', 'initial', 'open');
+
+ALTER TABLE student_details ADD COLUMN intake_id INT NOT NULL DEFAULT 1 AFTER user_id;
+
+-- Partitioned InnoDB tables cannot have foreign keys, and every unique key
+-- must include the partitioning column. The user FK's ON DELETE CASCADE is
+-- replaced by a trigger (migrations/008_user_cleanup.sql); a student may hold
+-- one application per intake. If your schema also has UNIQUE (user_id), drop
+-- that index first. The FK's name depends on how the table was created, so
+-- it is looked up rather than assumed.
+SET @user_fk = (
+    SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+    WHERE CONSTRAINT_SCHEMA = DATABASE()
+      AND TABLE_NAME = 'student_details'
+      AND REFERENCED_TABLE_NAME = 'users'
+    LIMIT 1
+);
+SET @drop_user_fk = IF(
+    @user_fk IS NULL, 'DO 0', CONCAT('ALTER TABLE student_details DROP FOREIGN KEY `', @user_fk, '`')
+);
+PREPARE drop_user_fk FROM @drop_user_fk;
+EXECUTE drop_user_fk;
+DEALLOCATE PREPARE drop_user_fk;
+ALTER TABLE student_details
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, intake_id),
+    ADD UNIQUE KEY uq_student_details_user_intake (user_id, intake_id),
+    ADD INDEX idx_student_details_intake_created_at (intake_id, created_at);
+
+ALTER TABLE student_details
+    PARTITION BY LIST (intake_id) (
+        PARTITION p_intake_1 VALUES IN (1)
+    );
@@ -0,0 +1,22 @@
+-- Append-only audit trail written in batches by audit.py.
+-- Lookups page backwards by id, so each index ends in id.
+
+CREATE TABLE IF NOT EXISTS audit_log (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    occurred_at DATETIME(3) NOT NULL,
+    action VARCHAR(64) NOT NULL,
+    actor_id INT NULL,
+    actor_role VARCHAR(16) NULL,
+    student_id INT NULL,
+    intake_id INT NULL,
+    ip_address VARCHAR(45) NULL,
+    details JSON NULL,
+    INDEX idx_audit_log_student (student_id, id),
+    INDEX idx_audit_log_actor (actor_id, id)
+);
+
+-- Rows can be added but never changed or removed
+CREATE TRIGGER audit_log_no_update BEFORE UPDATE ON audit_log
+    FOR EACH ROW SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'audit_log is append-only';
+CREATE TRIGGER audit_log_no_delete BEFORE DELETE ON audit_log
+    FOR EACH ROW SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'audit_log is append-only';
@@ -0,0 +1,5 @@
+-- Refresh tokens carry the user's token_version; bumping it (on logout, role
+-- change or account removal) revokes every refresh token issued before.
+--   UPDATE users SET role = 'student', token_version = token_version + 1 WHERE id = ...;
+
+ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0;
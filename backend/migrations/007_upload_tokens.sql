@@ -0,0 +1,8 @@
+-- The quarantined filename of each document type's latest upload. A scan
+-- result is only applied while it still matches, so an older scan that
+-- finishes after a resubmission cannot overwrite the newer file.
+
+ALTER TABLE student_details
+    ADD COLUMN transcript_upload VARCHAR(255) NULL AFTER transcript_status,
+    ADD COLUMN cv_upload VARCHAR(255) NULL AFTER cv_status,
+    ADD COLUMN photo_upload VARCHAR(255) NULL AFTER photo_status;
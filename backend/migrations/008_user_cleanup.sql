@@ -0,0 +1,6 @@
+-- student_details lost its ON DELETE CASCADE to users when it was
+-- partitioned (004). Deleting a user removes their applications in every
+-- live intake here instead. Archived intakes' cold tables are left as-is.
+
+CREATE TRIGGER users_delete_applications AFTER DELETE ON users
+    FOR EACH ROW DELETE FROM student_details WHERE user_id = OLD.id;
@@ -0,0 +1,10 @@
+-- Microsecond updated_at. The collection ETag for /api/admin/students is built
+-- from COUNT(*) and MAX(updated_at); at one-second resolution an edit made in
+-- the same second as the previous one (with no change in count) left the
+-- ETag unchanged, and polling clients kept a stale list behind a 304.
+
+ALTER TABLE users
+    MODIFY updated_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+ALTER TABLE student_details
+    MODIFY updated_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
@@ -2,11 +2,25 @@
 
 import mysql.connector  # Import the mysql.connector module
 from extensions import bcrypt, cnxpool
+from cache import user_cache, MISS, TTLCache
+from queries import queries
 import logging
 from logging import getLogger
 
 logger = getLogger(__name__)
 
+# MySQL error code for a duplicate value in a unique index
+ER_DUP_ENTRY = 1062
+
+
+class DuplicateEmail(Exception):
+    """
+    Raised when a user is inserted with an email that is already registered.
+    The cached email lookup in front of the insert can miss a user created
+    moments ago by another worker; the unique index on users.email cannot.
+    """
+
+
 class User:
     def __init__(self, cursor, name, email, password_hash, role='student'):
         self.cursor = cursor
@@ -19,25 +33,69 @@ class User:
     @staticmethod
     def get_by_email(cursor, email):
         """
-        Retrieve a user from the database by email.
+        Retrieve a user's id, name, email and role by email, for existence
+        checks. Served from the user lookup cache when possible, so a user
+        just created by another worker may briefly be reported missing.
         """
         try:
-            query = "SELECT id, name, email, password_hash, role FROM users WHERE email = %s"
+            cached = user_cache.lookup(cursor, email)
+            if cached is not MISS:
+                logger.debug(f"User lookup cache hit for email: {email}")
+                return cached
+
+            query = "SELECT id, name, email, role FROM users WHERE email = %s"
             cursor.execute(query, (email,))
             result = cursor.fetchone()
             if result:
                 logger.debug(f"User found: {result['email']}")
             else:
                 logger.debug(f"No user found with email: {email}")
+            user_cache.store(email, result)
             return result
         except mysql.connector.Error as err:
             logger.exception(f"Error fetching user by email: {err}")
             return None
 
+    @staticmethod
+    def get_credentials(cursor, email):
+        """
+        Retrieve a user by email including the password hash, for login.
+        Always read from the database; a found user refreshes the lookup cache.
+        """
+        try:
+            query = "SELECT id, name, email, password_hash, role FROM users WHERE email = %s"
+            cursor.execute(query, (email,))
+            result = cursor.fetchone()
+            if result:
+                user_cache.store(email, result)
+            return result
+        except mysql.connector.Error as err:
+            logger.exception(f"Error fetching credentials by email: {err}")
+            return None
+
+    @staticmethod
+    def get_by_id(cursor, user_id):
+        """
+        Retrieve a user's current name, role and token_version by id, bypassing
+        the lookup cache. Used when issuing and refreshing tokens.
+        """
+        cursor.execute("SELECT id, name, email, role, token_version FROM users WHERE id = %s", (user_id,))
+        return cursor.fetchone()
+
+    @staticmethod
+    def revoke_tokens(cursor, user_id):
+        """
+        Invalidate every refresh token issued to the user so far.
+        """
+        cursor.execute("UPDATE users SET token_version = token_version + 1 WHERE id = %s", (user_id,))
+        cursor._connection.commit()
+
     @staticmethod
     def create_user(cursor, name, email, password, role='student'):
         """
         Create a new user in the database with a hashed password using Flask-Bcrypt.
+        Raises:
+            DuplicateEmail: the email is already registered.
         """
         try:
             # Hash the password using Flask-Bcrypt
@@ -45,11 +103,16 @@ class User:
             query = "INSERT INTO users (name, email, password_hash, role) VALUES (%s, %s, %s, %s)"
             cursor.execute(query, (name, email, hashed_password, role))
             cursor._connection.commit()
+            user_cache.invalidate(email)
             logger.debug(f"User {email} created successfully.")
             return True
         except mysql.connector.Error as err:
-            logger.exception(f"Error creating user: {err}")
             cursor._connection.rollback()
+            if err.errno == ER_DUP_ENTRY:
+                # Drop the stale "no such user" entry that let this through
+                user_cache.invalidate(email)
+                raise DuplicateEmail(email) from err
+            logger.exception(f"Error creating user: {err}")
             return False
 
     @staticmethod
@@ -63,11 +126,61 @@ class User:
             logger.exception(f"Error verifying password: {e}")
             return False
 
+class Intake:
+    """
+    A program's admission cycle. Applications are partitioned by intake.
+    """
+
+    OPEN = 'open'
+    CLOSED = 'closed'
+    ARCHIVED = 'archived'
+
+    # Current-intake lookups run on most requests; intakes change rarely
+    _current_cache = TTLCache(max_entries=100, ttl=30)
+
+    @staticmethod
+    def get(connection, intake_id):
+        """
+        Retrieve an intake by id, or None.
+        """
+        return queries.fetchone(connection, 'intakes.get', (intake_id,))
+
+    @staticmethod
+    def current(connection, program=None):
+        """
+        The most recently opened intake that is accepting applications,
+        optionally restricted to one program, or None.
+        """
+        cached = Intake._current_cache.get(program)
+        if cached is not MISS:
+            return cached
+        if program:
+            intake = queries.fetchone(connection, 'intakes.current_for_program', (program,))
+        else:
+            intake = queries.fetchone(connection, 'intakes.current')
+        Intake._current_cache.set(program, intake)
+        return intake
+
+    @staticmethod
+    def resolve(connection, intake_id=None, program=None):
+        """
+        The intake a request refers to: the given id, else the current intake.
+        """
+        if intake_id is not None:
+            return Intake.get(connection, intake_id)
+        return Intake.current(connection, program)
+
+    @staticmethod
+    def all(connection):
+        return queries.fetchall(connection, 'intakes.list')
+
+
 class StudentDetails:
-    def __init__(self, cursor, user_id, university='', location='', be_percentage=0, be_ranking=0,
+    def __init__(self, cursor, user_id, intake_id, university='', location='', be_percentage=0, be_ranking=0,
                  cv_path=None, transcript_path=None, status='pending'):
         self.cursor = cursor
         self.user_id = user_id
+        self.intake_id = intake_id
         self.university = university
         self.location = location
         self.be_percentage = be_percentage
@@ -82,8 +195,8 @@ class StudentDetails:
         """
         try:
             self.cursor.execute("""
-                INSERT INTO student_details (user_id, university, location, be_percentage, be_ranking, cv_path, transcript_path, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO student_details (user_id, intake_id, university, location, be_percentage, be_ranking, cv_path, transcript_path, status)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON DUPLICATE KEY UPDATE
                     university = VALUES(university),
                     location = VALUES(location),
@@ -92,10 +205,10 @@ class StudentDetails:
                     cv_path = VALUES(cv_path),
                     transcript_path = VALUES(transcript_path),
                     status = VALUES(status)
-            """, (self.user_id, self.university, self.location, self.be_percentage, self.be_ranking,
+            """, (self.user_id, self.intake_id, self.university, self.location, self.be_percentage, self.be_ranking,
                   self.cv_path, self.transcript_path, self.status))
             self.cursor._connection.commit()
-            logger.debug(f"Student details for user_id {self.user_id} updated successfully.")
+            logger.debug(f"Student details for user_id {self.user_id} in intake {self.intake_id} updated successfully.")
         except mysql.connector.Error as err:
             logger.exception(f"Error updating student details: {err}")
             self.cursor._connection.rollback()
\ No newline at end of file
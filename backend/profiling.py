@@ -0,0 +1,299 @@
+# File: profiling.py
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+import logging
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+TOGGLES_FILE = 'toggles.json'
+MAX_DEPTH = 128
+# How often workers re-read the shared toggle file
+TOGGLE_CHECK_INTERVAL = 1.0
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame):
+    """
+    Collapse a frame's stack into "outer;...;inner" form.
+    """
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """
+    One daemon thread per process that samples the stacks of registered
+    threads every interval seconds. It sleeps on an event while nothing is
+    being profiled.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker starts its own
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+            self._thread.start()
+
+    def start(self, thread_id):
+        counts = Counter()
+        with self._lock:
+            self._ensure_thread()
+            self._targets[thread_id] = counts
+        self._wake.set()
+        return counts
+
+    def stop(self, thread_id):
+        with self._lock:
+            counts = self._targets.pop(thread_id, Counter())
+            if not self._targets:
+                self._wake.clear()
+        return counts
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counts in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class Profiler:
+    """
+    Opt-in sampling profiler for request handlers.
+
+    When PROFILING_ENABLED is off, init_app installs nothing, so requests pay
+    no cost. When on, a request is profiled if a random draw falls under
+    PROFILE_SAMPLE_RATE or its endpoint has been switched on by an admin.
+    Samples are appended as collapsed stacks ("a;b;c count", the input format
+    of flamegraph.pl and speedscope) to PROFILE_DIR/<endpoint>.folded.
+
+    Toggles live in PROFILE_DIR/toggles.json so every worker on the host
+    picks them up.
+
+    Config:
+        PROFILING_ENABLED: install the request hooks.
+        PROFILE_DIR: where .folded files and toggles are written.
+        PROFILE_SAMPLE_RATE: fraction of all requests to profile (0-1).
+        PROFILE_INTERVAL: seconds between stack samples.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = 'profiles'
+        self.sample_rate = 0.0
+        self.sampler = None
+        self._toggles = {}
+        self._toggles_mtime = None
+        self._toggles_checked = 0.0
+        # Guards the three _toggles* fields, which every request thread reads
+        self._toggles_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        if not self.enabled:
+            return
+        self.directory = app.config.get('PROFILE_DIR', 'profiles')
+        self.sample_rate = float(app.config.get('PROFILE_SAMPLE_RATE', 0.0))
+        self.sampler = Sampler(float(app.config.get('PROFILE_INTERVAL', 0.005)))
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        logger.info(f"Request profiling enabled (sample rate {self.sample_rate}, output {self.directory}).")
+
+    # --- Toggles -----------------------------------------------------------
+
+    def _toggles_path(self):
+        return os.path.join(self.directory, TOGGLES_FILE)
+
+    def toggles(self):
+        """
+        Endpoint -> expiry (epoch seconds) for endpoints switched on by an admin.
+        """
+        with self._toggles_lock:
+            return self._current_toggles()
+
+    def _current_toggles(self):
+        # Caller holds _toggles_lock
+        now = time.monotonic()
+        if now - self._toggles_checked >= TOGGLE_CHECK_INTERVAL:
+            self._toggles_checked = now
+            try:
+                mtime = os.stat(self._toggles_path()).st_mtime
+            except FileNotFoundError:
+                self._toggles, self._toggles_mtime = {}, None
+            else:
+                if mtime != self._toggles_mtime:
+                    try:
+                        with open(self._toggles_path()) as f:
+                            self._toggles = json.load(f)
+                        self._toggles_mtime = mtime
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Could not read profiling toggles: {e}")
+        wall = time.time()
+        return {endpoint: expires for endpoint, expires in self._toggles.items() if expires > wall}
+
+    def set_toggle(self, endpoint, duration):
+        """
+        Profile every request to endpoint for duration seconds; 0 switches it off.
+        """
+        with self._toggles_lock:
+            toggles = self._current_toggles()
+            if duration > 0:
+                toggles[endpoint] = time.time() + duration
+            else:
+                toggles.pop(endpoint, None)
+            tmp_path = f"{self._toggles_path()}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(toggles, f)
+            os.replace(tmp_path, self._toggles_path())
+            self._toggles, self._toggles_checked = toggles, 0.0
+            return dict(toggles)
+
+    # --- Request hooks -----------------------------------------------------
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is None:
+            return
+        if endpoint not in self.toggles() and not (self.sample_rate and random.random() < self.sample_rate):
+            return
+        request.environ['gradpath.profile'] = (endpoint, threading.get_ident(), time.perf_counter())
+        self.sampler.start(threading.get_ident())
+
+    def _teardown_request(self, exc):
+        profile = request.environ.pop('gradpath.profile', None)
+        if profile is None:
+            return
+        endpoint, thread_id, started = profile
+        counts = self.sampler.stop(thread_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if counts:
+            self._write(endpoint, counts)
+        logger.debug(f"Profiled {endpoint}: {sum(counts.values())} sample(s) over {elapsed_ms:.1f} ms.")
+
+    def _write(self, endpoint, counts):
+        lines = ''.join(f"{stack} {count}\n" for stack, count in counts.items())
+        path = os.path.join(self.directory, f"{endpoint}.folded")
+        try:
+            # One append per request keeps concurrent workers' lines intact
+            with self._write_lock, open(path, 'a') as f:
+                f.write(lines)
+        except OSError as e:
+            logger.error(f"Could not write profile for {endpoint}: {e}")
+
+    def stats(self):
+        files = {}
+        if self.enabled and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.folded'):
+                    files[entry.name[:-len('.folded')]] = entry.stat().st_size
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'toggles': self.toggles() if self.enabled else {},
+            'profiles': files,
+        }
+
+
+profiler = Profiler()
+
+
+def read_folded(paths):
+    """
+    Merge collapsed-stack files into one Counter of stack -> samples.
+    """
+    stacks = Counter()
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def hot_functions(stacks):
+    """
+    Per-function sample counts from collapsed stacks.
+    Returns:
+        (self counts, inclusive counts, total samples). Self counts the
+        samples where the function was on top of the stack; inclusive counts
+        the samples where it appeared anywhere (once per stack).
+    """
+    self_counts = Counter()
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_counts[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+    return self_counts, inclusive, sum(stacks.values())
+
+
+def _report(args):
+    if args.endpoint:
+        paths = [os.path.join(args.dir, f"{endpoint}.folded") for endpoint in args.endpoint]
+    elif os.path.isdir(args.dir):
+        paths = [entry.path for entry in os.scandir(args.dir) if entry.name.endswith('.folded')]
+    else:
+        paths = []
+    paths = [path for path in paths if os.path.isfile(path)]
+    if not paths:
+        sys.exit(f"No profiles found in {args.dir}.")
+
+    stacks = read_folded(paths)
+    if args.merge:
+        with open(args.merge, 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        print(f"Wrote {len(stacks)} merged stack(s) to {args.merge}.")
+
+    self_counts, inclusive, total = hot_functions(stacks)
+    order = self_counts if args.sort == 'self' else inclusive
+    print(f"{total} sample(s) from {len(paths)} profile(s)\n")
+    print(f"{'self':>7} {'self%':>6} {'total':>7} {'total%':>6}  function")
+    for name, _ in order.most_common(args.top):
+        print(
+            f"{self_counts[name]:>7} {self_counts[name] * 100 / total:>5.1f}% "
+            f"{inclusive[name]:>7} {inclusive[name] * 100 / total:>5.1f}%  {name}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aggregate request profiles captured by the profiler.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    report = commands.add_parser('report', help='show the hottest functions across samples')
+    report.add_argument('--dir', default=os.getenv('PROFILE_DIR', 'profiles'))
+    report.add_argument('--endpoint', action='append', help='limit to an endpoint, e.g. admin.get_students')
+    report.add_argument('--top', type=int, default=25)
+    report.add_argument('--sort', choices=('self', 'total'), default='self')
+    report.add_argument('--merge', metavar='PATH', help='also write the merged stacks for a flame graph')
+    args = parser.parse_args()
+    _report(args)
@@ -0,0 +1,430 @@
+# File: queries.py
+
+import re
+import threading
+import time
+import logging
+from mysql.connector import errors
+from resilience import breakers, is_outage
+
+logger = logging.getLogger(__name__)
+
+_NAMED_PARAM = re.compile(r'%\((\w+)\)s')
+
+
+class Query:
+    """
+    A registered SQL statement.
+
+    Statements may use %s or %(name)s placeholders. Prepared statements only
+    take positional parameters, so named placeholders are rewritten to %s and
+    the names remembered to bind dict parameters in order.
+    """
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.param_names = _NAMED_PARAM.findall(sql) or None
+        self.operation = _NAMED_PARAM.sub('%s', sql) if self.param_names else sql
+
+    def bind(self, params):
+        if params is None:
+            return ()
+        if self.param_names:
+            return tuple(params[name] for name in self.param_names)
+        return tuple(params)
+
+
+class QueryStats:
+    __slots__ = ('count', 'errors', 'total_time', 'max_time')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total_time * 1000, 3),
+            'avg_ms': round(self.total_time * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_time * 1000, 3),
+        }
+
+
+class QueryRegistry:
+    """
+    Central registry of the SQL the blueprints run.
+
+    Each statement is registered once by name and executed through a
+    server-side prepared cursor cached on the underlying connection, so a
+    pooled connection parses each statement once for its lifetime. Execution
+    counts and timings are tracked per statement.
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, sql):
+        if name in self._queries:
+            raise ValueError(f"Query {name} is already registered")
+        self._queries[name] = Query(name, sql)
+        self._stats[name] = QueryStats()
+        return self._queries[name]
+
+    def get(self, name):
+        return self._queries[name]
+
+    @staticmethod
+    def _raw_connection(connection):
+        # Pooled connections wrap the real connection in _cnx
+        return getattr(connection, '_cnx', None) or connection
+
+    def _cursor(self, connection, query):
+        raw = self._raw_connection(connection)
+        cache = getattr(raw, '_gradpath_statements', None)
+        # Statements do not survive a reconnect; start over on a new session
+        if cache is None or cache.get('_connection_id') != raw.connection_id:
+            cache = {'_connection_id': raw.connection_id}
+            raw._gradpath_statements = cache
+        cursor = cache.get(query.name)
+        if cursor is None:
+            cursor = raw.cursor(prepared=True)
+            cache[query.name] = cursor
+        return cursor
+
+    def _run(self, connection, name, params):
+        query = self._queries[name]
+        stats = self._stats[name]
+        cursor = self._cursor(connection, query)
+        start = time.perf_counter()
+        try:
+            cursor.execute(query.operation, query.bind(params))
+            rows = None
+            if cursor.description:
+                columns = cursor.column_names
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except errors.Error as e:
+            with self._lock:
+                stats.errors += 1
+            # Close and drop the cursor so a broken statement is re-prepared next time
+            broken = self._raw_connection(connection)._gradpath_statements.pop(name, None)
+            if broken is not None:
+                try:
+                    broken.close()
+                except errors.Error:
+                    pass  # the connection itself may be gone
+            # Timeouts and lost connections count towards the server's circuit
+            if is_outage(e):
+                breakers.for_connection(connection).record_failure()
+            raise
+        breakers.for_connection(connection).record_success()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+        return cursor, rows
+
+    def fetchall(self, connection, name, params=None):
+        """
+        Run a registered SELECT and return every row as a dict.
+        """
+        return self._run(connection, name, params)[1]
+
+    def fetchone(self, connection, name, params=None):
+        """
+        Run a registered SELECT and return the first row as a dict, or None.
+        """
+        rows = self._run(connection, name, params)[1]
+        return rows[0] if rows else None
+
+    def execute(self, connection, name, params=None):
+        """
+        Run a registered write statement.
+        Returns:
+            (rowcount, lastrowid)
+        """
+        cursor, _ = self._run(connection, name, params)
+        return cursor.rowcount, cursor.lastrowid
+
+    def stats(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items() if stats.count or stats.errors}
+
+
+queries = QueryRegistry()
+
+# --- Admin blueprint -------------------------------------------------------
+
+# Admin reads are scoped to one intake so they only touch its partition
+
+# Version timestamps are read as epoch seconds: a TIMESTAMP comes back in the
+# session time zone, which is the server's, not necessarily UTC.
+queries.register('admin.students_version', """
+    SELECT
+        (SELECT COUNT(*) FROM users WHERE role = 'student') AS student_count,
+        (SELECT UNIX_TIMESTAMP(MAX(updated_at)) FROM users WHERE role = 'student') AS users_updated_at,
+        (SELECT COUNT(*) FROM student_details WHERE intake_id = %(intake_id)s) AS details_count,
+        (SELECT UNIX_TIMESTAMP(MAX(updated_at)) FROM student_details WHERE intake_id = %(intake_id)s)
+            AS details_updated_at
+""")
+
+# Every student is listed, with their application to the intake if they have one
+queries.register('admin.list_students', """
+    SELECT
+        u.id,
+        u.name,
+        u.email,
+        COALESCE(sd.university, '') AS university,
+        COALESCE(sd.location, '') AS location,
+        COALESCE(sd.be_percentage, 0) AS be_percentage,
+        COALESCE(sd.be_ranking, 0) AS be_ranking,
+        COALESCE(sd.cv_path, '') AS cv_path,
+        COALESCE(sd.transcript_path, '') AS transcript_path,
+        COALESCE(sd.status, 'pending') AS status,
+        sd.intake_id,
+        sd.created_at,
+        sd.updated_at
+    FROM users u
+    LEFT JOIN student_details sd ON u.id = sd.user_id AND sd.intake_id = %s
+    WHERE u.role = 'student'
+    ORDER BY COALESCE(sd.created_at, u.created_at) DESC
+""")
+
+queries.register('admin.dashboard_stats', """
+    SELECT COALESCE(status, 'pending') AS status, COUNT(*) AS students
+    FROM student_details
+    WHERE intake_id = %s
+    GROUP BY COALESCE(status, 'pending')
+""")
+
+queries.register('admin.student_version', """
+    SELECT UNIX_TIMESTAMP(u.updated_at) AS user_updated_at, UNIX_TIMESTAMP(sd.updated_at) AS updated_at
+    FROM users u
+    LEFT JOIN student_details sd ON u.id = sd.user_id AND sd.intake_id = %(intake_id)s
+    WHERE u.id = %(student_id)s AND u.role = 'student'
+""")
+
+queries.register('admin.student_details', """
+    SELECT
+        u.id,
+        u.name,
+        u.email,
+        sd.university,
+        sd.location,
+        sd.be_percentage,
+        sd.be_ranking,
+        sd.cv_path,
+        sd.transcript_path,
+        sd.status,
+        sd.reference_details,
+        sd.intake_id,
+        sd.created_at,
+        sd.updated_at
+    FROM users u
+    LEFT JOIN student_details sd ON u.id = sd.user_id AND sd.intake_id = %(intake_id)s
+    WHERE u.id = %(student_id)s AND u.role = 'student'
+""")
+
+queries.register('admin.insert_user', """
+    INSERT INTO users (name, email, role, created_at, updated_at)
+    VALUES (%s, %s, 'student', %s, %s)
+""")
+
+queries.register('admin.insert_details', """
+    INSERT INTO student_details (
+        user_id, intake_id, university, location, be_percentage, be_ranking, status, created_at, updated_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, 'pending', %s, %s)
+""")
+
+queries.register('admin.update_status', """
+    UPDATE student_details SET status = %s WHERE user_id = %s AND intake_id = %s
+""")
+
+queries.register('admin.details_exist', """
+    SELECT user_id FROM student_details WHERE user_id = %s AND intake_id = %s
+""")
+
+queries.register('admin.report_applications_per_day', """
+    SELECT day, CAST(SUM(applications) AS UNSIGNED) AS applications
+    FROM report_daily_applications
+    WHERE day BETWEEN %s AND %s
+    GROUP BY day
+    ORDER BY day
+""")
+
+for _dimension in ('university', 'location'):
+    queries.register(f'admin.report_acceptance_by_{_dimension}', f"""
+        SELECT
+            {_dimension} AS `group`,
+            CAST(SUM(applications) AS UNSIGNED) AS applications,
+            CAST(SUM(CASE WHEN status = 'approved' THEN applications ELSE 0 END) AS UNSIGNED) AS approved,
+            CAST(SUM(CASE WHEN status = 'rejected' THEN applications ELSE 0 END) AS UNSIGNED) AS rejected
+        FROM report_daily_applications
+        WHERE day BETWEEN %s AND %s
+        GROUP BY {_dimension}
+        ORDER BY applications DESC
+    """)
+
+queries.register('admin.report_percentage_histogram', """
+    SELECT bucket, CAST(SUM(applications) AS UNSIGNED) AS applications
+    FROM report_daily_percentage_histogram
+    WHERE day BETWEEN %s AND %s
+    GROUP BY bucket
+""")
+
+# --- Student blueprint -----------------------------------------------------
+
+queries.register('student.upsert_details', """
+    INSERT INTO student_details (
+        user_id, intake_id, final_percentage, tentative_ranking, final_year_project,
+        other_research, publications, extracurricular, professional_experience,
+        strong_points, weak_points, preferred_programs, reference_details,
+        statement_of_purpose, intended_research_areas, english_proficiency,
+        leadership_experience, availability_to_start, additional_certifications,
+        transcript_status, cv_status, photo_status,
+        transcript_upload, cv_upload, photo_upload
+    ) VALUES (
+        %(user_id)s, %(intake_id)s, %(final_percentage)s, %(tentative_ranking)s, %(final_year_project)s,
+        %(other_research)s, %(publications)s, %(extracurricular)s, %(professional_experience)s,
+        %(strong_points)s, %(weak_points)s, %(preferred_programs)s, %(reference_details)s,
+        %(statement_of_purpose)s, %(intended_research_areas)s, %(english_proficiency)s,
+        %(leadership_experience)s, %(availability_to_start)s, %(additional_certifications)s,
+        %(transcript_status)s, %(cv_status)s, %(photo_status)s,
+        %(transcript_upload)s, %(cv_upload)s, %(photo_upload)s
+    )
+    ON DUPLICATE KEY UPDATE
+        final_percentage = VALUES(final_percentage),
+        tentative_ranking = VALUES(tentative_ranking),
+        final_year_project = VALUES(final_year_project),
+        other_research = VALUES(other_research),
+        publications = VALUES(publications),
+        extracurricular = VALUES(extracurricular),
+        professional_experience = VALUES(professional_experience),
+        strong_points = VALUES(strong_points),
+        weak_points = VALUES(weak_points),
+        preferred_programs = VALUES(preferred_programs),
+        reference_details = VALUES(reference_details),
+        statement_of_purpose = VALUES(statement_of_purpose),
+        intended_research_areas = VALUES(intended_research_areas),
+        english_proficiency = VALUES(english_proficiency),
+        leadership_experience = VALUES(leadership_experience),
+        availability_to_start = VALUES(availability_to_start),
+        additional_certifications = VALUES(additional_certifications),
+        transcript_status = COALESCE(VALUES(transcript_status), transcript_status),
+        cv_status = COALESCE(VALUES(cv_status), cv_status),
+        photo_status = COALESCE(VALUES(photo_status), photo_status),
+        transcript_upload = COALESCE(VALUES(transcript_upload), transcript_upload),
+        cv_upload = COALESCE(VALUES(cv_upload), cv_upload),
+        photo_upload = COALESCE(VALUES(photo_upload), photo_upload),
+        updated_at = CURRENT_TIMESTAMP(6)
+""")
+
+queries.register('student.details_version', """
+    SELECT UNIX_TIMESTAMP(updated_at) AS updated_at FROM student_details WHERE user_id = %s AND intake_id = %s
+""")
+
+queries.register('student.get_details', """
+    SELECT
+        final_percentage,
+        tentative_ranking,
+        final_year_project,
+        other_research,
+        publications,
+        extracurricular,
+        professional_experience,
+        strong_points,
+        weak_points,
+        preferred_programs,
+        reference_details,
+        statement_of_purpose,
+        intended_research_areas,
+        english_proficiency,
+        leadership_experience,
+        availability_to_start,
+        additional_certifications,
+        transcript_path,
+        cv_path,
+        photo_path,
+        transcript_status,
+        cv_status,
+        photo_status,
+        status,
+        intake_id,
+        created_at,
+        updated_at
+    FROM student_details
+    WHERE user_id = %s AND intake_id = %s
+""")
+
+# --- Upload pipeline -------------------------------------------------------
+
+# Results only apply to the upload they were started for (the *_upload token),
+# so a slow scan of an earlier submission cannot overwrite a newer one
+for _file_type, _path_column, _status_column in (
+    ('transcript', 'transcript_path', 'transcript_status'),
+    ('cv', 'cv_path', 'cv_status'),
+    ('photo', 'photo_path', 'photo_status'),
+):
+    queries.register(
+        f'uploads.promote_{_file_type}',
+        f"UPDATE student_details SET {_path_column} = %s, {_status_column} = 'clean' "
+        f"WHERE user_id = %s AND intake_id = %s AND {_file_type}_upload = %s"
+    )
+    queries.register(
+        f'uploads.reject_{_file_type}',
+        f"UPDATE student_details SET {_status_column} = 'rejected' "
+        f"WHERE user_id = %s AND intake_id = %s AND {_file_type}_upload = %s"
+    )
+
+# --- Intakes ---------------------------------------------------------------
+
+_INTAKE_COLUMNS = "id, program, cycle, status, opens_at, closes_at, archive_table, created_at, updated_at"
+
+queries.register('intakes.get', f"""
+    SELECT {_INTAKE_COLUMNS} FROM intakes WHERE id = %s
+""")
+
+queries.register('intakes.current', f"""
+    SELECT {_INTAKE_COLUMNS} FROM intakes
+    WHERE status = 'open'
+    ORDER BY COALESCE(opens_at, DATE(created_at)) DESC, id DESC
+    LIMIT 1
+""")
+
+queries.register('intakes.current_for_program', f"""
+    SELECT {_INTAKE_COLUMNS} FROM intakes
+    WHERE status = 'open' AND program = %s
+    ORDER BY COALESCE(opens_at, DATE(created_at)) DESC, id DESC
+    LIMIT 1
+""")
+
+queries.register('intakes.list', f"""
+    SELECT {_INTAKE_COLUMNS} FROM intakes
+    ORDER BY program, COALESCE(opens_at, DATE(created_at)) DESC, id DESC
+""")
+
+# --- Audit log -------------------------------------------------------------
+
+# Keyset pagination: newest first, continuing below the last id seen
+_AUDIT_COLUMNS = "id, occurred_at, action, actor_id, actor_role, student_id, intake_id, ip_address, details"
+
+queries.register('audit.recent', f"""
+    SELECT {_AUDIT_COLUMNS} FROM audit_log
+    WHERE id < %s
+    ORDER BY id DESC
+    LIMIT %s
+""")
+
+for _column in ('student_id', 'actor_id'):
+    queries.register(f'audit.by_{_column}', f"""
+        SELECT {_AUDIT_COLUMNS} FROM audit_log
+        WHERE {_column} = %s AND id < %s
+        ORDER BY id DESC
+        LIMIT %s
+    """)
@@ -0,0 +1,240 @@
+# File: rate_limit.py
+
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+
+def parse_limit(value):
+    """
+    Parse a limit string such as "20/60" into (count, window_seconds).
+    """
+    count, _, window = str(value).partition('/')
+    return int(count), float(window or 60)
+
+
+class MemoryWindowStore:
+    """
+    In-process store for sliding-window counters.
+
+    Each key holds three numbers (window index, current count, previous count),
+    so a hit is O(1). Keys are kept in LRU order and the oldest are evicted once
+    max_keys is reached, which bounds memory regardless of how many distinct
+    IPs or emails are seen.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window_index, previous_weight, limit):
+        """
+        Check key's sliding-window estimate against limit and, if it is under,
+        count one hit, as one step under the lock.
+        Returns:
+            True if the hit was allowed and counted.
+        """
+        with self._lock:
+            entry = self._counters.get(key)
+            current, previous = (0, 0) if entry is None else self._roll(entry, window_index)
+            if previous * previous_weight + current >= limit:
+                if entry is not None:
+                    self._counters.move_to_end(key)
+                return False
+            self._counters[key] = (window_index, current + 1, previous)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def __len__(self):
+        return len(self._counters)
+
+    @staticmethod
+    def _roll(entry, window_index):
+        index, current, previous = entry
+        if index == window_index:
+            return current, previous
+        if index == window_index - 1:
+            return 0, current
+        return 0, 0
+
+
+# KEYS: current and previous window counters. ARGV: weight of the previous
+# window, limit, TTL. Returns 1 and counts the hit when under the limit.
+HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RedisWindowStore:
+    """
+    Shared store for sliding-window counters backed by Redis, so every worker
+    sees the same counts. Keys expire after two windows.
+    """
+
+    def __init__(self, url, window, prefix='ratelimit'):
+        if redis is None:
+            raise RuntimeError("redis package is required for RATE_LIMIT_REDIS_URL")
+        self.client = redis.Redis.from_url(url)
+        self.window = window
+        self.prefix = prefix
+        self._hit = self.client.register_script(HIT_SCRIPT)
+
+    def _key(self, key, window_index):
+        return f"{self.prefix}:{key}:{window_index}"
+
+    def hit(self, key, window_index, previous_weight, limit):
+        """
+        Check and count one hit in a single atomic script call, so concurrent
+        workers cannot both pass the last free slot.
+        """
+        allowed = self._hit(
+            keys=[self._key(key, window_index), self._key(key, window_index - 1)],
+            args=[repr(previous_weight), limit, int(self.window * 2) + 1],
+        )
+        return bool(allowed)
+
+    def delete(self, key):
+        now_index = int(time.time() // self.window)
+        self.client.delete(self._key(key, now_index), self._key(key, now_index - 1))
+
+    def __len__(self):
+        return 0
+
+
+class SlidingWindowLimiter:
+    """
+    Approximate sliding-window rate limiter.
+
+    The count for the previous fixed window is weighted by how much of it still
+    overlaps the sliding window, which gives a smooth limit with constant work
+    and constant state per key.
+    """
+
+    def __init__(self, limit, window, store=None, name='limiter'):
+        self.limit = limit
+        self.window = window
+        self.store = store if store is not None else MemoryWindowStore()
+        self.name = name
+        self.allowed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def hit(self, key, now=None):
+        """
+        Record an attempt for key.
+        Returns:
+            (allowed, retry_after): retry_after is in seconds and is 0 when allowed.
+        """
+        now = time.time() if now is None else now
+        window_index = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+
+        if not self.store.hit(key, window_index, 1 - elapsed, self.limit):
+            with self._lock:
+                self.rejected += 1
+            retry_after = max(1, int(self.window * (1 - elapsed)) + 1)
+            return False, retry_after
+
+        with self._lock:
+            self.allowed += 1
+        return True, 0
+
+    def reset(self, key):
+        self.store.delete(key)
+
+    def stats(self):
+        with self._lock:
+            allowed, rejected = self.allowed, self.rejected
+        return {
+            'limit': self.limit,
+            'window': self.window,
+            'allowed': allowed,
+            'rejected': rejected,
+            'tracked_keys': len(self.store),
+        }
+
+
+class LoginThrottle:
+    """
+    Throttles login attempts per client IP and per email before any database
+    lookup or password hash is done.
+    """
+
+    def __init__(self):
+        self.by_ip = SlidingWindowLimiter(20, 60, name='ip')
+        self.by_email = SlidingWindowLimiter(5, 300, name='email')
+
+    def init_app(self, app):
+        """
+        Configure limits from the app config.
+        """
+        ip_limit, ip_window = parse_limit(app.config.get('LOGIN_RATE_LIMIT_IP', '20/60'))
+        email_limit, email_window = parse_limit(app.config.get('LOGIN_RATE_LIMIT_EMAIL', '5/300'))
+        max_keys = int(app.config.get('RATE_LIMIT_MAX_KEYS', 10000))
+        redis_url = app.config.get('RATE_LIMIT_REDIS_URL')
+
+        if redis_url:
+            ip_store = RedisWindowStore(redis_url, ip_window, prefix='login:ip')
+            email_store = RedisWindowStore(redis_url, email_window, prefix='login:email')
+        else:
+            ip_store = MemoryWindowStore(max_keys)
+            email_store = MemoryWindowStore(max_keys)
+
+        self.by_ip = SlidingWindowLimiter(ip_limit, ip_window, ip_store, name='ip')
+        self.by_email = SlidingWindowLimiter(email_limit, email_window, email_store, name='email')
+        logger.debug(
+            f"Login throttle configured: {ip_limit}/{ip_window}s per IP, "
+            f"{email_limit}/{email_window}s per email."
+        )
+
+    def check(self, ip, email):
+        """
+        Count a login attempt.
+        Returns:
+            (allowed, retry_after)
+        """
+        allowed, retry_after = self.by_ip.hit(ip or 'unknown')
+        if not allowed:
+            logger.warning(f"Login rate limit exceeded for IP: {ip}")
+            return False, retry_after
+
+        allowed, retry_after = self.by_email.hit(email.strip().lower())
+        if not allowed:
+            logger.warning(f"Login rate limit exceeded for email: {email}")
+            return False, retry_after
+
+        return True, 0
+
+    def reset_email(self, email):
+        """
+        Clear the per-email counter after a successful login.
+        """
+        self.by_email.reset(email.strip().lower())
+
+    def stats(self):
+        return {'ip': self.by_ip.stats(), 'email': self.by_email.stats()}
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,213 @@
+# File: reports.py
+
+import argparse
+from datetime import datetime, timedelta
+from itertools import accumulate
+from bisect import bisect_left
+import logging
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+LIVE_TABLE = 'student_details'
+WATERMARK_NAME = 'student_details'
+EPOCH = datetime(1970, 1, 1)
+DAY_BATCH_SIZE = 100
+
+# Whole-percentage buckets 0..100
+HISTOGRAM_BUCKETS = 101
+
+# Rows committed after a refresh can carry an updated_at from before it (the
+# timestamp is taken when the statement runs, not at commit), so each
+# incremental refresh re-scans this far behind the watermark
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+SOURCE_COLUMNS = 'created_at, university, location, status, final_percentage, be_percentage'
+
+APPLICATIONS_ROLLUP_QUERY = """
+    INSERT INTO report_daily_applications (day, university, location, status, applications)
+    SELECT
+        DATE(created_at),
+        COALESCE(university, ''),
+        COALESCE(location, ''),
+        COALESCE(status, 'pending'),
+        COUNT(*)
+    FROM ({source}) AS applications
+    GROUP BY DATE(created_at), COALESCE(university, ''), COALESCE(location, ''), COALESCE(status, 'pending')
+"""
+
+HISTOGRAM_ROLLUP_QUERY = """
+    INSERT INTO report_daily_percentage_histogram (day, bucket, applications)
+    SELECT day, bucket, COUNT(*)
+    FROM (
+        SELECT
+            DATE(created_at) AS day,
+            LEAST(100, GREATEST(0, FLOOR(
+                CAST(COALESCE(final_percentage, be_percentage) AS DECIMAL(5, 2))
+            ))) AS bucket
+        FROM ({source}) AS applications
+        WHERE COALESCE(final_percentage, be_percentage) IS NOT NULL
+    ) AS scored
+    GROUP BY day, bucket
+"""
+
+
+def _day_source(tables):
+    """
+    One day's applications across the live table and every archived intake,
+    so recomputing a day does not lose the archived intakes' share of it.
+    Returns:
+        (SQL, number of (start, end) parameter pairs it takes)
+    """
+    source = ' UNION ALL '.join(
+        f"SELECT {SOURCE_COLUMNS} FROM {table} WHERE created_at >= %s AND created_at < %s"
+        for table in tables
+    )
+    return source, len(tables)
+
+
+def refresh_rollups(full=False, overlap=REFRESH_OVERLAP):
+    """
+    Bring the daily rollup tables up to date.
+
+    Finds every day whose applications changed since the stored watermark
+    (by updated_at, less overlap), recomputes those days from
+    student_details and the archived intakes' tables and advances the
+    watermark, all in one transaction. Recomputing whole days keeps the job
+    idempotent. Deleted rows are only reflected by a full rebuild
+    (full=True), which recomputes every day that still has live
+    applications; days that exist only in archived intakes keep their
+    rollups, since their partitions are gone.
+    Returns:
+        Number of days recomputed.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        raise Exception("Database connection failed.")
+    cursor = connection.cursor(dictionary=True)
+    try:
+        if full:
+            watermark = EPOCH
+        else:
+            cursor.execute(
+                "SELECT watermark FROM report_watermarks WHERE name = %s FOR UPDATE",
+                (WATERMARK_NAME,)
+            )
+            row = cursor.fetchone()
+            watermark = max(row['watermark'] - overlap, EPOCH) if row else EPOCH
+
+        cursor.execute("SELECT MAX(updated_at) AS latest FROM student_details")
+        latest = cursor.fetchone()['latest']
+        if latest is None:
+            connection.commit()
+            return 0
+
+        # >= so rows updated in the same second as the last run are picked up
+        cursor.execute(
+            "SELECT DISTINCT DATE(created_at) AS day FROM student_details "
+            "WHERE updated_at >= %s AND updated_at <= %s AND created_at IS NOT NULL",
+            (watermark, latest)
+        )
+        days = sorted(row['day'] for row in cursor.fetchall())
+
+        cursor.execute("SELECT archive_table FROM intakes WHERE archive_table IS NOT NULL")
+        source, pairs = _day_source([LIVE_TABLE] + [row['archive_table'] for row in cursor.fetchall()])
+        applications_query = APPLICATIONS_ROLLUP_QUERY.format(source=source)
+        histogram_query = HISTOGRAM_ROLLUP_QUERY.format(source=source)
+
+        for start in range(0, len(days), DAY_BATCH_SIZE):
+            batch = days[start:start + DAY_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM report_daily_applications WHERE day IN ({placeholders})", batch)
+            cursor.execute(f"DELETE FROM report_daily_percentage_histogram WHERE day IN ({placeholders})", batch)
+            for day in batch:
+                day_start = datetime.combine(day, datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+                cursor.execute(applications_query, (day_start, day_end) * pairs)
+                cursor.execute(histogram_query, (day_start, day_end) * pairs)
+
+        cursor.execute(
+            "INSERT INTO report_watermarks (name, watermark) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)",
+            (WATERMARK_NAME, latest)
+        )
+        connection.commit()
+        logger.info(f"Report rollups refreshed for {len(days)} day(s) up to {latest}.")
+        return len(days)
+
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _load_numpy():
+    # numpy is imported on first use; it dominates this module's import time
+    try:
+        import numpy
+    except ImportError:  # pure-Python fallback for the histogram maths
+        return None
+    return numpy
+
+
+def histogram_summary(bucket_counts, percentiles=(10, 25, 50, 75, 90)):
+    """
+    Summarize a whole-percentage histogram.
+    Args:
+        bucket_counts: sequence of (bucket, count) pairs.
+    Returns:
+        dict with total, mean, percentiles and a 10-point-wide histogram.
+    """
+    np = _load_numpy()
+    if np is not None:
+        pairs = np.asarray(bucket_counts, dtype=np.int64).reshape(-1, 2)
+        counts = np.bincount(pairs[:, 0], weights=pairs[:, 1], minlength=HISTOGRAM_BUCKETS).astype(np.int64)
+        total = int(counts.sum())
+        if total == 0:
+            return {'total': 0, 'mean': None, 'percentiles': {}, 'histogram': []}
+        values = np.arange(HISTOGRAM_BUCKETS)
+        cumulative = np.cumsum(counts)
+        ranks = np.ceil(np.asarray(percentiles) / 100 * total).clip(min=1)
+        positions = np.searchsorted(cumulative, ranks)
+        mean = float((values * counts).sum() / total)
+        binned = np.add.reduceat(counts, np.arange(0, HISTOGRAM_BUCKETS, 10)).tolist()
+        percentile_values = positions.tolist()
+    else:
+        counts = [0] * HISTOGRAM_BUCKETS
+        for bucket, count in bucket_counts:
+            counts[int(bucket)] += int(count)
+        total = sum(counts)
+        if total == 0:
+            return {'total': 0, 'mean': None, 'percentiles': {}, 'histogram': []}
+        cumulative = list(accumulate(counts))
+        percentile_values = [
+            bisect_left(cumulative, max(1, -(-p * total // 100))) for p in percentiles
+        ]
+        mean = sum(value * count for value, count in enumerate(counts)) / total
+        binned = [sum(counts[i:i + 10]) for i in range(0, HISTOGRAM_BUCKETS, 10)]
+
+    # Ten-point bins (0-9, 10-19, ... 90-99) plus 100 on its own
+    histogram = [
+        {'from': start, 'to': start + 9 if start < 100 else 100, 'applications': count}
+        for start, count in zip(range(0, HISTOGRAM_BUCKETS, 10), binned)
+    ]
+    return {
+        'total': total,
+        'mean': round(mean, 2),
+        'percentiles': {f"p{p}": int(v) for p, v in zip(percentiles, percentile_values)},
+        'histogram': histogram,
+    }
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Refresh the admin report rollups.')
+    parser.add_argument('--full', action='store_true', help='recompute every day that still has live applications')
+    args = parser.parse_args()
+    refreshed = refresh_rollups(full=args.full)
+    print(f"Recomputed {refreshed} day(s).")
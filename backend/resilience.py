@@ -0,0 +1,253 @@
+# File: resilience.py
+
+import threading
+import time
+import logging
+from flask import jsonify
+from mysql.connector import errors
+from cache import TTLCache, MISS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Errors meaning the server is unreachable or too slow, as opposed to a bad query.
+# The timeout classes only exist in newer mysql-connector releases.
+OUTAGE_ERRORS = tuple(
+    getattr(errors, name) for name in (
+        'OperationalError', 'ConnectionTimeoutError',
+        'ReadTimeoutError', 'WriteTimeoutError',
+    ) if hasattr(errors, name)
+)
+
+# InterfaceError is also raised for client-side misuse (no result set, bad
+# options, a malformed multi-row INSERT), so it only counts as an outage for
+# the client error codes that mean the connection is gone: can't connect
+# (2002, 2003, 2005), server gone away (2006), lost connection (2013, 2055).
+CONNECTION_LOST_ERRNOS = frozenset({2002, 2003, 2005, 2006, 2013, 2055})
+
+
+class DatabaseUnavailable(Exception):
+    """
+    Raised instead of connecting when a circuit is open or the database
+    cannot be reached. retry_after is a hint in seconds, or None.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one database server.
+
+    After failure_threshold failures in a row the circuit opens and callers
+    fail fast for reset_timeout seconds. Then one caller is let through as a
+    probe (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.total_failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Return True if a call may go to the server now.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probe_started = now
+                logger.info(f"Circuit {self.name} half-open; probing.")
+                return True
+            # A probe that never reported back must not wedge the circuit
+            if self.state == HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Circuit {self.name} closed.")
+                self.state = CLOSED
+
+    def connected(self):
+        """
+        A new connection proves the server is reachable, which is enough to
+        close a half-open circuit but not to clear failures counted while
+        closed: a server can accept connections and still time out queries.
+        """
+        if self.state == HALF_OPEN:
+            self.record_success()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive failure(s).")
+
+    def retry_after(self):
+        if self.state == CLOSED:
+            return None
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'total_failures': self.total_failures,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+            }
+
+
+class BreakerRegistry:
+    """
+    One circuit breaker per database server, keyed by "host:port".
+
+    Config:
+        DB_BREAKER_FAILURES: consecutive failures that open a circuit.
+        DB_BREAKER_RESET_TIMEOUT: seconds a circuit stays open before probing.
+    """
+
+    def __init__(self):
+        self.failure_threshold = 5
+        self.reset_timeout = 30
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.failure_threshold = int(app.config.get('DB_BREAKER_FAILURES', 5))
+        self.reset_timeout = float(app.config.get('DB_BREAKER_RESET_TIMEOUT', 30))
+        with self._lock:
+            self._breakers.clear()
+
+    def get(self, host, port):
+        name = f"{host}:{port}"
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            return self._breakers[name]
+
+    def for_connection(self, connection):
+        raw = getattr(connection, '_cnx', None) or connection
+        return self.get(raw.server_host, raw.server_port)
+
+    def guard(self, host, port):
+        """
+        Return the server's breaker, or raise DatabaseUnavailable if its circuit is open.
+        """
+        breaker = self.get(host, port)
+        if not breaker.allow():
+            raise DatabaseUnavailable(f"Circuit for {breaker.name} is open.", breaker.retry_after())
+        return breaker
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+breakers = BreakerRegistry()
+
+
+def is_outage(error):
+    if isinstance(error, errors.InterfaceError):
+        return error.errno in CONNECTION_LOST_ERRNOS
+    return isinstance(error, (DatabaseUnavailable,) + OUTAGE_ERRORS)
+
+
+def unavailable_response(error=None):
+    """
+    503 for a database outage. The underlying error is logged, not returned.
+    """
+    response = jsonify({'message': 'Service temporarily unavailable. Please try again shortly.'})
+    response.status_code = 503
+    retry_after = getattr(error, 'retry_after', None)
+    response.headers['Retry-After'] = str(retry_after or int(breakers.reset_timeout))
+    return response
+
+
+class StaleCache:
+    """
+    Last successful payload of selected reads, served while the database is
+    unavailable.
+
+    Config:
+        STALE_CACHE_TTL: seconds a payload may be served after it was stored.
+        STALE_CACHE_MAX_ENTRIES: LRU bound on stored payloads.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(max_entries=5000, ttl=24 * 3600)
+        self.served = 0
+
+    def init_app(self, app):
+        self._cache = TTLCache(
+            max_entries=int(app.config.get('STALE_CACHE_MAX_ENTRIES', 5000)),
+            ttl=int(app.config.get('STALE_CACHE_TTL', 24 * 3600)),
+        )
+
+    def store(self, key, payload):
+        self._cache.set(key, (time.time(), payload))
+
+    def invalidate(self, key):
+        self._cache.delete(key)
+
+    def response(self, key):
+        """
+        Build a response from the stored payload for key, or return None.
+        """
+        entry = self._cache.get(key)
+        if entry is MISS:
+            return None
+        stored_at, payload = entry
+        self.served += 1
+        response = jsonify(payload)
+        response.headers['Age'] = str(int(time.time() - stored_at))
+        response.headers['Warning'] = '110 - "Response is Stale"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    def stats(self):
+        return dict(self._cache.stats(), served_stale=self.served)
+
+
+stale_cache = StaleCache()
+
+
+def degraded_response(error, stale_key=None):
+    """
+    Response for a handler whose database access failed with an outage error:
+    the stale payload for stale_key when there is one, otherwise a 503.
+    """
+    if stale_key is not None:
+        response = stale_cache.response(stale_key)
+        if response is not None:
+            logger.warning(f"Serving stale {stale_key} during database outage: {error}")
+            return response
+    logger.error(f"Database unavailable: {error}")
+    return unavailable_response(error)
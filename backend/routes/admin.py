@@ -1,56 +1,30 @@
 # routes/admin.py
 
-from flask import (
-    Blueprint, request, jsonify, session, redirect, url_for, flash,
-    render_template
-)
-from functools import wraps
-from datetime import datetime
+from flask import Blueprint, request, jsonify, render_template, Response, stream_with_context, current_app
+from datetime import datetime, timedelta
 import logging
-from database import get_db_connection  # Importing from the dedicated database module
+from database import get_db_connection, commit, rollback  # Importing from the dedicated database module
+from auth import admin_required
+import mysql.connector
+from models import User, Intake, DuplicateEmail, ER_DUP_ENTRY
+from intakes import intake_for_request, InvalidIntakeId
+from cache import user_cache
+from http_cache import make_etag, latest, not_modified, add_validators
+from events import change_feed
+from reports import refresh_rollups, histogram_summary
+from queries import queries
+from audit import audit_log
+from profiling import profiler
+from serialization import loads
+from resilience import is_outage, degraded_response, stale_cache, breakers
 
 # Initialize the Blueprint for admin routes
 admin_bp = Blueprint('admin', __name__)
 
-# Configure Logging for the admin blueprint
+# Logging is configured once by the app factory
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to INFO or WARNING in production
-
-# Create a logging handler if not already present
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-
-def login_required(f):
-    """
-    Decorator to ensure that a user is logged in before accessing certain routes.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'warning')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def admin_required(f):
-    """
-    Decorator to ensure that the logged-in user has admin privileges.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if session.get('user_role') != 'admin':
-            flash('Admin privileges required to access this page.', 'danger')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
 
 @admin_bp.route('/dashboard', methods=['GET'])
-@login_required
 @admin_required
 def dashboard():
     """
@@ -59,128 +33,176 @@ def dashboard():
     return render_template('dashboard.html')
 
 @admin_bp.route('/students', methods=['GET'])
-@login_required
 @admin_required
 def get_students():
     """
-    Retrieve a list of all students from the database.
+    Retrieve every student with their application to one intake
+    (?intake_id=, default: the current intake), if they have one.
     """
     connection = None
     try:
         # Establish a database connection
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection is None:
             raise Exception("Database connection failed.")
 
-        cursor = connection.cursor(dictionary=True)
-
-        # SQL query to fetch student details
-        query = """
-            SELECT 
-                u.id,
-                u.name,
-                u.email,
-                COALESCE(sd.university, '') AS university,
-                COALESCE(sd.location, '') AS location,
-                COALESCE(sd.be_percentage, 0) AS be_percentage,
-                COALESCE(sd.be_ranking, 0) AS be_ranking,
-                COALESCE(sd.cv_path, '') AS cv_path,
-                COALESCE(sd.transcript_path, '') AS transcript_path,
-                COALESCE(sd.status, 'pending') AS status,
-                sd.created_at,
-                sd.updated_at
-            FROM users u
-            LEFT JOIN student_details sd ON u.id = sd.user_id
-            WHERE u.role = 'student'
-            ORDER BY COALESCE(sd.created_at, u.created_at) DESC
-        """
-
-        cursor.execute(query)
-        students = cursor.fetchall()
-
-        # Format datetime objects to strings for JSON serialization
-        for student in students:
-            if student['created_at']:
-                student['created_at'] = student['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if student['updated_at']:
-                student['updated_at'] = student['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-
-        logger.info("Fetched all students successfully.")
-        return jsonify(students), 200
+        intake = intake_for_request(connection)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+
+        # Cheap collection version check so polling clients can get a 304;
+        # updated_at has microsecond resolution (migrations/009) so same-second edits count
+        version = queries.fetchone(connection, 'admin.students_version', {'intake_id': intake['id']})
+        etag = make_etag(
+            'students', intake['id'], version['student_count'], version['details_count'],
+            version['users_updated_at'], version['details_updated_at']
+        )
+        last_modified = latest(version['users_updated_at'], version['details_updated_at'])
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        students = queries.fetchall(connection, 'admin.list_students', (intake['id'],))
+
+        logger.info(f"Fetched students for intake {intake['id']} successfully.")
+        return add_validators(jsonify(students), etag, last_modified), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
 
     except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
         logger.error(f"Error fetching students: {e}")
-        return jsonify({'message': 'Error fetching students', 'error': str(e)}), 500
+        return jsonify({'message': 'Error fetching students'}), 500
 
     finally:
         # Ensure that the database connection is closed
         if connection and connection.is_connected():
-            cursor.close()
+            connection.close()
+
+@admin_bp.route('/dashboard/stats', methods=['GET'])
+@admin_required
+def get_dashboard_stats():
+    """
+    Student totals by application status for the dashboard cards, for one
+    intake (?intake_id=, default: the current intake).
+    """
+    connection = None
+    stale_key = ('admin.stats', request.args.get('intake_id'))
+    try:
+        connection = get_db_connection(read_only=True)
+
+        intake = intake_for_request(connection)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+
+        rows = queries.fetchall(connection, 'admin.dashboard_stats', (intake['id'],))
+        status_counts = {row['status']: row['students'] for row in rows}
+        stats = {
+            'intake_id': intake['id'],
+            'total_students': sum(status_counts.values()),
+            'status_counts': status_counts,
+        }
+
+        stale_cache.store(stale_key, stats)
+        return jsonify(stats), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e, stale_key)
+        logger.error(f"Error fetching dashboard stats: {e}")
+        return jsonify({'message': 'Error fetching dashboard stats'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/intakes', methods=['GET'])
+@admin_required
+def get_intakes():
+    """
+    List every intake; the current one is flagged for the dashboard's selector.
+    """
+    connection = None
+    try:
+        connection = get_db_connection(read_only=True)
+
+        intakes = Intake.all(connection)
+        current = Intake.current(connection)
+        for intake in intakes:
+            intake['current'] = current is not None and intake['id'] == current['id']
+
+        return jsonify(intakes), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error fetching intakes: {e}")
+        return jsonify({'message': 'Error fetching intakes'}), 500
+
+    finally:
+        if connection and connection.is_connected():
             connection.close()
 
 @admin_bp.route('/student/<int:student_id>', methods=['GET'])
-@login_required
 @admin_required
 def get_student_details(student_id):
     """
-    Retrieve detailed information of a specific student by their ID.
+    Retrieve detailed information of a specific student by their ID, with
+    their application to one intake (?intake_id=, default: the current intake).
     """
     connection = None
+    stale_key = ('admin.student', student_id, request.args.get('intake_id'))
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(read_only=True)
         if connection is None:
             raise Exception("Database connection failed.")
 
-        cursor = connection.cursor(dictionary=True)
-
-        # SQL query to fetch specific student details
-        query = """
-            SELECT 
-                u.id,
-                u.name,
-                u.email,
-                sd.university,
-                sd.location,
-                sd.be_percentage,
-                sd.be_ranking,
-                sd.cv_path,
-                sd.transcript_path,
-                sd.status,
-                sd.reference_details,
-                sd.created_at,
-                sd.updated_at
-            FROM users u
-            LEFT JOIN student_details sd ON u.id = sd.user_id
-            WHERE u.id = %s AND u.role = 'student'
-        """
-
-        cursor.execute(query, (student_id,))
-        student = cursor.fetchone()
+        intake = intake_for_request(connection)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+        params = {'student_id': student_id, 'intake_id': intake['id']}
 
-        if not student:
+        # Answer conditional requests from the timestamps before loading the wide row
+        version = queries.fetchone(connection, 'admin.student_version', params)
+        if not version:
             logger.warning(f"Student with ID {student_id} not found.")
             return jsonify({'message': 'Student not found'}), 404
 
-        # Format datetime objects to strings for JSON serialization
-        if student['created_at']:
-            student['created_at'] = student['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        if student['updated_at']:
-            student['updated_at'] = student['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
+        etag = make_etag('student', student_id, intake['id'], version['user_updated_at'], version['updated_at'])
+        last_modified = latest(version['user_updated_at'], version['updated_at'])
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        student = queries.fetchone(connection, 'admin.student_details', params)
+
+        if not student:
+            logger.warning(f"Student with ID {student_id} not found.")
+            return jsonify({'message': 'Student not found'}), 404
 
         logger.info(f"Retrieved details for student_id {student_id}.")
-        return jsonify(student), 200
+        stale_cache.store(stale_key, student)
+        return add_validators(jsonify(student), etag, last_modified), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
 
     except Exception as e:
+        if is_outage(e):
+            return degraded_response(e, stale_key)
         logger.error(f"Error fetching student details: {e}")
-        return jsonify({'message': 'Error fetching student details', 'error': str(e)}), 500
+        return jsonify({'message': 'Error fetching student details'}), 500
 
     finally:
         if connection and connection.is_connected():
-            cursor.close()
             connection.close()
 
 @admin_bp.route('/student', methods=['POST'])
-@login_required
 @admin_required
 def add_student():
     """
@@ -206,31 +228,33 @@ def add_student():
         if connection is None:
             raise Exception("Database connection failed.")
         
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor(dictionary=True, buffered=True)
+
+        intake = intake_for_request(connection, data)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+        if intake['status'] != Intake.OPEN:
+            return jsonify({'message': 'Intake is not open for applications'}), 400
 
         # Check if the email already exists in the users table
-        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-        if cursor.fetchone():
+        if User.get_by_email(cursor, email):
             logger.warning(f"Attempt to add student with existing email: {email}.")
             return jsonify({'message': 'Email already exists'}), 400
 
-        # Insert the new user into the users table
-        insert_user_query = """
-            INSERT INTO users (name, email, role, created_at, updated_at)
-            VALUES (%s, %s, 'student', %s, %s)
-        """
+        # Insert the new user and the corresponding student_details row
         current_time = datetime.now()
-        cursor.execute(insert_user_query, (name, email, current_time, current_time))
-        user_id = cursor.lastrowid
-
-        # Insert the corresponding student details into the student_details table
-        insert_details_query = """
-            INSERT INTO student_details (
-                user_id, university, location, be_percentage, be_ranking, status, created_at, updated_at
-            ) VALUES (%s, %s, %s, %s, %s, 'pending', %s, %s)
-        """
-        cursor.execute(insert_details_query, (
+        try:
+            _, user_id = queries.execute(
+                connection, 'admin.insert_user', (name, email, current_time, current_time)
+            )
+        except mysql.connector.IntegrityError as e:
+            # Created by another worker since the cached lookup above
+            if e.errno == ER_DUP_ENTRY:
+                raise DuplicateEmail(email) from e
+            raise
+        queries.execute(connection, 'admin.insert_details', (
             user_id,
+            intake['id'],
             university,
             location,
             be_percentage,
@@ -240,18 +264,344 @@ def add_student():
         ))
 
         # Commit the transaction to the database
-        connection.commit()
+        commit(connection)
+        user_cache.invalidate(email)
 
         logger.info(f"Added new student with ID {user_id}.")
-        return jsonify({'message': 'Student added successfully', 'student_id': user_id}), 201
+        change_feed.publish(
+            'student.added', student_id=user_id, intake_id=intake['id'], name=name, email=email,
+            university=university, location=location, status='pending'
+        )
+        audit_log.record(
+            'student.added', student_id=user_id, intake_id=intake['id'], actor_role='admin',
+            details={'name': name, 'email': email, 'university': university, 'location': location}
+        )
+        return jsonify({
+            'message': 'Student added successfully', 'student_id': user_id, 'intake_id': intake['id']
+        }), 201
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
+
+    except DuplicateEmail:
+        rollback(connection)
+        user_cache.invalidate(email)
+        logger.warning(f"Attempt to add student with existing email: {email}.")
+        return jsonify({'message': 'Email already exists'}), 400
 
     except Exception as e:
         if connection:
-            connection.rollback()  # Rollback in case of error
+            rollback(connection)
+        if is_outage(e):
+            return degraded_response(e)  # Rollback in case of error
         logger.error(f"Error adding student: {e}")
-        return jsonify({'message': 'Error adding student', 'error': str(e)}), 500
+        return jsonify({'message': 'Error adding student'}), 500
 
     finally:
         if connection and connection.is_connected():
             cursor.close()
-            connection.close()
\ No newline at end of file
+            connection.close()
+
+@admin_bp.route('/student/<int:student_id>/status', methods=['PUT'])
+@admin_required
+def update_student_status(student_id):
+    """
+    Update the application status of a specific student in one intake
+    (intake_id in the body, default: the current intake).
+    """
+    connection = None
+    try:
+        data = request.get_json(silent=True) or {}
+        status = data.get('status')
+        if status not in ('pending', 'approved', 'rejected'):
+            return jsonify({'message': 'Status must be pending, approved or rejected'}), 400
+
+        connection = get_db_connection()
+        if connection is None:
+            raise Exception("Database connection failed.")
+
+        intake = intake_for_request(connection, data)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+
+        updated, _ = queries.execute(connection, 'admin.update_status', (status, student_id, intake['id']))
+        if updated == 0:
+            if not queries.fetchone(connection, 'admin.details_exist', (student_id, intake['id'])):
+                logger.warning(f"No details found for student_id {student_id}.")
+                return jsonify({'message': 'Student not found'}), 404
+        commit(connection)
+
+        logger.info(f"Status for student_id {student_id} set to {status}.")
+        change_feed.publish('student.status', student_id=student_id, intake_id=intake['id'], status=status)
+        audit_log.record(
+            'student.status_changed', student_id=student_id, intake_id=intake['id'], actor_role='admin',
+            details={'status': status}
+        )
+        return jsonify({'message': 'Status updated successfully', 'status': status}), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
+
+    except Exception as e:
+        if connection:
+            rollback(connection)
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error updating student status: {e}")
+        return jsonify({'message': 'Error updating status'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/events', methods=['GET'])
+@admin_required
+def events():
+    """
+    Stream student changes (submissions, additions, status updates) as
+    server-sent events so the dashboard can apply deltas instead of polling.
+    A reconnecting client whose Last-Event-ID cannot be resumed gets a
+    'reset' event and should reload the list before applying further deltas.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    response = Response(
+        stream_with_context(change_feed.stream(last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _report_range():
+    """
+    Parse the ?from=YYYY-MM-DD&to=YYYY-MM-DD report range (default: last 30 days).
+    """
+    today = datetime.now().date()
+    end = request.args.get('to')
+    start = request.args.get('from')
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else today
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=29)
+    return start, end
+
+@admin_bp.route('/reports/applications-per-day', methods=['GET'])
+@admin_required
+def report_applications_per_day():
+    """
+    Applications received per day, read from the daily rollup.
+    """
+    connection = None
+    try:
+        try:
+            start, end = _report_range()
+        except ValueError:
+            return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+        connection = get_db_connection(read_only=True)
+        if connection is None:
+            raise Exception("Database connection failed.")
+
+        rows = queries.fetchall(connection, 'admin.report_applications_per_day', (start, end))
+
+        return jsonify({'from': start, 'to': end, 'days': rows}), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error building applications-per-day report: {e}")
+        return jsonify({'message': 'Error building report'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/reports/acceptance-rate', methods=['GET'])
+@admin_required
+def report_acceptance_rate():
+    """
+    Acceptance rate grouped by university or location (?by=university|location).
+    """
+    connection = None
+    try:
+        dimension = request.args.get('by', 'university')
+        if dimension not in ('university', 'location'):
+            return jsonify({'message': 'by must be university or location'}), 400
+        try:
+            start, end = _report_range()
+        except ValueError:
+            return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+
+        connection = get_db_connection(read_only=True)
+        if connection is None:
+            raise Exception("Database connection failed.")
+
+        rows = queries.fetchall(connection, f'admin.report_acceptance_by_{dimension}', (start, end))
+
+        for row in rows:
+            decided = row['approved'] + row['rejected']
+            row['acceptance_rate'] = round(float(row['approved']) / float(decided), 4) if decided else None
+
+        return jsonify({'from': start, 'to': end, 'by': dimension, 'groups': rows}), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error building acceptance-rate report: {e}")
+        return jsonify({'message': 'Error building report'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/reports/percentage-distribution', methods=['GET'])
+@admin_required
+def report_percentage_distribution():
+    """
+    Distribution of applicants' percentages: histogram, mean and percentiles.
+    """
+    connection = None
+    try:
+        try:
+            start, end = _report_range()
+        except ValueError:
+            return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+        connection = get_db_connection(read_only=True)
+        if connection is None:
+            raise Exception("Database connection failed.")
+
+        rows = queries.fetchall(connection, 'admin.report_percentage_histogram', (start, end))
+        summary = histogram_summary([(row['bucket'], row['applications']) for row in rows])
+        summary.update({'from': start, 'to': end})
+
+        return jsonify(summary), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error building percentage-distribution report: {e}")
+        return jsonify({'message': 'Error building report'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/reports/refresh', methods=['POST'])
+@admin_required
+def refresh_reports():
+    """
+    Run the incremental rollup job now instead of waiting for the schedule.
+    """
+    try:
+        days = refresh_rollups()
+        return jsonify({'message': 'Reports refreshed', 'days_recomputed': days}), 200
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error refreshing report rollups: {e}")
+        return jsonify({'message': 'Error refreshing reports'}), 500
+
+@admin_bp.route('/queries/stats', methods=['GET'])
+@admin_required
+def query_stats():
+    """
+    Return execution counts and timings for each registered query.
+    """
+    return jsonify(queries.stats()), 200
+
+@admin_bp.route('/circuit/stats', methods=['GET'])
+@admin_required
+def circuit_stats():
+    """
+    Return circuit breaker state per database server and stale-cache counters.
+    """
+    return jsonify({'breakers': breakers.stats(), 'stale_cache': stale_cache.stats()}), 200
+
+# Upper bound for ?before= when paging from the newest event
+AUDIT_MAX_ID = 2 ** 63 - 1
+AUDIT_PAGE_SIZE = 50
+AUDIT_MAX_PAGE_SIZE = 200
+
+@admin_bp.route('/audit', methods=['GET'])
+@admin_required
+def get_audit_log():
+    """
+    Page through the audit trail, newest first. Filter by ?student_id= or
+    ?actor_id= and pass ?before=<next_before> from the previous page to
+    continue.
+    """
+    connection = None
+    try:
+        student_id = request.args.get('student_id', type=int)
+        actor_id = request.args.get('actor_id', type=int)
+        before = request.args.get('before', AUDIT_MAX_ID, type=int)
+        limit = request.args.get('limit', AUDIT_PAGE_SIZE, type=int)
+        if student_id is not None and actor_id is not None:
+            return jsonify({'message': 'Filter by student_id or actor_id, not both'}), 400
+        if not 1 <= limit <= AUDIT_MAX_PAGE_SIZE:
+            return jsonify({'message': f'limit must be between 1 and {AUDIT_MAX_PAGE_SIZE}'}), 400
+
+        connection = get_db_connection(read_only=True)
+
+        if student_id is not None:
+            events = queries.fetchall(connection, 'audit.by_student_id', (student_id, before, limit))
+        elif actor_id is not None:
+            events = queries.fetchall(connection, 'audit.by_actor_id', (actor_id, before, limit))
+        else:
+            events = queries.fetchall(connection, 'audit.recent', (before, limit))
+
+        for event in events:
+            if event['details'] is not None:
+                event['details'] = loads(event['details'])
+
+        next_before = events[-1]['id'] if len(events) == limit else None
+        return jsonify({'events': events, 'next_before': next_before}), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.error(f"Error fetching audit log: {e}")
+        return jsonify({'message': 'Error fetching audit log'}), 500
+
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+@admin_bp.route('/audit/stats', methods=['GET'])
+@admin_required
+def audit_stats():
+    """
+    Return this worker's audit queue depth and write/drop counters.
+    """
+    return jsonify(audit_log.stats()), 200
+
+PROFILE_TOGGLE_DURATION = 300
+PROFILE_MAX_TOGGLE_DURATION = 3600
+
+@admin_bp.route('/profiling', methods=['GET'])
+@admin_required
+def profiling_status():
+    """
+    Return the profiler's sample rate, switched-on endpoints and captured profiles.
+    """
+    return jsonify(profiler.stats()), 200
+
+@admin_bp.route('/profiling/<endpoint>', methods=['PUT'])
+@admin_required
+def toggle_profiling(endpoint):
+    """
+    Profile every request to an endpoint (e.g. admin.get_students) for
+    ?duration= seconds (default 300); 0 switches it off again.
+    """
+    if not profiler.enabled:
+        return jsonify({'message': 'Profiling is disabled; set PROFILING_ENABLED=true'}), 409
+    if endpoint not in current_app.view_functions:
+        return jsonify({'message': f'Unknown endpoint {endpoint}'}), 404
+    duration = request.args.get('duration', PROFILE_TOGGLE_DURATION, type=int)
+    if not 0 <= duration <= PROFILE_MAX_TOGGLE_DURATION:
+        return jsonify({'message': f'duration must be between 0 and {PROFILE_MAX_TOGGLE_DURATION}'}), 400
+    try:
+        toggles = profiler.set_toggle(endpoint, duration)
+        logger.info(f"Profiling for {endpoint} set to {duration}s.")
+        return jsonify({'toggles': toggles}), 200
+    except OSError as e:
+        logger.error(f"Error saving profiling toggle: {e}")
+        return jsonify({'message': 'Error saving profiling toggle'}), 500
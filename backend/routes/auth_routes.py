@@ -1,10 +1,15 @@
 # File: routes/auth_routes.py
 
 from flask import Blueprint, request, jsonify, session
-from functools import wraps
 import re
-from models import User
+from models import User, DuplicateEmail
 from extensions import cnxpool, logger
+from database import rollback
+from rate_limit import login_throttle
+from tokens import token_service, TokenError, REFRESH_TOKEN
+from auth import login_required, admin_required, current_user_id
+from resilience import is_outage, degraded_response
+from audit import audit_log
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -15,28 +20,6 @@ def is_valid_email(email):
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
     return re.match(pattern, email) is not None
 
-def login_required(f):
-    """
-    Decorator to require authentication for certain routes.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'message': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def admin_required(f):
-    """
-    Decorator to require admin privileges for certain routes.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_role' not in session or session['user_role'] != 'admin':
-            return jsonify({'message': 'Admin privileges required'}), 403
-        return f(*args, **kwargs)
-    return decorated_function
-
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     """
@@ -81,11 +64,17 @@ def signup():
 
         return jsonify({'message': 'User created successfully'}), 201
 
+    except DuplicateEmail:
+        logger.warning(f"Signup attempt with existing email: {email}")
+        return jsonify({'message': 'Email already registered'}), 409
+
     except Exception as e:
+        if 'conn' in locals() and conn:
+            rollback(conn)
+        if is_outage(e):
+            return degraded_response(e)
         logger.exception(f"Signup error: {e}")
-        if cursor and conn.is_connected():
-            conn.rollback()
-        return jsonify({'message': 'Signup failed', 'error': str(e)}), 500
+        return jsonify({'message': 'Signup failed'}), 500
     finally:
         if 'cursor' in locals() and cursor:
             cursor.close()
@@ -112,6 +101,15 @@ def login():
         # Validate input fields
         if not email or not password:
             return jsonify({'message': 'Email and password are required'}), 400
+        if not isinstance(email, str) or not isinstance(password, str):
+            return jsonify({'message': 'Email and password must be strings'}), 400
+
+        # Reject excess attempts before any database or bcrypt work
+        allowed, retry_after = login_throttle.check(request.remote_addr, email)
+        if not allowed:
+            response = jsonify({'message': 'Too many login attempts. Please try again later.'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
 
         logger.debug(f"Attempting to login user with email: {email}")
 
@@ -119,12 +117,14 @@ def login():
         conn = cnxpool.get_connection()
         cursor = conn.cursor(dictionary=True)
 
-        user = User.get_by_email(cursor, email)
+        user = User.get_credentials(cursor, email)
 
         if not user or not User.verify_password(user['password_hash'], password):
             logger.warning(f"Invalid login attempt for email: {email}")
             return jsonify({'message': 'Invalid credentials'}), 401
 
+        login_throttle.reset_email(email)
+
         # Store user information in session
         session['user_id'] = user['id']
         session['user_name'] = user['name']
@@ -132,7 +132,7 @@ def login():
 
         logger.info(f"User {user['email']} logged in successfully.")
 
-        return jsonify({
+        body = {
             'message': 'Login successful',
             'user': {
                 'id': user['id'],
@@ -140,11 +140,22 @@ def login():
                 'email': user['email'],
                 'role': user['role']
             }
-        }), 200
+        }
+        # Bearer tokens for stateless clients; the session cookie still works
+        if token_service.enabled:
+            # Read uncached so the refresh token carries the current token_version
+            current = User.get_by_id(cursor, user['id'])
+            body.update(token_service.issue_pair(
+                current['id'], current['role'], current['name'], current['token_version']
+            ))
+
+        return jsonify(body), 200
 
     except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
         logger.exception(f"Login error: {e}")
-        return jsonify({'message': 'Login failed.', 'error': str(e)}), 500
+        return jsonify({'message': 'Login failed.'}), 500
     finally:
         if 'cursor' in locals() and cursor:
             cursor.close()
@@ -152,15 +163,83 @@ def login():
             conn.close()
             logger.debug("MySQL connection closed.")
 
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """
+    Exchange a refresh token for a new access token. The user's role and name
+    are re-read from the database, and the token is refused once the user is
+    gone or their token_version has moved on (logout, role change).
+    """
+    if not token_service.enabled:
+        return jsonify({'message': 'Token authentication is disabled'}), 404
+
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token')
+    if not refresh_token:
+        return jsonify({'message': 'Refresh token is required'}), 400
+
+    try:
+        payload = token_service.verify(refresh_token, expected_type=REFRESH_TOKEN)
+    except TokenError as e:
+        logger.warning(f"Invalid refresh token: {e}")
+        return jsonify({'message': 'Invalid refresh token'}), 401
+
+    try:
+        conn = cnxpool.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        user = User.get_by_id(cursor, int(payload['sub']))
+        if user is None or user['token_version'] != payload.get('ver'):
+            logger.warning(f"Revoked refresh token for user_id {payload['sub']}.")
+            return jsonify({'message': 'Invalid refresh token'}), 401
+
+        token = token_service.issue(user['id'], user['role'], user['name'])
+        return jsonify({'token': token, 'expires_in': token_service.access_ttl}), 200
+
+    except Exception as e:
+        if is_outage(e):
+            return degraded_response(e)
+        logger.exception(f"Token refresh error: {e}")
+        return jsonify({'message': 'Token refresh failed'}), 500
+    finally:
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn and conn.is_connected():
+            conn.close()
+
 @auth_bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
     """
-    Handle user logout by clearing the session.
+    Handle user logout by clearing the session and revoking the user's
+    refresh tokens.
     """
+    user_id = current_user_id()
     session.clear()
+    if token_service.enabled:
+        try:
+            conn = cnxpool.get_connection()
+            cursor = conn.cursor()
+            User.revoke_tokens(cursor, user_id)
+        except Exception as e:
+            if is_outage(e):
+                return degraded_response(e)
+            logger.exception(f"Error revoking tokens for user_id {user_id}: {e}")
+            return jsonify({'message': 'Logout failed'}), 500
+        finally:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            if 'conn' in locals() and conn and conn.is_connected():
+                conn.close()
     return jsonify({'message': 'Logged out successfully'}), 200
 
+@auth_bp.route('/rate-limit/stats', methods=['GET'])
+@admin_required
+def rate_limit_stats():
+    """
+    Return allowed/rejected counters for the login throttle.
+    """
+    return jsonify(login_throttle.stats()), 200
+
 @auth_bp.route('/create-admin', methods=['POST'])
 @admin_required
 def create_admin():
@@ -194,9 +273,8 @@ def create_admin():
         cursor = conn.cursor(dictionary=True)
 
         # Check if admin already exists
-        query = 'SELECT id FROM users WHERE email = %s AND role = %s'
-        cursor.execute(query, (email, 'admin'))
-        if cursor.fetchone():
+        existing_user = User.get_by_email(cursor, email)
+        if existing_user and existing_user['role'] == 'admin':
             logger.warning(f"Admin account already exists for email: {email}")
             return jsonify({'message': 'Admin already exists'}), 400
 
@@ -206,14 +284,21 @@ def create_admin():
             return jsonify({'message': 'Failed to create admin'}), 500
 
         logger.info(f"Admin {email} created successfully.")
+        audit_log.record('admin.created', actor_role='admin', details={'name': name, 'email': email})
 
         return jsonify({'message': 'Admin created successfully'}), 201
 
+    except DuplicateEmail:
+        logger.warning(f"Admin creation attempt with existing email: {email}")
+        return jsonify({'message': 'Email already registered'}), 409
+
     except Exception as e:
+        if 'conn' in locals() and conn:
+            rollback(conn)
+        if is_outage(e):
+            return degraded_response(e)
         logger.exception(f"Error creating admin: {e}")
-        if cursor and conn.is_connected():
-            conn.rollback()
-        return jsonify({'message': 'Failed to create admin', 'error': str(e)}), 500
+        return jsonify({'message': 'Failed to create admin'}), 500
     finally:
         if 'cursor' in locals() and cursor:
             cursor.close()
@@ -0,0 +1,58 @@
+# routes/health.py
+
+from flask import Blueprint, jsonify
+import logging
+from database import get_db_connection
+
+# Initialize the Blueprint for liveness/readiness probes
+health_bp = Blueprint('health', __name__)
+
+logger = logging.getLogger(__name__)
+
+
+def _check_database():
+    # The auth routes borrow from this same pool, so one check covers both.
+    # Probes send no cookie, and get_db_connection does not touch the session
+    connection = get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+READINESS_CHECKS = {
+    'database': _check_database,
+}
+
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Liveness probe. Only confirms the process is serving requests; it never
+    touches the database, so a database outage does not get workers restarted.
+    """
+    return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness probe. Returns 503 until every dependency answers. The probe
+    is unauthenticated, so failures are logged rather than returned; circuit
+    state is on /api/admin/circuit/stats.
+    """
+    checks = {}
+    for name, check in READINESS_CHECKS.items():
+        try:
+            check()
+            checks[name] = 'ok'
+        except Exception as e:
+            logger.warning(f"Readiness check {name} failed: {e}")
+            checks[name] = 'unavailable'
+
+    ready = all(result == 'ok' for result in checks.values())
+    body = {'status': 'ready' if ready else 'unavailable', 'checks': checks}
+    return jsonify(body), 200 if ready else 503
@@ -1,31 +1,30 @@
 # routes/students.py
 
 from flask import (
-    Blueprint, request, jsonify, session, redirect, url_for, flash,
-    current_app, send_file, render_template
+    Blueprint, request, jsonify, flash, send_file, render_template
 )
-from functools import wraps
-import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
+import uuid
 import logging
-from database import get_db_connection  # Importing from the dedicated database module
+from database import get_db_connection, commit, rollback  # Importing from the dedicated database module
+from auth import login_required, current_user_id
+from http_cache import make_etag, latest, not_modified, add_validators
+from events import change_feed
+from upload_pipeline import upload_pipeline, upload_token
+from image_processing import PHOTO_SIZES, variant_name
+from storage import storage, make_key
+from queries import queries
+from audit import audit_log
+from models import Intake
+from intakes import intake_for_request, InvalidIntakeId
+from resilience import is_outage, degraded_response, stale_cache
 
 # Initialize the Blueprint for student routes
 student_bp = Blueprint('student', __name__)
 
-# Configure Logging for the student blueprint
+# Logging is configured once by the app factory
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to INFO or WARNING in production
-
-# Create a logging handler if not already present
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
 # Allowed file extensions for uploads
 ALLOWED_FILE_EXTENSIONS = {
@@ -43,19 +42,6 @@ def allowed_file(filename, file_type):
         return ext in ALLOWED_FILE_EXTENSIONS.get(file_type, set())
     return False
 
-# Decorator to require user login
-def login_required(f):
-    """
-    Decorator to ensure that a user is logged in before accessing certain routes.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'warning')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
 @student_bp.route('/dashboard', methods=['GET'])
 @login_required
 def dashboard():
@@ -69,74 +55,50 @@ def dashboard():
 def submit_student_details():
     """
     Handle the submission of student details, including file uploads.
+    The application is filed under the intake_id (or program) form field,
+    defaulting to the current open intake.
     """
     connection = None
+    quarantined = {}
     try:
-        user_id = session['user_id']
+        user_id = current_user_id()
         form_data = request.form.to_dict()
         files = request.files
 
-        # Process and validate file uploads
-        transcript = files.get('transcript')
-        cv = files.get('cv')
-        photo = files.get('photo')
-
-        # Initialize file paths
-        transcript_path = None
-        cv_path = None
-        photo_path = None
-
-        # Directory configurations
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-
-        # Handle Transcript Upload
-        if transcript:
-            if allowed_file(transcript.filename, 'transcript'):
-                filename = secure_filename(
-                    f"{user_id}_transcript_{int(datetime.utcnow().timestamp())}_{transcript.filename}"
-                )
-                transcript_dir = os.path.join(upload_folder, 'transcripts')
-                os.makedirs(transcript_dir, exist_ok=True)
-                transcript.save(os.path.join(transcript_dir, filename))
-                transcript_path = os.path.join('transcripts', filename)
-                logger.debug(f"Transcript saved at {transcript_path}")
-            else:
-                logger.warning("Invalid file type for transcript upload.")
-                return jsonify({'message': 'Invalid file type for transcript.'}), 400
-
-        # Handle CV Upload
-        if cv:
-            if allowed_file(cv.filename, 'cv'):
-                filename = secure_filename(
-                    f"{user_id}_cv_{int(datetime.utcnow().timestamp())}_{cv.filename}"
-                )
-                cv_dir = os.path.join(upload_folder, 'cvs')
-                os.makedirs(cv_dir, exist_ok=True)
-                cv.save(os.path.join(cv_dir, filename))
-                cv_path = os.path.join('cvs', filename)
-                logger.debug(f"CV saved at {cv_path}")
-            else:
-                logger.warning("Invalid file type for CV upload.")
-                return jsonify({'message': 'Invalid file type for CV.'}), 400
-
-        # Handle Photo Upload
-        if photo:
-            if allowed_file(photo.filename, 'photo'):
-                filename = secure_filename(
-                    f"{user_id}_photo_{int(datetime.utcnow().timestamp())}_{photo.filename}"
-                )
-                photo_dir = os.path.join(upload_folder, 'photos')
-                os.makedirs(photo_dir, exist_ok=True)
-                photo.save(os.path.join(photo_dir, filename))
-                photo_path = os.path.join('photos', filename)
-                logger.debug(f"Photo saved at {photo_path}")
-            else:
-                logger.warning("Invalid file type for photo upload.")
-                return jsonify({'message': 'Invalid file type for photo.'}), 400
+        # Validate extensions up front so nothing is written for a bad request
+        uploads = {}
+        for file_type, label in (('transcript', 'transcript'), ('cv', 'CV'), ('photo', 'photo')):
+            upload = files.get(file_type)
+            if not upload:
+                continue
+            if not allowed_file(upload.filename, file_type):
+                logger.warning(f"Invalid file type for {file_type} upload.")
+                return jsonify({'message': f'Invalid file type for {label}.'}), 400
+            uploads[file_type] = upload
+
+        connection = get_db_connection()
+        if connection is None:
+            raise Exception("Database connection failed.")
+
+        intake = intake_for_request(connection, form_data)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
+        if intake['status'] != Intake.OPEN:
+            return jsonify({'message': 'Intake is not open for applications'}), 400
+
+        # Land the bytes in quarantine; content is validated after the response
+        for file_type, upload in uploads.items():
+            # The random part keeps names unique even within one second;
+            # the name doubles as the upload's token in student_details
+            stamp = f"{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+            filename = secure_filename(f"{user_id}_{file_type}_{stamp}_{upload.filename}")
+            quarantined[file_type] = upload_pipeline.quarantine(upload, filename)
+            logger.debug(f"{file_type} quarantined at {quarantined[file_type]}")
 
         # Prepare data for database insertion
         data = {
             'user_id': user_id,
+            'intake_id': intake['id'],
             'final_percentage': form_data.get('final_percentage'),
             'tentative_ranking': form_data.get('tentative_ranking'),
             'final_year_project': form_data.get('final_year_project'),
@@ -154,144 +116,107 @@ def submit_student_details():
             'leadership_experience': form_data.get('leadership_experience'),
             'availability_to_start': form_data.get('availability_to_start'),
             'additional_certifications': form_data.get('additional_certifications'),
-            'transcript_path': transcript_path,
-            'cv_path': cv_path,
-            'photo_path': photo_path
+            'transcript_status': 'quarantined' if 'transcript' in quarantined else None,
+            'cv_status': 'quarantined' if 'cv' in quarantined else None,
+            'photo_status': 'quarantined' if 'photo' in quarantined else None,
+            'transcript_upload': upload_token(quarantined.get('transcript')),
+            'cv_upload': upload_token(quarantined.get('cv')),
+            'photo_upload': upload_token(quarantined.get('photo'))
         }
 
-        # Connect to the database
-        connection = get_db_connection()
-        if connection is None:
-            raise Exception("Database connection failed.")
-
-        cursor = connection.cursor(dictionary=True)
-
         # Insert or Update the student_details record
-        insert_query = """
-            INSERT INTO student_details (
-                user_id, final_percentage, tentative_ranking, final_year_project,
-                other_research, publications, extracurricular, professional_experience,
-                strong_points, weak_points, preferred_programs, reference_details,
-                statement_of_purpose, intended_research_areas, english_proficiency,
-                leadership_experience, availability_to_start, additional_certifications,
-                transcript_path, cv_path, photo_path
-            ) VALUES (
-                %(user_id)s, %(final_percentage)s, %(tentative_ranking)s, %(final_year_project)s,
-                %(other_research)s, %(publications)s, %(extracurricular)s, %(professional_experience)s,
-                %(strong_points)s, %(weak_points)s, %(preferred_programs)s, %(reference_details)s,
-                %(statement_of_purpose)s, %(intended_research_areas)s, %(english_proficiency)s,
-                %(leadership_experience)s, %(availability_to_start)s, %(additional_certifications)s,
-                %(transcript_path)s, %(cv_path)s, %(photo_path)s
-            )
-            ON DUPLICATE KEY UPDATE
-                final_percentage = VALUES(final_percentage),
-                tentative_ranking = VALUES(tentative_ranking),
-                final_year_project = VALUES(final_year_project),
-                other_research = VALUES(other_research),
-                publications = VALUES(publications),
-                extracurricular = VALUES(extracurricular),
-                professional_experience = VALUES(professional_experience),
-                strong_points = VALUES(strong_points),
-                weak_points = VALUES(weak_points),
-                preferred_programs = VALUES(preferred_programs),
-                reference_details = VALUES(reference_details),
-                statement_of_purpose = VALUES(statement_of_purpose),
-                intended_research_areas = VALUES(intended_research_areas),
-                english_proficiency = VALUES(english_proficiency),
-                leadership_experience = VALUES(leadership_experience),
-                availability_to_start = VALUES(availability_to_start),
-                additional_certifications = VALUES(additional_certifications),
-                transcript_path = VALUES(transcript_path),
-                cv_path = VALUES(cv_path),
-                photo_path = VALUES(photo_path),
-                updated_at = CURRENT_TIMESTAMP
-        """
-
-        cursor.execute(insert_query, data)
-        connection.commit()
+        queries.execute(connection, 'student.upsert_details', data)
+        commit(connection)
+
+        # Validate and promote uploads in the background; paths are set once clean
+        for file_type, quarantined_path in quarantined.items():
+            upload_pipeline.submit(user_id, intake['id'], file_type, quarantined_path)
 
         logger.info(f"Student details for user_id {user_id} have been submitted/updated successfully.")
+        change_feed.publish(
+            'student.submitted', student_id=user_id, intake_id=intake['id'],
+            pending_uploads=sorted(quarantined)
+        )
+        audit_log.record(
+            'student.submitted', student_id=user_id, intake_id=intake['id'], actor_role='student',
+            details={'uploads': sorted(quarantined)}
+        )
         flash('Your details have been recorded successfully!', 'success')
-        return jsonify({'message': 'Details submitted successfully.'}), 200
+        return jsonify({
+            'message': 'Details submitted successfully.',
+            'intake_id': intake['id'],
+            'pending_uploads': sorted(quarantined)
+        }), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
 
     except Exception as e:
+        for quarantined_path in quarantined.values():
+            upload_pipeline.discard(quarantined_path)
         if connection:
-            connection.rollback()
+            rollback(connection)
+        if is_outage(e):
+            return degraded_response(e)
         logger.error(f"Error storing student details: {e}")
-        return jsonify({'message': 'Error storing details', 'error': str(e)}), 500
+        return jsonify({'message': 'Error storing details'}), 500
 
     finally:
         if connection and connection.is_connected():
-            cursor.close()
             connection.close()
 
 @student_bp.route('/get-details', methods=['GET'])
 @login_required
 def get_student_details():
     """
-    Retrieve all details of the logged-in student.
+    Retrieve all details of the logged-in student's application to one
+    intake (?intake_id=, default: the current intake).
     """
     connection = None
+    user_id = current_user_id()
+    stale_key = ('student.details', user_id, request.args.get('intake_id'))
     try:
-        user_id = session['user_id']
         connection = get_db_connection()
         if connection is None:
             raise Exception("Database connection failed.")
 
-        cursor = connection.cursor(dictionary=True)
-
-        query = """
-            SELECT 
-                final_percentage,
-                tentative_ranking,
-                final_year_project,
-                other_research,
-                publications,
-                extracurricular,
-                professional_experience,
-                strong_points,
-                weak_points,
-                preferred_programs,
-                reference_details,
-                statement_of_purpose,
-                intended_research_areas,
-                english_proficiency,
-                leadership_experience,
-                availability_to_start,
-                additional_certifications,
-                transcript_path,
-                cv_path,
-                photo_path,
-                status,
-                created_at,
-                updated_at
-            FROM student_details
-            WHERE user_id = %s
-        """
-
-        cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
+        intake = intake_for_request(connection)
+        if intake is None:
+            return jsonify({'message': 'Intake not found'}), 404
 
-        if not result:
+        # Answer conditional requests from updated_at before loading the wide row
+        version = queries.fetchone(connection, 'student.details_version', (user_id, intake['id']))
+        if not version:
             logger.warning(f"No details found for user_id {user_id}.")
             return jsonify({'message': 'No details found for this user.'}), 404
 
-        # Format datetime fields
-        if result['created_at']:
-            result['created_at'] = result['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        if result['updated_at']:
-            result['updated_at'] = result['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
+        etag = make_etag('details', user_id, intake['id'], version['updated_at'])
+        last_modified = latest(version['updated_at'])
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        result = queries.fetchone(connection, 'student.get_details', (user_id, intake['id']))
+
+        if not result:
+            logger.warning(f"No details found for user_id {user_id}.")
+            return jsonify({'message': 'No details found for this user.'}), 404
 
         logger.info(f"Retrieved student details for user_id {user_id}.")
-        return jsonify(result), 200
+        stale_cache.store(stale_key, result)
+        return add_validators(jsonify(result), etag, last_modified), 200
+
+    except InvalidIntakeId as e:
+        return jsonify({'message': str(e)}), 400
 
     except Exception as e:
+        if is_outage(e):
+            return degraded_response(e, stale_key)
         logger.error(f"Error retrieving student details: {e}")
-        return jsonify({'message': 'Error retrieving details', 'error': str(e)}), 500
+        return jsonify({'message': 'Error retrieving details'}), 500
 
     finally:
         if connection and connection.is_connected():
-            cursor.close()
             connection.close()
 
 @student_bp.route('/download-file/<file_type>/<filename>', methods=['GET'])
@@ -300,8 +225,6 @@ def download_file(file_type, filename):
     """
     Allows users to download their uploaded files (transcript, CV, photo).
     """
-    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-
     # Mapping file types to directories
     directory_mapping = {
         'transcript': 'transcripts',
@@ -314,15 +237,33 @@ def download_file(file_type, filename):
         logger.warning(f"Invalid file type requested: {file_type}")
         return jsonify({'message': 'Invalid file type requested.'}), 400
 
-    file_path = os.path.join(upload_folder, directory, filename)
-
-    if not os.path.exists(file_path):
-        logger.warning(f"File does not exist: {file_path}")
-        return jsonify({'message': 'File does not exist.'}), 404
+    filename = secure_filename(filename)
+    key = make_key(directory, filename)
+
+    # Photos can be requested at a standard size: ?size=thumb|medium|large.
+    # Without one, or if the variant is missing, the original is served; it
+    # was scaled down to the largest size and stripped of metadata when it
+    # passed validation
+    size = request.args.get('size')
+    if size:
+        if file_type != 'photo' or size not in PHOTO_SIZES:
+            return jsonify({'message': 'Invalid size requested.'}), 400
+        variant_key = make_key(directory, variant_name(filename, size))
+        if storage.exists(variant_key):
+            key = variant_key
 
     try:
-        logger.info(f"Sending file {file_path} to user {session['user_id']}.")
-        return send_file(file_path, as_attachment=True)
+        local_path = storage.local_path(key)
+        if local_path is not None:
+            logger.info(f"Sending file {key} to user {current_user_id()}.")
+            return send_file(local_path, as_attachment=True)
+
+        stream = storage.open(key)
+        logger.info(f"Streaming file {key} to user {current_user_id()}.")
+        return send_file(stream, as_attachment=True, download_name=key.rsplit('/', 1)[1])
+    except FileNotFoundError:
+        logger.warning(f"File does not exist: {key}")
+        return jsonify({'message': 'File does not exist.'}), 404
     except Exception as e:
         logger.error(f"Error sending file: {e}")
-        return jsonify({'message': 'Error downloading file.', 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': 'Error downloading file.'}), 500
@@ -0,0 +1,83 @@
+# File: serialization.py
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time, timedelta
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+# Wire format the frontend already expects for DATETIME/TIMESTAMP columns
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _default(obj):
+    """
+    Serialize types that come back from mysql-connector rows.
+    """
+    if isinstance(obj, datetime):
+        return obj.strftime(DATETIME_FORMAT)
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, timedelta):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8', errors='replace')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # Pass datetimes through to _default so they keep DATETIME_FORMAT
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_bytes(obj):
+        return _encoder.encode(obj).encode('utf-8')
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider used by jsonify. Encodes with orjson when installed and
+    formats datetimes during encoding, so handlers can return database rows
+    as-is instead of rewriting every datetime field in a Python loop.
+
+    dumps() calls that pass options (sort_keys, indent, separators, as
+    Flask's session serializer does) go to the standard library encoder,
+    which honours them.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,277 @@
+# File: storage.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class LocalStorage:
+    """
+    Stores uploads on local disk under root.
+
+    Keys look like "photos/12_photo_1700000000_me.jpg". Files are sharded into
+    two levels of hash-prefixed subdirectories
+    (photos/ab/cd/12_photo_1700000000_me.jpg) so no single directory grows to
+    millions of entries. Keys written before sharding are still found at
+    their flat location.
+    """
+
+    def __init__(self, root, shard_depth=2):
+        self.root = root
+        self.shard_depth = shard_depth
+
+    def _path(self, key):
+        directory, _, filename = key.rpartition('/')
+        digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, directory, *shards, filename)
+
+    def _legacy_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def local_path(self, key):
+        """
+        Return the on-disk path for key, or None if it does not exist.
+        """
+        for path in (self._path(key), self._legacy_path(key)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def save(self, key, stream):
+        """
+        Stream a file object into key. The file appears atomically.
+        """
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(stream, out, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def put_file(self, key, local_path, move=False):
+        """
+        Store an existing local file under key, moving it when move is True.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if move:
+            shutil.move(local_path, path)
+        else:
+            with open(local_path, 'rb') as stream:
+                self.save(key, stream)
+
+    def open(self, key):
+        """
+        Open key for streaming reads. Raises FileNotFoundError if missing.
+        """
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return open(path, 'rb')
+
+    def exists(self, key):
+        return self.local_path(key) is not None
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if path is not None:
+            os.remove(path)
+
+    def iter_keys(self, directory):
+        """
+        Yield (key, size, mtime) for every file under directory, sharded or
+        flat. Directories are streamed with scandir rather than listed whole.
+        """
+        pending = [os.path.join(self.root, directory)]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue  # in-progress writes from save()
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        yield make_key(directory, entry.name), stat.st_size, stat.st_mtime
+
+
+class S3Storage:
+    """
+    Stores uploads in an S3-compatible bucket. Set endpoint_url to use MinIO,
+    moto's server or another local stand-in.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region_name=None, client=None):
+        # boto3 is only needed for this driver and is slow to import, so it is
+        # loaded here rather than at module import
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("boto3 is required for STORAGE_BACKEND=s3")
+        self._client_error = ClientError
+        if client is None:
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _is_missing(error):
+        return error.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'NotFound')
+
+    def local_path(self, key):
+        return None
+
+    def save(self, key, stream):
+        """
+        Stream a file object into key using multipart upload for large files.
+        """
+        self.client.upload_fileobj(stream, self.bucket, self._key(key))
+
+    def put_file(self, key, local_path, move=False):
+        self.client.upload_file(local_path, self.bucket, self._key(key))
+        if move:
+            os.remove(local_path)
+
+    def open(self, key):
+        """
+        Return a streaming body for key. Raises FileNotFoundError if missing.
+        """
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        except self._client_error as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self._client_error as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def delete(self, key):
+        """
+        Delete key. Like the local driver, a missing key is not an error;
+        other S3 errors (permissions, a missing bucket) are raised.
+        """
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as e:
+            if not self._is_missing(e):
+                raise
+
+    def iter_keys(self, directory):
+        """
+        Yield (key, size, mtime) for every object under directory, one
+        listing page at a time. Folder placeholder objects are skipped; S3
+        errors, such as a missing bucket, are raised.
+        """
+        prefix = f"{self._key(directory)}/"
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', ()):
+                name = item['Key'][len(prefix):]
+                if not name or name.endswith('/'):
+                    continue
+                yield make_key(directory, name), item['Size'], item['LastModified'].timestamp()
+
+
+class Storage:
+    """
+    Upload storage configured from the app. Delegates to the selected driver.
+
+    Config:
+        STORAGE_BACKEND: 'local' (default) or 's3'.
+        UPLOAD_FOLDER: root directory for the local driver.
+        S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION: S3 driver settings.
+    """
+
+    def __init__(self):
+        self.backend = LocalStorage('uploads')
+
+    def init_app(self, app):
+        backend = app.config.get('STORAGE_BACKEND', 'local')
+        if backend == 's3':
+            self.backend = S3Storage(
+                app.config['S3_BUCKET'],
+                prefix=app.config.get('S3_PREFIX', ''),
+                endpoint_url=app.config.get('S3_ENDPOINT_URL'),
+                region_name=app.config.get('S3_REGION'),
+            )
+        else:
+            self.backend = LocalStorage(app.config.get('UPLOAD_FOLDER', 'uploads'))
+        logger.debug(f"Upload storage backend: {type(self.backend).__name__}")
+
+    # The driver interface, forwarded explicitly so it is visible here
+
+    def local_path(self, key):
+        """
+        Return an on-disk path for key, or None if it is missing or remote.
+        """
+        return self.backend.local_path(key)
+
+    def save(self, key, stream):
+        """
+        Stream a file object into key.
+        """
+        self.backend.save(key, stream)
+
+    def put_file(self, key, local_path, move=False):
+        """
+        Store an existing local file under key, moving it when move is True.
+        """
+        self.backend.put_file(key, local_path, move=move)
+
+    def open(self, key):
+        """
+        Open key for streaming reads. Raises FileNotFoundError if missing.
+        """
+        return self.backend.open(key)
+
+    def exists(self, key):
+        return self.backend.exists(key)
+
+    def delete(self, key):
+        """
+        Delete key; a missing key is not an error.
+        """
+        self.backend.delete(key)
+
+    def iter_keys(self, directory):
+        """
+        Yield (key, size, mtime) for every stored file under directory.
+        """
+        return self.backend.iter_keys(directory)
+
+
+def make_key(directory, filename):
+    """
+    Build a storage key. Keys always use '/' regardless of platform.
+    """
+    return f"{directory}/{filename}"
+
+
+storage = Storage()
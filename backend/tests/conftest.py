@@ -0,0 +1,113 @@
+# tests/conftest.py
+
+import os
+import sys
+import pytest
+
+# The backend is a flat set of modules run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    """
+    Stands in for a mysql-connector cursor. respond(sql, params) returns the
+    rows a statement produces (or raises); every statement is recorded with
+    its whitespace collapsed.
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda sql, params: [])
+        self.statements = []
+        self.rowcount = 0
+        self.description = None
+        self.closed = False
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        params = tuple(params) if params is not None else ()
+        self.statements.append((' '.join(sql.split()), params))
+        self._rows = list(self.respond(sql, params) or [])
+        self.rowcount = len(self._rows)
+
+    def executemany(self, sql, seq_params):
+        for params in seq_params:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """
+    Stands in for a (pooled) connection. cursor() returns the given cursor,
+    or a new FakeCursor(respond) per call, kept in cursors.
+    """
+
+    connection_id = 1
+
+    def __init__(self, cursor=None, respond=None, **attributes):
+        self._cursor = cursor
+        self.respond = respond
+        self.cursors = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+        self.__dict__.update(attributes)
+
+    def cursor(self, *args, **kwargs):
+        if self._cursor is not None:
+            return self._cursor
+        cursor = FakeCursor(self.respond)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    The real application, without a database; uploads go to a temp directory.
+    """
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def use_db(monkeypatch):
+    """
+    use_db(module, connection): make module.get_db_connection return connection.
+    """
+    def use(module, connection):
+        monkeypatch.setattr(module, 'get_db_connection', lambda *args, **kwargs: connection)
+        return connection
+    return use
@@ -0,0 +1,47 @@
+# tests/test_audit.py
+
+import threading
+import audit
+from audit import AuditLog
+
+
+def test_flush_waits_for_every_recorded_event(monkeypatch):
+    written = []
+    release = threading.Event()
+
+    def write(batch):
+        release.wait(timeout=5)
+        written.extend(batch)
+
+    monkeypatch.setattr(AuditLog, '_write', staticmethod(write))
+    log = AuditLog()
+    log.flush_interval = 0.01
+
+    for student_id in range(50):
+        assert log.record('student.status', student_id=student_id, actor_id=1)
+    assert not log.flush(timeout=0.05)
+
+    release.set()
+    assert log.flush(timeout=5)
+    assert len(written) == 50
+    assert log.stats()['written'] == 50
+
+
+def test_counters_are_exact_under_concurrent_drops(monkeypatch):
+    monkeypatch.setattr(AuditLog, '_write', staticmethod(lambda batch: threading.Event().wait(5)))
+    log = AuditLog()
+    log.block_timeout = 0
+    log._queue = audit.queue.Queue(maxsize=1)
+    accepted = []
+
+    def record_many():
+        results = [log.record('student.status', student_id=1, actor_id=1) for _ in range(500)]
+        accepted.append(sum(results))
+
+    threads = [threading.Thread(target=record_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert log.stats()['dropped'] == 2000 - sum(accepted)
@@ -0,0 +1,38 @@
+# tests/test_auth.py
+
+import pytest
+from flask import session
+from auth import admin_required, role_required
+
+
+@pytest.fixture(autouse=True)
+def guarded_routes(app):
+    @app.route('/login/<role>')
+    def login(role):
+        session.update(user_id=1, user_role=role, user_name='Test')
+        return 'ok'
+
+    @app.route('/admin')
+    @admin_required
+    def admin_only():
+        return 'admin'
+
+    @app.route('/staff')
+    @role_required('admin', 'student')
+    def staff():
+        return 'staff'
+
+
+def test_admin_required_rejects_anonymous_and_students(client):
+    assert client.get('/admin').status_code == 401
+
+    client.get('/login/student')
+    response = client.get('/admin')
+    assert response.status_code == 403
+    assert response.get_json() == {'message': 'Admin privileges required'}
+    assert client.get('/staff').status_code == 200
+
+
+def test_admin_required_allows_admins(client):
+    client.get('/login/admin')
+    assert client.get('/admin').get_data(as_text=True) == 'admin'
@@ -0,0 +1,82 @@
+# tests/test_cache.py
+
+import threading
+import types
+from mysql.connector import errors
+from cache import BloomFilter, UserLookupCache, MISS
+from models import User
+from routes import auth_routes
+from conftest import FakeCursor, FakeConnection
+
+
+def users_table(users):
+    def respond(sql, params):
+        row = users.get(params[0])
+        if row is None:
+            return []
+        if 'password_hash' not in sql:
+            row = {k: v for k, v in row.items() if k != 'password_hash'}
+        return [row]
+    return respond
+
+
+def test_cached_users_never_hold_password_hashes():
+    cache = UserLookupCache()
+    cache.store('a@example.com', {'id': 1, 'email': 'a@example.com', 'password_hash': 'secret', 'role': 'student'})
+
+    assert 'password_hash' not in cache.lookup(None, 'A@example.com ')
+
+
+def test_login_ignores_a_stale_negative_entry(monkeypatch):
+    cache = UserLookupCache()
+    monkeypatch.setattr('models.user_cache', cache)
+    users = {}
+    cursor = FakeCursor(users_table(users))
+
+    # Another worker's signup check cached the miss; then the user signed up there
+    assert User.get_by_email(cursor, 'new@example.com') is None
+    users['new@example.com'] = {
+        'id': 2, 'name': 'New', 'email': 'new@example.com', 'password_hash': 'hash', 'role': 'student'
+    }
+    assert User.get_by_email(cursor, 'new@example.com') is None
+
+    user = User.get_credentials(cursor, 'new@example.com')
+    assert user['password_hash'] == 'hash'
+    assert cache.lookup(None, 'new@example.com') is not MISS
+
+
+def test_signup_behind_a_stale_negative_entry_is_a_conflict(client, monkeypatch):
+    cache = UserLookupCache()
+    monkeypatch.setattr('models.user_cache', cache)
+    cache.store('taken@example.com', None)
+
+    def respond(sql, params):
+        if sql.lstrip().startswith('INSERT INTO users'):
+            raise errors.IntegrityError(msg="Duplicate entry 'taken@example.com'", errno=1062)
+        return []
+    cursor = FakeCursor(respond)
+    connection = FakeConnection(cursor)
+    cursor._connection = connection
+    monkeypatch.setattr(auth_routes, 'cnxpool', types.SimpleNamespace(get_connection=lambda: connection))
+
+    response = client.post('/api/auth/signup', json={
+        'name': 'Taken', 'email': 'taken@example.com', 'password': 'correct horse battery',
+    })
+
+    assert response.status_code == 409
+    assert response.get_json() == {'message': 'Email already registered'}
+    assert connection.rollbacks == 1
+    assert cache.lookup(None, 'taken@example.com') is MISS
+
+
+def test_bloom_filter_keeps_concurrent_adds():
+    bloom = BloomFilter(capacity=20000)
+    emails = [f"user{i}@example.com" for i in range(20000)]
+    threads = [threading.Thread(target=lambda part: [bloom.add(e) for e in part], args=(emails[i::4],))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(bloom.might_contain(email) for email in emails)
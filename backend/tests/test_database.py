@@ -0,0 +1,47 @@
+# tests/test_database.py
+
+import pytest
+from mysql.connector import errors
+import database
+from resilience import breakers, DatabaseUnavailable
+from conftest import FakeConnection
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get_connection(self):
+        return self.connection
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    settings = {'DB_POOL_SIZE': '2'}
+    database.configure(lambda name, default: settings.get(name, default))
+    monkeypatch.setattr(breakers, '_breakers', {})
+    yield lambda connection: monkeypatch.setattr(database, '_get_pool', lambda config: FakePool(connection))
+    database.configure()
+
+
+def test_session_reset_returns_checked_out_connection(pooled):
+    def fail(sql, params):
+        raise errors.OperationalError('Lost connection to MySQL server during query')
+    connection = FakeConnection(respond=fail)
+    pooled(connection)
+
+    with pytest.raises(DatabaseUnavailable):
+        database.get_db_connection()
+
+    assert connection.closed
+    assert breakers.stats()['localhost:3306']['consecutive_failures'] == 1
+
+
+def test_session_reset_runs_on_checkout(pooled):
+    connection = FakeConnection()
+    pooled(connection)
+
+    assert database.get_db_connection() is connection
+    assert connection.rollbacks == 1
+    assert connection.cursors[0].statements[0][0] == database._RESET_SESSION_SQL
+    assert not connection.closed
@@ -0,0 +1,148 @@
+# tests/test_events.py
+
+import queue
+import threading
+import time
+import types
+import pytest
+import events
+from events import ChangeFeed, RedisBroker
+
+
+def test_stream_subscribes_only_once_started():
+    feed = ChangeFeed()
+    stream = feed.stream()
+    assert feed.stats()['subscribers'] == 0
+
+    next(stream)
+    assert feed.stats()['subscribers'] == 1
+    stream.close()
+    assert feed.stats()['subscribers'] == 0
+
+
+def publish_statuses(feed):
+    for status in ('approved', 'rejected', 'pending'):
+        feed.publish('student.status', student_id=1, status=status)
+    return [event['id'] for event in feed._history]
+
+
+def test_stream_replays_after_last_event_id():
+    feed = ChangeFeed()
+    ids = publish_statuses(feed)
+
+    stream = feed.stream(last_event_id=ids[0])
+    next(stream)
+    frames = [next(stream), next(stream)]
+    stream.close()
+
+    assert frames[0].startswith(f"id: {ids[1]}\nevent: student.status\n")
+    assert frames[1].startswith(f"id: {ids[2]}\n")
+
+
+def test_local_ids_keep_increasing_across_restarts():
+    before_restart = events.LocalBroker(lambda message: None)
+    last_id = max(before_restart.next_id() for _ in range(3))
+    time.sleep(0.001)
+
+    assert events.LocalBroker(lambda message: None).next_id() > last_id
+
+
+def test_unknown_last_event_id_gets_reset():
+    feed = ChangeFeed()
+    ids = publish_statuses(feed)
+
+    # An id from before a restart, or from another worker's feed
+    stream = feed.stream(last_event_id=ids[0] - 5)
+    next(stream)
+    frame = next(stream)
+    stream.close()
+
+    assert frame.startswith(f"id: {ids[-1]}\nevent: {events.RESET_EVENT}\n")
+    assert feed.stats()['subscribers'] == 0
+
+
+def test_reset_without_buffered_events_keeps_client_id():
+    stream = ChangeFeed().stream(last_event_id=42)
+    next(stream)
+
+    assert next(stream).startswith(f"event: {events.RESET_EVENT}\n")
+    stream.close()
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+
+    def subscribe(self, channel):
+        self.server.subscriptions += 1
+
+    def listen(self):
+        while True:
+            item = self.server.messages.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield {'data': item}
+
+    def close(self):
+        pass
+
+
+class FakeRedisServer:
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.counters = {}
+        self.subscriptions = 0
+
+    def from_url(self, url):
+        return self
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    def publish(self, channel, message):
+        self.messages.put(message)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeRedisServer()
+    fake_redis = types.SimpleNamespace(Redis=server, RedisError=FakeRedisError)
+    monkeypatch.setattr(events, 'redis', fake_redis)
+    monkeypatch.setattr(RedisBroker, 'RECONNECT_DELAY', 0)
+    return server
+
+
+def test_redis_ids_come_from_the_shared_counter(server):
+    delivered = []
+    broker = RedisBroker(delivered.append, 'redis://test')
+    other_worker = RedisBroker(lambda message: None, 'redis://test')
+    try:
+        assert [broker.next_id(), other_worker.next_id(), broker.next_id()] == [1, 2, 3]
+    finally:
+        broker.close()
+        other_worker.close()
+        server.messages.put(None)
+        server.messages.put(None)
+
+
+def test_redis_listener_resubscribes_after_connection_error(server):
+    received = threading.Event()
+    broker = RedisBroker(lambda message: received.set(), 'redis://test')
+    try:
+        server.messages.put(FakeRedisError('connection reset'))
+        server.messages.put(b'{}')
+        assert received.wait(timeout=5)
+        assert server.subscriptions == 2
+    finally:
+        broker.close()
+        server.messages.put(None)
@@ -0,0 +1,36 @@
+# tests/test_health.py
+
+from resilience import DatabaseUnavailable
+from routes import health
+from conftest import FakeConnection
+
+
+def test_readyz_sets_no_cookie(client, use_db):
+    use_db(health, FakeConnection(respond=lambda sql, params: [(1,)]))
+
+    response = client.get('/readyz')
+
+    assert response.status_code == 200
+    assert response.get_json()['checks'] == {'database': 'ok'}
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_readyz_reports_unavailable_database_without_cookie(client, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise DatabaseUnavailable("Database at localhost:3306 is unreachable.")
+    monkeypatch.setattr(health, 'get_db_connection', unavailable)
+
+    response = client.get('/readyz')
+
+    assert response.status_code == 503
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_readyz_hides_failure_details(client, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise DatabaseUnavailable("Database at db-primary.internal:3306 is unreachable.")
+    monkeypatch.setattr(health, 'get_db_connection', unavailable)
+
+    body = client.get('/readyz').get_json()
+
+    assert body == {'status': 'unavailable', 'checks': {'database': 'unavailable'}}
@@ -0,0 +1,46 @@
+# tests/test_http_cache.py
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from http_cache import latest, make_etag, not_modified
+
+ETAG = make_etag('details', 7, 1, Decimal('1760868000.250000'))
+LAST_MODIFIED = datetime(2025, 10, 19, 10, 0, 0, 250000, tzinfo=timezone.utc)
+
+
+def check(app, headers):
+    with app.test_request_context(headers=headers):
+        return not_modified(ETAG, LAST_MODIFIED)
+
+
+def test_latest_reads_epoch_seconds_as_utc():
+    newest = latest(Decimal('1760860800.000000'), None, Decimal('1760868000.250000'))
+
+    assert newest == LAST_MODIFIED
+    assert latest(None, None) is None
+
+
+def test_if_none_match_takes_precedence(app):
+    stale_date = 'Sat, 18 Oct 2025 10:00:00 GMT'
+    fresh_date = 'Sun, 19 Oct 2025 10:00:00 GMT'
+
+    response = check(app, {'If-None-Match': f'"{ETAG}"', 'If-Modified-Since': stale_date})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == f'"{ETAG}"'
+
+    assert check(app, {'If-None-Match': '"other"', 'If-Modified-Since': fresh_date}) is None
+
+
+def test_weak_etag_matches(app):
+    assert check(app, {'If-None-Match': f'"other", W/"{ETAG}"'}).status_code == 304
+
+
+def test_if_modified_since_compares_whole_seconds(app):
+    assert check(app, {'If-Modified-Since': 'Sun, 19 Oct 2025 10:00:00 GMT'}).status_code == 304
+    assert check(app, {'If-Modified-Since': 'Sun, 19 Oct 2025 09:59:59 GMT'}) is None
+
+
+def test_no_304_without_validators(app):
+    assert check(app, {}) is None
+    with app.test_request_context(headers={'If-Modified-Since': 'Sun, 19 Oct 2025 10:00:00 GMT'}):
+        assert not_modified(ETAG, None) is None
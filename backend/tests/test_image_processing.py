@@ -0,0 +1,125 @@
+# tests/test_image_processing.py
+
+import io
+import pytest
+import image_processing
+from image_processing import strip_metadata
+
+Image = pytest.importorskip('PIL.Image')
+
+GPS_IFD = 0x8825
+EXIF_ORIENTATION = 0x0112
+
+
+def _jpeg_with_exif(path, orientation=1, size=(40, 20)):
+    image = Image.new('RGB', size, (200, 10, 10))
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    exif[EXIF_ORIENTATION] = orientation
+    exif[GPS_IFD] = {1: 'N', 2: (51.0, 30.0, 0.0)}
+    image.save(path, 'JPEG', exif=exif.tobytes(), comment=b'secret comment')
+
+
+def test_jpeg_exif_and_comment_removed(tmp_path):
+    path = str(tmp_path / 'photo.jpg')
+    _jpeg_with_exif(path)
+
+    strip_metadata(path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'Exif' not in data and b'secret comment' not in data
+    with Image.open(path) as image:
+        assert not image.getexif()
+        assert image.size == (40, 20)
+
+
+def test_jpeg_orientation_applied_before_stripping(tmp_path):
+    path = str(tmp_path / 'rotated.jpg')
+    _jpeg_with_exif(path, orientation=6)
+
+    strip_metadata(path)
+
+    with Image.open(path) as image:
+        assert not image.getexif()
+        assert image.size == (20, 40)
+
+
+def test_png_text_chunks_removed(tmp_path):
+    from PIL import PngImagePlugin
+
+    path = str(tmp_path / 'photo.png')
+    info = PngImagePlugin.PngInfo()
+    info.add_text('Location', 'home address')
+    Image.new('RGB', (8, 8)).save(path, 'PNG', pnginfo=info)
+
+    strip_metadata(path)
+
+    with open(path, 'rb') as f:
+        assert b'home address' not in f.read()
+    with Image.open(path) as image:
+        image.verify()
+
+
+def test_strip_without_pillow(tmp_path, monkeypatch):
+    path = str(tmp_path / 'photo.jpg')
+    _jpeg_with_exif(path)
+    monkeypatch.setattr(image_processing, 'Image', None)
+
+    strip_metadata(path)
+
+    with open(path, 'rb') as f:
+        assert b'Exif' not in f.read()
+
+
+def test_not_an_image_raises(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    path.write_bytes(b'plain text')
+    with pytest.raises(ValueError):
+        strip_metadata(str(path))
+
+
+def test_photo_upload_original_is_clean(tmp_path):
+    from upload_pipeline import process_upload
+
+    path = str(tmp_path / '12_photo_1_me.jpg')
+    _jpeg_with_exif(path, size=(200, 100))
+
+    result, variants = process_upload('stub', path, 'photo')
+
+    assert result.ok
+    for written in [path] + variants:
+        with Image.open(written) as image:
+            assert not image.getexif()
+
+
+def test_photo_upload_original_is_capped_at_largest_size(tmp_path):
+    from upload_pipeline import process_upload
+
+    path = str(tmp_path / '12_photo_1_me.jpg')
+    _jpeg_with_exif(path, orientation=6, size=(4000, 3000))
+
+    result, _ = process_upload('stub', path, 'photo')
+
+    assert result.ok
+    with Image.open(path) as image:
+        assert image.size == (960, 1280)
+        assert not image.getexif()
+
+
+def test_cap_resolution_leaves_small_images_alone(tmp_path):
+    path = tmp_path / 'small.png'
+    Image.new('RGBA', (300, 200)).save(str(path), 'PNG')
+    before = path.read_bytes()
+
+    assert not image_processing.cap_resolution(str(path))
+    assert path.read_bytes() == before
+
+
+def test_cap_resolution_keeps_png_format(tmp_path):
+    path = str(tmp_path / 'large.png')
+    Image.new('RGBA', (2000, 500)).save(path, 'PNG')
+
+    assert image_processing.cap_resolution(path, max_edge=640)
+    with Image.open(path) as image:
+        assert (image.format, image.size, image.mode) == ('PNG', (640, 160), 'RGBA')
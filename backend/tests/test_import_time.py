@@ -0,0 +1,16 @@
+# tests/test_import_time.py
+
+import importlib.util
+import os
+
+_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'check_import_time.py')
+_spec = importlib.util.spec_from_file_location('check_import_time', _path)
+check_import_time = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check_import_time)
+
+
+def test_startup_is_within_budget():
+    import_ms, create_ms = check_import_time.measure(runs=3)
+
+    assert import_ms <= check_import_time.IMPORT_BUDGET_MS, f"import app took {import_ms:.0f} ms"
+    assert create_ms <= check_import_time.CREATE_BUDGET_MS, f"create_app() took {create_ms:.0f} ms"
@@ -0,0 +1,36 @@
+# tests/test_intakes.py
+
+import pytest
+from flask import Flask
+import intakes
+from intakes import intake_for_request, InvalidIntakeId
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    calls = []
+
+    def resolve(connection, intake_id=None, program=None):
+        calls.append((intake_id, program))
+        return {'id': intake_id or 1}
+
+    monkeypatch.setattr(intakes.Intake, 'resolve', staticmethod(resolve))
+    return calls
+
+
+def test_numeric_intake_id_is_resolved(resolved):
+    with Flask(__name__).test_request_context('/?intake_id=3'):
+        assert intake_for_request(None) == {'id': 3}
+    assert resolved == [(3, None)]
+
+
+def test_missing_intake_id_uses_current_intake(resolved):
+    assert intake_for_request(None, {'program': 'MSc'}) == {'id': 1}
+    assert resolved == [(None, 'MSc')]
+
+
+@pytest.mark.parametrize('value', ['abc', '1.5', ['1']])
+def test_malformed_intake_id_is_rejected(resolved, value):
+    with pytest.raises(InvalidIntakeId):
+        intake_for_request(None, {'intake_id': value})
+    assert resolved == []
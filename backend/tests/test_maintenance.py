@@ -0,0 +1,89 @@
+# tests/test_maintenance.py
+
+import io
+import os
+import time
+import pytest
+import maintenance
+from datetime import timedelta
+from maintenance import MaintenanceRunner
+from storage import storage, LocalStorage
+from conftest import FakeCursor, FakeConnection
+
+
+def path_tables(tables):
+    """
+    Answer the per-table path lookups from {table: [{'user_id', 'paths'}]}.
+    """
+    def respond(sql, params):
+        table = sql.split(' FROM ', 1)[1].split()[0]
+        return [row['paths'] for row in tables.get(table, []) if row['user_id'] in set(params)]
+    return respond
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    backend = LocalStorage(str(tmp_path / 'uploads'))
+    monkeypatch.setattr(storage, 'backend', backend)
+
+    def add(key, age=timedelta(days=2)):
+        storage.save(key, io.BytesIO(b'data'))
+        stamp = time.time() - age.total_seconds()
+        os.utime(backend.local_path(key), (stamp, stamp))
+
+    return add
+
+
+def run_orphan_job(monkeypatch, use_db, tables, archives=()):
+    use_db(maintenance, FakeConnection(FakeCursor(path_tables(tables))))
+    monkeypatch.setattr(
+        maintenance.Intake, 'all', staticmethod(lambda conn: [{'archive_table': table} for table in archives])
+    )
+    runner = MaintenanceRunner('unused', rate=0)
+    return runner.clean_orphaned_uploads()
+
+
+def keys(directory):
+    return sorted(key for key, _, _ in storage.iter_keys(directory))
+
+
+def test_referenced_photo_and_variants_are_kept(uploads, monkeypatch, use_db):
+    uploads('photos/7_photo_1_a_me.jpg')
+    uploads('photos/7_photo_1_a_me_thumb.webp')
+    uploads('photos/7_photo_1_a_me_large.jpg')
+    uploads('photos/7_photo_0_old_me.jpg')
+    uploads('photos/7_photo_0_old_me_thumb.webp')
+    tables = {'student_details': [{'user_id': 7, 'paths': (None, None, 'photos/7_photo_1_a_me.jpg')}]}
+
+    report = run_orphan_job(monkeypatch, use_db, tables)
+
+    assert keys('photos') == [
+        'photos/7_photo_1_a_me.jpg', 'photos/7_photo_1_a_me_large.jpg', 'photos/7_photo_1_a_me_thumb.webp'
+    ]
+    assert report.orphans == report.removed == 2
+
+
+def test_archived_references_recent_files_and_foreign_names_are_kept(uploads, monkeypatch, use_db):
+    uploads('cvs/8_cv_1_a_cv.pdf')
+    uploads('cvs/9_cv_2_b_cv.pdf', age=timedelta(minutes=5))
+    uploads('cvs/notes.pdf')
+    uploads('cvs/10_cv_3_c_cv.pdf')
+    tables = {'student_details_archive_1_ms': [{'user_id': 8, 'paths': (None, 'cvs/8_cv_1_a_cv.pdf', None)}]}
+
+    report = run_orphan_job(monkeypatch, use_db, tables, archives=['student_details_archive_1_ms'])
+
+    assert keys('cvs') == ['cvs/8_cv_1_a_cv.pdf', 'cvs/9_cv_2_b_cv.pdf', 'cvs/notes.pdf']
+    assert report.removed == 1
+    assert report.skipped == 1
+
+
+def test_stale_scans_cutoff_is_computed_by_the_server(use_db):
+    cursor = FakeCursor(lambda sql, params: [(0,)])
+    use_db(maintenance, FakeConnection(cursor))
+
+    MaintenanceRunner('unused', min_age=timedelta(hours=2), dry_run=True).repair_stale_scans()
+
+    assert len(cursor.statements) == 3
+    for sql, params in cursor.statements:
+        assert 'updated_at < NOW() - INTERVAL %s SECOND' in sql
+        assert params == (7200,)
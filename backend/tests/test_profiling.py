@@ -0,0 +1,130 @@
+# tests/test_profiling.py
+
+import os
+import threading
+import time
+import types
+import pytest
+from flask import Flask
+import profiling
+from profiling import Profiler, Sampler, read_folded, hot_functions
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collects_collapsed_stacks_of_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,))
+    worker.start()
+    sampler = Sampler(0.001)
+    try:
+        counts = sampler.start(worker.ident)
+        time.sleep(0.1)
+    finally:
+        stopped = sampler.stop(worker.ident)
+        stop.set()
+        worker.join()
+
+    assert stopped is counts and counts
+    assert all(stack.split(';')[-1] == 'test_profiling.py:spin' for stack in counts)
+    # Stopped targets are no longer sampled
+    total = sum(counts.values())
+    time.sleep(0.02)
+    assert sum(counts.values()) == total
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(wall=1_000_000.0, mono=100.0)
+    monkeypatch.setattr(profiling, 'time', types.SimpleNamespace(
+        time=lambda: clock.wall, monotonic=lambda: clock.mono, perf_counter=time.perf_counter,
+    ))
+    return clock
+
+
+def profiler_in(directory):
+    profiler = Profiler()
+    profiler.directory = str(directory)
+    return profiler
+
+
+def test_toggles_expire(tmp_path, clock):
+    profiler = profiler_in(tmp_path)
+
+    assert profiler.set_toggle('admin.get_students', 60) == {'admin.get_students': clock.wall + 60}
+    assert 'admin.get_students' in profiler.toggles()
+
+    clock.wall += 61
+    assert profiler.toggles() == {}
+
+
+def test_toggles_switched_off(tmp_path, clock):
+    profiler = profiler_in(tmp_path)
+    profiler.set_toggle('admin.get_students', 60)
+
+    assert profiler.set_toggle('admin.get_students', 0) == {}
+    assert profiler.toggles() == {}
+
+
+def test_toggles_reload_when_another_worker_writes(tmp_path, clock):
+    worker, other_worker = profiler_in(tmp_path), profiler_in(tmp_path)
+    assert other_worker.toggles() == {}
+
+    worker.set_toggle('student.get_details', 60)
+    # Re-read at most once per TOGGLE_CHECK_INTERVAL
+    assert other_worker.toggles() == {}
+    clock.mono += profiling.TOGGLE_CHECK_INTERVAL
+    assert list(other_worker.toggles()) == ['student.get_details']
+
+    worker.set_toggle('admin.get_students', 60)
+    # Make sure the rewrite is visible even on coarse mtime filesystems
+    path = os.path.join(str(tmp_path), profiling.TOGGLES_FILE)
+    os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime + 1))
+    clock.mono += profiling.TOGGLE_CHECK_INTERVAL
+    assert sorted(other_worker.toggles()) == ['admin.get_students', 'student.get_details']
+
+
+def test_concurrent_toggle_writes_are_not_lost(tmp_path, clock):
+    profiler = profiler_in(tmp_path)
+    endpoints = [f"endpoint_{i}" for i in range(20)]
+    threads = [threading.Thread(target=profiler.set_toggle, args=(endpoint, 60)) for endpoint in endpoints]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(profiler.toggles()) == sorted(endpoints)
+
+
+def test_read_folded_merges_files_and_hot_functions_counts(tmp_path):
+    first, second = tmp_path / 'a.folded', tmp_path / 'b.folded'
+    first.write_text("app:wsgi;admin:get_students;db:execute 3\napp:wsgi;admin:get_students 1\n")
+    second.write_text("app:wsgi;admin:get_students;db:execute 2\nnot a sample line\n")
+
+    stacks = read_folded([str(first), str(second)])
+    self_counts, inclusive, total = hot_functions(stacks)
+
+    assert stacks == {'app:wsgi;admin:get_students;db:execute': 5, 'app:wsgi;admin:get_students': 1}
+    assert total == 6
+    assert self_counts == {'db:execute': 5, 'admin:get_students': 1}
+    assert inclusive['app:wsgi'] == 6 and inclusive['db:execute'] == 5
+
+
+def test_disabled_profiler_installs_no_hooks(app):
+    assert not profiling.profiler.enabled
+    assert profiling.profiler._before_request not in app.before_request_funcs.get(None, [])
+    assert profiling.profiler._teardown_request not in app.teardown_request_funcs.get(None, [])
+
+
+def test_enabled_profiler_installs_hooks(tmp_path):
+    app = Flask(__name__)
+    app.config.update(PROFILING_ENABLED=True, PROFILE_DIR=str(tmp_path / 'profiles'))
+    profiler = Profiler()
+
+    profiler.init_app(app)
+
+    assert profiler._before_request in app.before_request_funcs[None]
+    assert profiler._teardown_request in app.teardown_request_funcs[None]
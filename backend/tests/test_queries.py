@@ -0,0 +1,24 @@
+# tests/test_queries.py
+
+import pytest
+from mysql.connector import errors
+from queries import QueryRegistry
+from conftest import FakeConnection
+
+
+def test_failed_statement_is_closed_and_reprepared():
+    registry = QueryRegistry()
+    registry.register('test.touch', "UPDATE users SET updated_at = NOW() WHERE id = %s")
+    def fail(sql, params):
+        raise errors.ProgrammingError("Unknown prepared statement handler")
+
+    connection = FakeConnection(respond=fail)
+
+    with pytest.raises(errors.ProgrammingError):
+        registry.fetchall(connection, 'test.touch', (1,))
+    assert connection.cursors[0].closed
+    assert 'test.touch' not in connection._gradpath_statements
+
+    with pytest.raises(errors.ProgrammingError):
+        registry.fetchall(connection, 'test.touch', (1,))
+    assert len(connection.cursors) == 2
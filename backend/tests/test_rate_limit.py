@@ -0,0 +1,40 @@
+# tests/test_rate_limit.py
+
+import threading
+import pytest
+from rate_limit import MemoryWindowStore, SlidingWindowLimiter
+
+
+def test_concurrent_hits_never_exceed_the_limit():
+    limiter = SlidingWindowLimiter(50, 60, MemoryWindowStore())
+    start = threading.Barrier(8)
+
+    def attempt():
+        start.wait()
+        for _ in range(25):
+            limiter.hit('198.51.100.7', now=30.0)
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.stats()['allowed'] == 50
+    assert limiter.stats()['rejected'] == 150
+
+
+def test_previous_window_is_weighted():
+    limiter = SlidingWindowLimiter(10, 60, MemoryWindowStore())
+    for _ in range(10):
+        assert limiter.hit('key', now=59.0)[0]
+
+    # Halfway through the next window half of the previous ten still count
+    allowed = sum(limiter.hit('key', now=90.0)[0] for _ in range(10))
+    assert allowed == 5
+
+
+@pytest.mark.parametrize('email', [['a@example.com'], {'email': 'a@example.com'}, 42])
+def test_login_rejects_non_string_email(client, email):
+    response = client.post('/api/auth/login', json={'email': email, 'password': 'secret'})
+    assert response.status_code == 400
@@ -0,0 +1,106 @@
+# tests/test_read_replicas.py
+
+import os
+import pytest
+from flask import g, session
+import database
+from auth import CurrentUser
+from conftest import FakeConnection
+
+
+@pytest.fixture
+def routing(app, monkeypatch):
+    # After create_app, whose database.init_app would replace these settings
+    settings = {'DB_PORT': '3306', 'DB_REPLICAS': 'localhost:3307', 'DB_POOL_SIZE': '0'}
+    database.configure(lambda name, default: settings.get(name, default))
+    monkeypatch.setattr(database, '_connect', lambda config: FakeConnection(port=config['port']))
+    monkeypatch.setattr(database.replica_router, 'lag_ok', lambda replica, connection: True)
+    yield
+    database.configure()
+
+
+def _as_user(app, user_id):
+    context = app.test_request_context()
+    context.push()
+    g.current_user = CurrentUser(user_id, 'admin')
+    return context
+
+
+def test_reads_go_to_replica(routing, app):
+    with app.test_request_context():
+        g.current_user = CurrentUser(1, 'admin')
+        assert database.get_db_connection(read_only=True).port == 3307
+        assert database.get_db_connection().port == 3306
+
+
+def test_committed_write_pins_only_that_user_to_primary(routing, app):
+    context = _as_user(app, 1)
+    try:
+        database.commit(database.get_db_connection())
+        assert database.get_db_connection(read_only=True).port == 3306
+    finally:
+        context.pop()
+
+    context = _as_user(app, 2)
+    try:
+        assert database.get_db_connection(read_only=True).port == 3307
+    finally:
+        context.pop()
+
+
+def test_primary_connection_without_commit_is_not_a_write(routing, app):
+    with app.test_request_context():
+        g.current_user = CurrentUser(1, 'admin')
+        database.get_db_connection()
+        assert database.get_db_connection(read_only=True).port == 3307
+        assert not session.modified
+
+
+def test_background_commit_marks_given_user(routing, app):
+    database.commit(database.get_db_connection(), user_id=7)
+    with app.test_request_context():
+        g.current_user = CurrentUser(7, 'student')
+        assert database.get_db_connection(read_only=True).port == 3306
+
+
+def test_anonymous_reads_are_never_pinned(routing, app):
+    with app.test_request_context():
+        database.commit(database.get_db_connection())
+        assert database.get_db_connection(read_only=True).port == 3307
+
+
+@pytest.mark.skipif(
+    not (os.getenv('TEST_DB_PRIMARY') and os.getenv('TEST_DB_REPLICA')),
+    reason='set TEST_DB_PRIMARY and TEST_DB_REPLICA (host:port) to run against two MySQL instances'
+)
+def test_routing_against_local_mysql(app):
+    primary_host, _, primary_port = os.environ['TEST_DB_PRIMARY'].partition(':')
+    settings = {
+        'DB_HOST': primary_host,
+        'DB_PORT': primary_port or '3306',
+        'DB_REPLICAS': os.environ['TEST_DB_REPLICA'],
+        # The replica's lag must be measurable for it to be used
+        'REPLICA_MAX_LAG': '60',
+    }
+    database.configure(lambda name, default: settings.get(name, os.getenv(name, default)))
+
+    def server_port(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT @@port")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            connection.close()
+
+    replica_port = int(os.environ['TEST_DB_REPLICA'].partition(':')[2] or 3306)
+    try:
+        with app.test_request_context():
+            g.current_user = CurrentUser(1, 'admin')
+            assert server_port(database.get_db_connection(read_only=True)) == replica_port
+            connection = database.get_db_connection()
+            database.commit(connection)
+            connection.close()
+            assert server_port(database.get_db_connection(read_only=True)) == int(settings['DB_PORT'])
+    finally:
+        database.configure()
@@ -0,0 +1,64 @@
+# tests/test_reports.py
+
+from datetime import date, datetime, timedelta
+import pytest
+import reports
+from conftest import FakeCursor, FakeConnection
+
+
+def rollup_source(watermark, days, archive_tables=()):
+    """
+    Answer the few SELECTs refresh_rollups makes.
+    """
+    def respond(sql, params):
+        if 'FROM report_watermarks' in sql:
+            return [{'watermark': watermark}] if watermark else []
+        if 'MAX(updated_at)' in sql:
+            return [{'latest': datetime(2026, 10, 19, 12, 0)}]
+        if 'SELECT DISTINCT DATE(created_at)' in sql:
+            return [{'day': day} for day in days]
+        if 'FROM intakes' in sql:
+            return [{'archive_table': table} for table in archive_tables]
+        return []
+    return respond
+
+
+@pytest.fixture
+def run(use_db):
+    def run(cursor, **kwargs):
+        use_db(reports, FakeConnection(cursor))
+        return reports.refresh_rollups(**kwargs)
+    return run
+
+
+def test_incremental_refresh_rescans_overlap_window(run):
+    watermark = datetime(2026, 10, 19, 11, 0)
+    cursor = FakeCursor(rollup_source(watermark, [date(2026, 10, 19)]))
+
+    assert run(cursor, overlap=timedelta(minutes=10)) == 1
+
+    scan = next(params for sql, params in cursor.statements if 'SELECT DISTINCT' in sql)
+    assert scan[0] == watermark - timedelta(minutes=10)
+
+
+def test_full_rebuild_only_replaces_days_with_live_data(run):
+    cursor = FakeCursor(rollup_source(None, [date(2026, 10, 18)]))
+
+    run(cursor, full=True)
+
+    deletes = [(sql, params) for sql, params in cursor.statements if sql.startswith('DELETE')]
+    assert deletes and all('WHERE day IN' in sql for sql, _ in deletes)
+    assert all(params == (date(2026, 10, 18),) for _, params in deletes)
+
+
+def test_days_are_recomputed_with_archived_intakes(run):
+    cursor = FakeCursor(rollup_source(None, [date(2026, 10, 18)], archive_tables=['student_details_archive_1_ms']))
+
+    run(cursor)
+
+    inserts = [(sql, params) for sql, params in cursor.statements if sql.startswith('INSERT INTO report_daily')]
+    assert len(inserts) == 2
+    for sql, params in inserts:
+        assert 'FROM student_details WHERE' in sql
+        assert 'FROM student_details_archive_1_ms WHERE' in sql
+        assert params == (datetime(2026, 10, 18), datetime(2026, 10, 19)) * 2
@@ -0,0 +1,140 @@
+# tests/test_resilience.py
+
+import pytest
+from mysql.connector import errors
+import resilience
+from resilience import (
+    CircuitBreaker, BreakerRegistry, StaleCache, DatabaseUnavailable,
+    CLOSED, OPEN, HALF_OPEN, degraded_response, is_outage,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+
+def opened(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_and_fails_fast(clock):
+    breaker = CircuitBreaker('db:3306', failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+    assert breaker.retry_after() == 30
+
+
+def test_one_probe_after_reset_timeout(clock):
+    breaker = opened(CircuitBreaker('db:3306', failure_threshold=2, reset_timeout=30))
+
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.connected()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_wedged_probe_is_replaced(clock):
+    breaker = opened(CircuitBreaker('db:3306', failure_threshold=2, reset_timeout=30))
+    clock.now += 30
+    assert breaker.allow()
+
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = opened(CircuitBreaker('db:3306', failure_threshold=2, reset_timeout=30))
+    clock.now += 30
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['times_opened'] == 2
+    assert not breaker.allow()
+
+
+def test_connecting_does_not_clear_closed_failures(clock):
+    breaker = CircuitBreaker('db:3306', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    breaker.connected()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+
+def test_guard_raises_with_retry_hint(clock):
+    registry = BreakerRegistry()
+    registry.failure_threshold = 1
+    opened(registry.get('db', 3306))
+
+    with pytest.raises(DatabaseUnavailable) as raised:
+        registry.guard('db', 3306)
+
+    assert raised.value.retry_after == 30
+    assert registry.guard('replica', 3306).state == CLOSED
+
+
+def test_interface_errors_count_only_for_lost_connections():
+    assert is_outage(errors.InterfaceError(msg='Lost connection', errno=2013))
+    assert is_outage(errors.OperationalError(msg='MySQL Connection not available'))
+    assert not is_outage(errors.InterfaceError('No result set to fetch from'))
+    assert not is_outage(errors.ProgrammingError(msg='syntax error', errno=1064))
+
+
+@pytest.fixture
+def stale(monkeypatch, clock, app):
+    cache = StaleCache()
+    monkeypatch.setattr(resilience, 'stale_cache', cache)
+    with app.app_context():
+        yield cache
+
+
+def test_degraded_response_serves_stale_payload(stale, clock):
+    stale.store('students:1', {'id': 1})
+    clock.now += 90
+
+    response = degraded_response(DatabaseUnavailable('down'), 'students:1')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'id': 1}
+    assert response.headers['Age'] == '90'
+    assert response.headers['Warning'] == '110 - "Response is Stale"'
+
+
+def test_degraded_response_without_payload_is_503(stale):
+    response = degraded_response(DatabaseUnavailable('down', retry_after=12), 'students:2')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '12'
+    assert 'down' not in response.get_data(as_text=True)
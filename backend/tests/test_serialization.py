@@ -0,0 +1,45 @@
+# tests/test_serialization.py
+
+import json
+from datetime import datetime, time
+from decimal import Decimal
+from flask import Flask, session
+from serialization import FastJSONProvider, dumps_bytes
+
+
+def make_app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.secret_key = 'test'
+    return app
+
+
+def test_dumps_honours_stdlib_options():
+    provider = make_app().json
+    data = {'b': 1, 'a': datetime(2026, 10, 19, 8, 30)}
+
+    assert provider.dumps(data, sort_keys=True) == '{"a": "2026-10-19 08:30:00", "b": 1}'
+    assert provider.dumps(data, indent=2).startswith('{\n  "b": 1')
+
+
+def test_time_and_row_types_serialize():
+    body = json.loads(dumps_bytes({'starts': time(9, 15), 'score': Decimal('87.50')}))
+    assert body == {'starts': '09:15:00', 'score': '87.50'}
+
+
+def test_session_cookie_round_trips():
+    app = make_app()
+
+    @app.route('/set')
+    def set_value():
+        session['user_id'] = 7
+        session['seen'] = datetime(2026, 10, 19, 8, 30)
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return {'user_id': session['user_id'], 'seen': session['seen']}
+
+    client = app.test_client()
+    client.get('/set')
+    assert client.get('/get').get_json() == {'user_id': 7, 'seen': '2026-10-19 08:30:00'}
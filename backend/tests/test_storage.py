@@ -0,0 +1,112 @@
+# tests/test_storage.py
+
+import io
+from datetime import datetime, timezone
+import pytest
+from storage import S3Storage, Storage, LocalStorage
+
+botocore_exceptions = pytest.importorskip('botocore.exceptions')
+ClientError = botocore_exceptions.ClientError
+
+
+def client_error(code, operation):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+
+class StubS3Client:
+    """
+    Just enough of the boto3 S3 client: objects in a dict, plus an optional
+    error raised by every call to simulate S3 failures.
+    """
+
+    def __init__(self, objects=None, error=None):
+        self.objects = dict(objects or {})
+        self.error = error
+        self.deleted = []
+
+    def _check(self, operation):
+        if self.error is not None:
+            raise client_error(self.error, operation)
+
+    def get_object(self, Bucket, Key):
+        self._check('GetObject')
+        if Key not in self.objects:
+            raise client_error('NoSuchKey', 'GetObject')
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        self._check('HeadObject')
+        if Key not in self.objects:
+            raise client_error('404', 'HeadObject')
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self._check('DeleteObject')
+        self.deleted.append(Key)
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        self._check('ListObjectsV2')
+        modified = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        contents = [
+            {'Key': key, 'Size': len(body), 'LastModified': modified}
+            for key, body in sorted(self.objects.items()) if key.startswith(Prefix)
+        ]
+        # Two pages to exercise pagination
+        return [{'Contents': contents[:1]}, {'Contents': contents[1:]}, {}]
+
+
+def s3(client):
+    return S3Storage('bucket', prefix='gradpath', client=client)
+
+
+def test_s3_open_and_exists():
+    storage = s3(StubS3Client({'gradpath/cvs/1_cv.pdf': b'%PDF'}))
+
+    assert storage.open('cvs/1_cv.pdf').read() == b'%PDF'
+    assert storage.exists('cvs/1_cv.pdf')
+    assert not storage.exists('cvs/2_cv.pdf')
+    with pytest.raises(FileNotFoundError):
+        storage.open('cvs/2_cv.pdf')
+
+
+@pytest.mark.parametrize('call', [
+    lambda storage: storage.open('cvs/1_cv.pdf'),
+    lambda storage: storage.exists('cvs/1_cv.pdf'),
+    lambda storage: storage.delete('cvs/1_cv.pdf'),
+    lambda storage: list(storage.iter_keys('cvs')),
+])
+def test_s3_errors_other_than_missing_keys_are_raised(call):
+    with pytest.raises(ClientError):
+        call(s3(StubS3Client(error='AccessDenied')))
+
+
+def test_s3_delete_of_missing_key_is_not_an_error():
+    s3(StubS3Client(error='NoSuchKey')).delete('cvs/1_cv.pdf')
+
+
+def test_s3_iter_keys_strips_prefix_and_skips_folders():
+    storage = s3(StubS3Client({
+        'gradpath/cvs/': b'',
+        'gradpath/cvs/1_cv.pdf': b'abc',
+        'gradpath/cvs/2_cv.pdf': b'abcd',
+        'gradpath/photos/1_photo.jpg': b'x',
+    }))
+
+    keys = [(key, size) for key, size, _ in storage.iter_keys('cvs')]
+    assert keys == [('cvs/1_cv.pdf', 3), ('cvs/2_cv.pdf', 4)]
+
+
+def test_storage_forwards_to_the_configured_driver(tmp_path):
+    storage = Storage()
+    storage.backend = LocalStorage(str(tmp_path))
+    storage.save('cvs/1_cv.pdf', io.BytesIO(b'abc'))
+
+    assert storage.exists('cvs/1_cv.pdf')
+    assert [key for key, _, _ in storage.iter_keys('cvs')] == ['cvs/1_cv.pdf']
+    storage.delete('cvs/1_cv.pdf')
+    storage.delete('cvs/1_cv.pdf')
+    assert not storage.exists('cvs/1_cv.pdf')
@@ -0,0 +1,149 @@
+# tests/test_tokens.py
+
+import json
+import types
+import pytest
+import tokens
+from tokens import TokenService, TokenError, ACCESS_TOKEN, REFRESH_TOKEN, _b64encode
+from models import User
+from routes import auth_routes
+from conftest import FakeConnection
+
+
+@pytest.fixture
+def service():
+    service = TokenService()
+    service.enabled = True
+    service.keys.load('k1:first-secret')
+    return service
+
+
+def test_round_trip(service):
+    payload = service.verify(service.issue(7, 'student', 'Ada'))
+
+    assert payload['sub'] == '7'
+    assert payload['role'] == 'student'
+    assert payload['name'] == 'Ada'
+
+
+def test_expired_token_is_rejected(service, monkeypatch):
+    token = service.issue(7, 'student')
+    later = tokens.time.time() + service.access_ttl + 1
+    monkeypatch.setattr(tokens, 'time', types.SimpleNamespace(time=lambda: later))
+
+    with pytest.raises(TokenError, match='expired'):
+        service.verify(token)
+
+
+def test_token_types_are_not_interchangeable(service):
+    pair = service.issue_pair(7, 'student', version=3)
+
+    with pytest.raises(TokenError, match='type'):
+        service.verify(pair['token'], expected_type=REFRESH_TOKEN)
+    with pytest.raises(TokenError, match='type'):
+        service.verify(pair['refresh_token'], expected_type=ACCESS_TOKEN)
+    assert service.verify(pair['refresh_token'], expected_type=REFRESH_TOKEN)['ver'] == 3
+
+
+def test_tampered_signature_is_rejected(service):
+    header, payload, _ = service.issue(7, 'student').split('.')
+    forged = json.loads(tokens._b64decode(payload))
+    forged['role'] = 'admin'
+    signature = service.issue(7, 'admin').split('.')[2]
+
+    with pytest.raises(TokenError, match='signature'):
+        service.verify(f"{header}.{_b64encode(json.dumps(forged).encode())}.{signature}")
+
+
+@pytest.mark.parametrize('token', [
+    None,
+    '',
+    'only.two',
+    'a.b.c.d',
+    '!!!.???.***',
+    f"{_b64encode(b'[1, 2]')}.e30.sig",
+    f"{_b64encode(b'not json')}.e30.sig",
+])
+def test_malformed_tokens_are_rejected(service, token):
+    with pytest.raises(TokenError):
+        service.verify(token)
+
+
+def test_bad_payload_encoding_is_rejected(service):
+    header, payload, _ = service.issue(7, 'student').split('.')
+    signing_key = service.keys.get('k1')
+    bad_payload = '%%%'
+    signature = tokens.hmac.new(signing_key, f"{header}.{bad_payload}".encode(), tokens.hashlib.sha256).digest()
+
+    with pytest.raises(TokenError, match='Malformed'):
+        service.verify(f"{header}.{bad_payload}.{_b64encode(signature)}")
+
+
+def test_unknown_kid_is_rejected(service):
+    other = TokenService()
+    other.keys.load('k9:other-secret')
+
+    with pytest.raises(TokenError, match='Unknown signing key'):
+        service.verify(other.issue(7, 'student'))
+
+
+def test_rotated_key_verifies_until_retired(service):
+    old_token = service.issue(7, 'student')
+
+    service.keys.rotate('k2', 'second-secret')
+    assert service.verify(old_token)['sub'] == '7'
+    new_token = service.issue(7, 'student')
+    assert json.loads(tokens._b64decode(new_token.split('.')[0]))['kid'] == 'k2'
+
+    service.keys.retire('k1')
+    with pytest.raises(TokenError, match='Unknown signing key'):
+        service.verify(old_token)
+    assert service.verify(new_token)['sub'] == '7'
+    with pytest.raises(ValueError):
+        service.keys.retire('k2')
+
+
+@pytest.fixture
+def refresh_db(app, service, monkeypatch):
+    """
+    The /refresh route against one user row whose token_version can be bumped.
+    """
+    user = {'id': 7, 'name': 'Ada', 'email': 'ada@example.com', 'role': 'student', 'token_version': 0}
+
+    def respond(sql, params):
+        if sql.startswith('UPDATE users SET token_version'):
+            user['token_version'] += 1
+            return []
+        if 'FROM users WHERE id' in sql:
+            return [dict(user)] if params == (user['id'],) else []
+        return []
+
+    connection = FakeConnection(respond=respond)
+    monkeypatch.setattr(auth_routes, 'token_service', service)
+    monkeypatch.setattr(auth_routes, 'cnxpool', types.SimpleNamespace(get_connection=lambda: connection))
+    return user, connection
+
+
+def test_refresh_rejected_after_revoke(client, service, refresh_db):
+    user, connection = refresh_db
+    refresh_token = service.issue_pair(7, 'student', version=user['token_version'])['refresh_token']
+
+    response = client.post('/api/auth/refresh', json={'refresh_token': refresh_token})
+    assert response.status_code == 200
+    assert service.verify(response.get_json()['token'])['name'] == 'Ada'
+
+    cursor = connection.cursor()
+    cursor._connection = connection
+    User.revoke_tokens(cursor, 7)
+
+    response = client.post('/api/auth/refresh', json={'refresh_token': refresh_token})
+    assert response.status_code == 401
+    assert response.get_json() == {'message': 'Invalid refresh token'}
+
+
+def test_refresh_rejects_access_token(client, service, refresh_db):
+    access_token = service.issue(7, 'student')
+
+    response = client.post('/api/auth/refresh', json={'refresh_token': access_token})
+
+    assert response.status_code == 401
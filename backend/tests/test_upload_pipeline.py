@@ -0,0 +1,109 @@
+# tests/test_upload_pipeline.py
+
+import os
+import pytest
+import upload_pipeline
+from storage import storage, LocalStorage
+from upload_pipeline import UploadPipeline, upload_token
+from conftest import FakeConnection
+
+
+class FakeApplications:
+    """
+    Stands in for student_details: one row per user with the latest upload
+    token, path and status of each document type.
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def submit(self, user_id, file_type, quarantined_path):
+        row = self.rows.setdefault(user_id, {})
+        row[f'{file_type}_upload'] = upload_token(quarantined_path)
+        row[f'{file_type}_status'] = 'quarantined'
+
+    def execute(self, connection, name, params):
+        action, file_type = name.split('.', 1)[1].split('_', 1)
+        if action == 'promote':
+            path, user_id, intake_id, token = params
+        else:
+            user_id, intake_id, token = params
+        row = self.rows.get(user_id, {})
+        if row.get(f'{file_type}_upload') != token:
+            return 0, None
+        if action == 'promote':
+            row[f'{file_type}_path'] = path
+            row[f'{file_type}_status'] = 'clean'
+        else:
+            row[f'{file_type}_status'] = 'rejected'
+        return 1, None
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, use_db):
+    applications = FakeApplications()
+    monkeypatch.setattr(upload_pipeline.queries, 'execute', applications.execute)
+    use_db(upload_pipeline, FakeConnection())
+    monkeypatch.setattr(upload_pipeline, 'commit', lambda connection, user_id=None: None)
+    monkeypatch.setattr(upload_pipeline.change_feed, 'publish', lambda *args, **kwargs: None)
+    monkeypatch.setattr(storage, 'backend', LocalStorage(str(tmp_path / 'uploads')))
+
+    pipeline = UploadPipeline()
+    pipeline.upload_folder = str(tmp_path / 'uploads')
+    pipeline.scanner = 'stub'
+    pipeline.workers = 0
+    os.makedirs(os.path.join(pipeline.upload_folder, 'quarantine'))
+    return pipeline, applications
+
+
+def _quarantine(pipeline, filename, content=b'%PDF-1.4\n%%EOF'):
+    path = os.path.join(pipeline.upload_folder, 'quarantine', filename)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_clean_upload_is_promoted(pipeline):
+    pipeline, applications = pipeline
+    path = _quarantine(pipeline, '5_cv_1_aaaa_cv.pdf')
+    applications.submit(5, 'cv', path)
+
+    pipeline.submit(5, 1, 'cv', path)
+
+    assert applications.rows[5]['cv_path'] == 'cvs/5_cv_1_aaaa_cv.pdf'
+    assert applications.rows[5]['cv_status'] == 'clean'
+    assert storage.exists('cvs/5_cv_1_aaaa_cv.pdf')
+    assert not os.path.exists(path)
+
+
+def test_older_scan_finishing_last_does_not_overwrite_newer_upload(pipeline):
+    pipeline, applications = pipeline
+    older = _quarantine(pipeline, '5_cv_1_aaaa_cv.pdf')
+    applications.submit(5, 'cv', older)
+    newer = _quarantine(pipeline, '5_cv_2_bbbb_cv.pdf')
+    applications.submit(5, 'cv', newer)
+
+    pipeline.submit(5, 1, 'cv', newer)
+    pipeline.submit(5, 1, 'cv', older)
+
+    assert applications.rows[5]['cv_path'] == 'cvs/5_cv_2_bbbb_cv.pdf'
+    assert storage.exists('cvs/5_cv_2_bbbb_cv.pdf')
+    assert not storage.exists('cvs/5_cv_1_aaaa_cv.pdf')
+
+
+def test_superseded_rejection_leaves_newer_status(pipeline, monkeypatch):
+    pipeline, applications = pipeline
+    older = _quarantine(pipeline, '5_cv_1_aaaa_cv.pdf')
+    applications.submit(5, 'cv', older)
+    newer = _quarantine(pipeline, '5_cv_2_bbbb_cv.pdf')
+    applications.submit(5, 'cv', newer)
+    pipeline.submit(5, 1, 'cv', newer)
+
+    monkeypatch.setattr(
+        upload_pipeline, 'process_upload',
+        lambda scanner, path, file_type: (upload_pipeline.ScanResult(False, 'bad'), [])
+    )
+    pipeline.submit(5, 1, 'cv', older)
+
+    assert applications.rows[5]['cv_status'] == 'clean'
+    assert not os.path.exists(older)
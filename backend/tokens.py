@@ -0,0 +1,216 @@
+# File: tokens.py
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN = 'access'
+REFRESH_TOKEN = 'refresh'
+
+
+class TokenError(Exception):
+    """
+    Raised when a token is malformed, has a bad signature or has expired.
+    """
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(segment):
+    padded = segment + '=' * (-len(segment) % 4)
+    return base64.urlsafe_b64decode(padded.encode('ascii'))
+
+
+def _decode_json_segment(segment):
+    """
+    Decode a header or payload segment. Raises ValueError unless it holds a
+    JSON object.
+    """
+    value = json.loads(_b64decode(segment))
+    if not isinstance(value, dict):
+        raise ValueError('Token segment is not a JSON object')
+    return value
+
+
+class KeyRing:
+    """
+    HMAC signing keys indexed by key id (kid).
+
+    The active key signs new tokens; every key in the ring verifies. Rotating
+    adds a new active key while older keys keep verifying tokens already
+    issued until they are retired.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self.active_kid = None
+        self._lock = threading.Lock()
+
+    def load(self, spec):
+        """
+        Load keys from a "kid:secret,kid:secret" string. The first key is active.
+        """
+        keys = {}
+        active = None
+        for item in (spec or '').split(','):
+            kid, sep, secret = item.strip().partition(':')
+            if not sep or not kid or not secret:
+                continue
+            keys[kid] = secret.encode('utf-8')
+            active = active or kid
+        with self._lock:
+            self._keys = keys
+            self.active_kid = active
+
+    def rotate(self, kid, secret):
+        """
+        Add a key and make it the active signing key.
+        """
+        with self._lock:
+            keys = dict(self._keys)
+            keys[kid] = secret.encode('utf-8')
+            self._keys = keys
+            self.active_kid = kid
+        logger.info(f"Token signing key rotated to kid {kid}.")
+
+    def retire(self, kid):
+        """
+        Remove a key so tokens signed with it no longer verify.
+        """
+        with self._lock:
+            if kid == self.active_kid:
+                raise ValueError("Cannot retire the active signing key")
+            keys = dict(self._keys)
+            keys.pop(kid, None)
+            self._keys = keys
+
+    def get(self, kid):
+        return self._keys.get(kid)
+
+    def signing_key(self):
+        return self.active_kid, self._keys[self.active_kid]
+
+
+class TokenService:
+    """
+    Issues and verifies HS256 JSON Web Tokens carrying user_id and role.
+    Refresh tokens also carry the user's token_version so they can be revoked.
+
+    Config:
+        JWT_ENABLED: issue and accept bearer tokens (off by default).
+        JWT_SIGNING_KEYS: "kid:secret,..." with the active key first; required
+            when tokens are enabled.
+        JWT_ACCESS_TTL, JWT_REFRESH_TTL: token lifetimes in seconds.
+    """
+
+    def __init__(self):
+        self.keys = KeyRing()
+        self.enabled = False
+        self.access_ttl = 900
+        self.refresh_ttl = 14 * 24 * 3600
+
+    def init_app(self, app):
+        """
+        Configure keys and lifetimes from the app config.
+        """
+        self.enabled = app.config.get('JWT_ENABLED', False)
+        self.access_ttl = int(app.config.get('JWT_ACCESS_TTL', 900))
+        self.refresh_ttl = int(app.config.get('JWT_REFRESH_TTL', 14 * 24 * 3600))
+        if not self.enabled:
+            return
+        self.keys.load(app.config.get('JWT_SIGNING_KEYS'))
+        if self.keys.active_kid is None:
+            # Never fall back to SECRET_KEY, which may still be a placeholder
+            raise RuntimeError("JWT_ENABLED requires JWT_SIGNING_KEYS")
+
+    def issue(self, user_id, role, name=None, token_type=ACCESS_TOKEN, version=0):
+        """
+        Create a signed token for the given user.
+        """
+        kid, key = self.keys.signing_key()
+        now = int(time.time())
+        ttl = self.access_ttl if token_type == ACCESS_TOKEN else self.refresh_ttl
+        header = {'alg': 'HS256', 'typ': 'JWT', 'kid': kid}
+        payload = {
+            'sub': str(user_id),
+            'role': role,
+            'type': token_type,
+            'iat': now,
+            'exp': now + ttl,
+            'jti': uuid.uuid4().hex,
+        }
+        if name is not None:
+            payload['name'] = name
+        if token_type == REFRESH_TOKEN:
+            payload['ver'] = version
+
+        signing_input = (
+            _b64encode(json.dumps(header, separators=(',', ':')).encode('utf-8'))
+            + '.'
+            + _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        )
+        signature = hmac.new(key, signing_input.encode('ascii'), hashlib.sha256).digest()
+        return signing_input + '.' + _b64encode(signature)
+
+    def issue_pair(self, user_id, role, name=None, version=0):
+        """
+        Create an access token and a refresh token.
+        """
+        return {
+            'token': self.issue(user_id, role, name, ACCESS_TOKEN),
+            'refresh_token': self.issue(user_id, role, name, REFRESH_TOKEN, version),
+            'expires_in': self.access_ttl,
+        }
+
+    def verify(self, token, expected_type=ACCESS_TOKEN):
+        """
+        Verify signature, expiry and type and return the token payload.
+        """
+        try:
+            header_segment, payload_segment, signature_segment = token.split('.')
+            signing_input = f"{header_segment}.{payload_segment}".encode('ascii')
+            header = _decode_json_segment(header_segment)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise TokenError('Malformed token') from e
+
+        if header.get('alg') != 'HS256':
+            raise TokenError('Unsupported token algorithm')
+        kid = header.get('kid')
+        key = self.keys.get(kid) if isinstance(kid, str) else None
+        if key is None:
+            raise TokenError('Unknown signing key')
+
+        expected = hmac.new(key, signing_input, hashlib.sha256).digest()
+        try:
+            signature = _b64decode(signature_segment)
+        except ValueError as e:
+            raise TokenError('Malformed token') from e
+        if not hmac.compare_digest(expected, signature):
+            raise TokenError('Invalid token signature')
+
+        try:
+            payload = _decode_json_segment(payload_segment)
+        except ValueError as e:
+            raise TokenError('Malformed token') from e
+        exp = payload.get('exp')
+        sub = payload.get('sub')
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise TokenError('Malformed token')
+        if not isinstance(sub, str) or not sub.isdigit():
+            raise TokenError('Malformed token')
+        if exp < time.time():
+            raise TokenError('Token expired')
+        if payload.get('type') != expected_type:
+            raise TokenError('Wrong token type')
+        return payload
+
+token_service = TokenService()
@@ -0,0 +1,314 @@
+# File: upload_pipeline.py
+
+import importlib
+import os
+import threading
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from database import get_db_connection, commit
+from events import change_feed
+from image_processing import cap_resolution, normalize_photo, strip_metadata
+from storage import storage, make_key
+from queries import queries
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:  # fall back to structural checks for images
+    Image = None
+
+ScanResult = namedtuple('ScanResult', ['ok', 'reason'])
+
+# Leading bytes expected for each allowed extension
+MAGIC_BYTES = {
+    'pdf': (b'%PDF-',),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'docx': (b'PK\x03\x04',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+}
+
+DEFAULT_MAX_BYTES = {
+    'transcript': 10 * 1024 * 1024,
+    'cv': 10 * 1024 * 1024,
+    'photo': 5 * 1024 * 1024,
+}
+
+# Serving directory for each upload type
+UPLOAD_DIRECTORIES = {
+    'transcript': 'transcripts',
+    'cv': 'cvs',
+    'photo': 'photos',
+}
+
+QUARANTINE_DIR = 'quarantine'
+
+
+class BasicScanner:
+    """
+    Validates file content: size limit, magic bytes, PDF structure, DOCX
+    package layout and image decoding.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or DEFAULT_MAX_BYTES
+
+    def scan(self, path, file_type):
+        size = os.path.getsize(path)
+        if size == 0:
+            return ScanResult(False, 'empty file')
+        if size > self.max_bytes.get(file_type, 0):
+            return ScanResult(False, 'file too large')
+
+        ext = path.rsplit('.', 1)[-1].lower()
+        with open(path, 'rb') as f:
+            head = f.read(16)
+            if not head.startswith(MAGIC_BYTES.get(ext, (b'\0\0\0\0',))):
+                return ScanResult(False, f'content does not match .{ext}')
+            f.seek(max(0, size - 1024))
+            tail = f.read()
+
+        if ext == 'pdf' and b'%%EOF' not in tail:
+            return ScanResult(False, 'truncated PDF')
+        if ext == 'docx':
+            try:
+                with zipfile.ZipFile(path) as archive:
+                    if '[Content_Types].xml' not in archive.namelist():
+                        return ScanResult(False, 'not a Word document')
+            except zipfile.BadZipFile:
+                return ScanResult(False, 'corrupt Word document')
+        if ext in ('jpg', 'jpeg', 'png'):
+            return self._check_image(path, ext, tail)
+        return ScanResult(True, 'ok')
+
+    @staticmethod
+    def _check_image(path, ext, tail):
+        if Image is not None:
+            try:
+                with Image.open(path) as image:
+                    image.verify()
+            except Exception as e:
+                return ScanResult(False, f'image does not decode: {e}')
+            return ScanResult(True, 'ok')
+        if ext == 'png' and b'IEND' not in tail:
+            return ScanResult(False, 'truncated PNG')
+        if ext in ('jpg', 'jpeg') and b'\xff\xd9' not in tail:
+            return ScanResult(False, 'truncated JPEG')
+        return ScanResult(True, 'ok')
+
+
+class StubScanner:
+    """
+    Accepts every file. For tests and local development.
+    """
+
+    def scan(self, path, file_type):
+        return ScanResult(True, 'stub')
+
+
+SCANNERS = {
+    'basic': BasicScanner,
+    'stub': StubScanner,
+}
+
+_scanner_cache = {}
+
+
+def load_scanner(spec):
+    """
+    Resolve a scanner from a registered name or a "module:Class" path.
+    """
+    if spec not in _scanner_cache:
+        if spec in SCANNERS:
+            scanner_class = SCANNERS[spec]
+        else:
+            module_name, _, class_name = spec.partition(':')
+            scanner_class = getattr(importlib.import_module(module_name), class_name)
+        _scanner_cache[spec] = scanner_class()
+    return _scanner_cache[spec]
+
+
+def run_scan(scanner_spec, path, file_type):
+    """
+    Validate a file with the given scanner, turning scanner crashes into rejections.
+    """
+    try:
+        return load_scanner(scanner_spec).scan(path, file_type)
+    except Exception as e:
+        return ScanResult(False, f'scanner error: {e}')
+
+
+def process_upload(scanner_spec, path, file_type):
+    """
+    Worker entry point. Runs in a pool process, so it only takes picklable args.
+    Photos that pass validation are scaled down to the largest standard
+    size, have their metadata stripped and are re-encoded at the standard
+    sizes.
+    Returns:
+        (ScanResult, list of variant paths written next to path)
+    """
+    result = run_scan(scanner_spec, path, file_type)
+    variants = []
+    if result.ok and file_type == 'photo':
+        # The original is served too (no ?size=, or a missing variant), so it
+        # must not keep EXIF/GPS data or camera resolution; refuse photos that
+        # cannot be cleaned
+        try:
+            cap_resolution(path)
+            strip_metadata(path)
+        except Exception as e:
+            return ScanResult(False, f'could not clean photo: {e}'), []
+        try:
+            variants = list(normalize_photo(path).values())
+        except Exception as e:
+            # The original passed validation, so serve it even without variants
+            logger.error(f"Photo normalization failed for {path}: {e}")
+    return result, variants
+
+
+def upload_token(quarantined_path):
+    """
+    Token recorded in student_details.<type>_upload when a file is submitted:
+    its unique quarantine filename.
+    """
+    return os.path.basename(quarantined_path) if quarantined_path else None
+
+
+class UploadPipeline:
+    """
+    Quarantine -> validate -> promote pipeline for student uploads.
+
+    Uploads are written to UPLOAD_FOLDER/quarantine and the request returns.
+    A process pool validates each file with the configured scanner and
+    re-encodes photos at the standard sizes. Clean files are moved into upload
+    storage and the student_details path/status columns are updated; rejected
+    files are deleted. Quarantine is always on local disk.
+
+    A result is only applied while its file is still the application's
+    latest upload of that type (the <type>_upload token); results for
+    superseded uploads are dropped and their promoted files deleted.
+    """
+
+    def __init__(self):
+        self.upload_folder = 'uploads'
+        self.scanner = 'basic'
+        self.workers = 2
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Configure the pipeline from the app config.
+        """
+        self.upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads')
+        self.scanner = app.config.get('UPLOAD_SCANNER', 'basic')
+        self.workers = int(app.config.get('UPLOAD_SCAN_WORKERS', 2))
+        os.makedirs(os.path.join(self.upload_folder, QUARANTINE_DIR), exist_ok=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def quarantine(self, file_storage, filename):
+        """
+        Save an uploaded file into quarantine and return its path there.
+        """
+        path = os.path.join(self.upload_folder, QUARANTINE_DIR, filename)
+        file_storage.save(path)
+        return path
+
+    def discard(self, quarantined_path):
+        try:
+            os.remove(quarantined_path)
+        except FileNotFoundError:
+            pass
+
+    def submit(self, user_id, intake_id, file_type, quarantined_path):
+        """
+        Queue a quarantined file for validation. With UPLOAD_SCAN_WORKERS=0
+        the scan runs inline, which keeps tests deterministic.
+        """
+        if self.workers == 0:
+            result, variants = process_upload(self.scanner, quarantined_path, file_type)
+            self._finish(user_id, intake_id, file_type, quarantined_path, result, variants)
+            return
+
+        future = self._get_executor().submit(process_upload, self.scanner, quarantined_path, file_type)
+        future.add_done_callback(
+            lambda f: self._on_done(f, user_id, intake_id, file_type, quarantined_path)
+        )
+
+    def _on_done(self, future, user_id, intake_id, file_type, quarantined_path):
+        try:
+            result, variants = future.result()
+        except Exception as e:
+            result, variants = ScanResult(False, f'scan failed: {e}'), []
+        try:
+            self._finish(user_id, intake_id, file_type, quarantined_path, result, variants)
+        except Exception as e:
+            logger.error(f"Error finishing {file_type} scan for user_id {user_id}: {e}")
+
+    def _finish(self, user_id, intake_id, file_type, quarantined_path, result, variants=()):
+        directory = UPLOAD_DIRECTORIES[file_type]
+        token = upload_token(quarantined_path)
+        if result.ok:
+            keys = []
+            for variant_path in variants:
+                keys.append(make_key(directory, os.path.basename(variant_path)))
+                storage.put_file(keys[-1], variant_path, move=True)
+            relative_path = make_key(directory, token)
+            storage.put_file(relative_path, quarantined_path, move=True)
+            keys.append(relative_path)
+            if not self._record(user_id, intake_id, file_type, relative_path, 'clean', token):
+                # A newer upload replaced this one while it was being scanned
+                for key in keys:
+                    storage.delete(key)
+                logger.info(f"Discarded superseded {file_type} for user_id {user_id}: {relative_path}")
+                return
+            logger.info(f"{file_type} for user_id {user_id} passed validation: {relative_path}")
+        else:
+            self.discard(quarantined_path)
+            if not self._record(user_id, intake_id, file_type, None, 'rejected', token):
+                logger.info(f"Ignored rejection of superseded {file_type} for user_id {user_id}.")
+                return
+            logger.warning(f"{file_type} for user_id {user_id} rejected: {result.reason}")
+
+        change_feed.publish(
+            'student.document', student_id=user_id, intake_id=intake_id, file_type=file_type,
+            status='clean' if result.ok else 'rejected', reason=result.reason
+        )
+
+    @staticmethod
+    def _record(user_id, intake_id, file_type, relative_path, status, token):
+        """
+        Apply a scan result to the application if token is still its latest
+        upload of file_type.
+        Returns:
+            True if the row was updated, False if the upload was superseded.
+        """
+        connection = get_db_connection()
+        if connection is None:
+            raise Exception("Database connection failed.")
+        try:
+            if status == 'clean':
+                updated, _ = queries.execute(
+                    connection, f'uploads.promote_{file_type}', (relative_path, user_id, intake_id, token)
+                )
+            else:
+                updated, _ = queries.execute(connection, f'uploads.reject_{file_type}', (user_id, intake_id, token))
+            # Count as the student's write so their next reads see the new status
+            commit(connection, user_id)
+            return updated > 0
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+upload_pipeline = UploadPipeline()